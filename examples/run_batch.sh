@@ -16,4 +16,4 @@ echo "Found $TOTAL_COMMANDS commands to process in run.txt"
 cd "$DUN_DIR" && \
 python -m examples.batch_run "${SCRIPT_DIR}/run.txt" "$LOG_DIR"
 
-echo -e "\nAll commands executed. Logs saved in $LOG_DIR/"
+echo -e "\nAll commands executed. Results saved in $LOG_DIR/results.jsonl"
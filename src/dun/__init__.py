@@ -3,24 +3,52 @@
 A powerful tool for data processing and analysis with natural language interface
 and automatic environment diagnostics.
 """
-from pathlib import Path
-from typing import Optional
-
-from dun.config.settings import settings, get_settings
-from dun.core.contexts import get_context, ApplicationContext
-from dun.services.filesystem import FileSystemService, fs
-from dun.services.ollama import OllamaService, ollama_service
-from dun.app import DunApplication, run
+import importlib
+from typing import Any
 
 # Package metadata
 __version__ = "0.2.0"
 __author__ = "Tom Sapletta <info@softreck.dev>"
 __license__ = "MIT"
 
-# Initialize default services
-context: ApplicationContext = get_context()
-context.register_service(FileSystemService())
-context.register_service(OllamaService())
+# Public names are imported on first access, so that lightweight entry
+# points (e.g. the `dun` client talking to a running `dun serve` daemon)
+# do not pay for settings, services and pandas on every start.
+_LAZY_EXPORTS = {
+    'DunApplication': 'dun.app',
+    'run': 'dun.app',
+    'settings': 'dun.config.settings',
+    'get_settings': 'dun.config.settings',
+    'get_context': 'dun.core.contexts',
+    'ApplicationContext': 'dun.core.contexts',
+    'FileSystemService': 'dun.services.filesystem',
+    'fs': 'dun.services.filesystem',
+    'OllamaService': 'dun.services.ollama',
+    'ollama_service': 'dun.services.ollama',
+}
+
+
+def _default_context():
+    """Return the global context with the default services registered."""
+    from dun.core.contexts import get_context
+    from dun.services.filesystem import FileSystemService
+    from dun.services.ollama import OllamaService
+
+    context = get_context()
+    context.register_service(FileSystemService())
+    context.register_service(OllamaService())
+    return context
+
+
+def __getattr__(name: str) -> Any:
+    if name == 'context':
+        value = _default_context()
+    elif name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
 
 __all__ = [
     # Core components
@@ -1,10 +1,12 @@
 """Dun - Data Understanding and Navigation."""
 import sys
 
-from dun.app import run
-
 def main():
-    """Run the main application."""
+    """Run the main application, or the CLI when arguments are given."""
+    if len(sys.argv) > 1:
+        from dun.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    from dun.app import run
     sys.exit(run())
 
 if __name__ == "__main__":
@@ -8,7 +8,9 @@ from pathlib import Path
 from rich.console import Console
 from rich.logging import RichHandler
 
+from dun.config.settings import get_settings
 from dun.core.contexts import get_context
+from dun.llm_analyzer import AsyncLLMAnalyzer
 from dun.services.diagnostics import print_diagnostic_report
 from dun.services.filesystem import FileSystemService
 from dun.services.ollama import OllamaService
@@ -53,6 +55,10 @@ class DunApplication:
         self.context.register_service(FileSystemService())
         self.context.register_service(OllamaService())
         
+        settings = get_settings()
+        if settings.OLLAMA_ENABLED:
+            self.context.register_service(AsyncLLMAnalyzer(base_url=settings.OLLAMA_BASE_URL))
+        
         # Initialize all services
         await self.context.initialize_services()
         
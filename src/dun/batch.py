@@ -0,0 +1,164 @@
+"""
+Wsadowe przetwarzanie poleceń z równoległą, potokową analizą i wykonaniem.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from loguru import logger
+
+
+@dataclass
+class BatchResult:
+    """Wynik przetworzenia pojedynczego polecenia."""
+    index: int
+    command: str
+    status: str = "pending"
+    result: Any = None
+    error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def load_commands(input_file: Union[str, Path]) -> List[str]:
+    """Wczytuje polecenia z pliku (pomija puste linie i komentarze)."""
+    with open(input_file, "r", encoding="utf-8") as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+
+class BatchRunner:
+    """Wykonuje listę poleceń w dwóch etapach potoku.
+
+    Etap analizy (LLM + instalacja zależności) i etap wykonania procesora
+    mają osobne pule wątków, więc analiza polecenia N+1 trwa równolegle
+    z wykonaniem polecenia N. Wyniki trafiają do jednego pliku JSONL
+    w kolejności zakończenia (pole ``index`` wskazuje pozycję polecenia).
+    """
+
+    def __init__(self, engine, workers: int = 4):
+        if workers < 1:
+            raise ValueError("Liczba wątków roboczych musi być dodatnia")
+        self.engine = engine
+        self.workers = workers
+        self._lock = threading.Lock()
+
+    def run(self, commands: List[str], output_file: Union[str, Path]) -> Dict[str, Any]:
+        """Przetwarza polecenia i zapisuje wyniki do pliku JSONL."""
+        output_file = Path(output_file)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+        results: List[BatchResult] = [
+            BatchResult(index=i, command=cmd) for i, cmd in enumerate(commands, 1)
+        ]
+
+        with open(output_file, "w", encoding="utf-8") as out, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix="dun-analyze") as analyze_pool, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix="dun-execute") as execute_pool:
+
+            def on_analyzed(item: BatchResult, future: Future) -> None:
+                try:
+                    config = future.result()
+                except Exception as e:
+                    self._finish(item, out, error=e)
+                    return
+                execute_pool.submit(self._execute, item, config, out)
+
+            for item in results:
+                item.timings["queued"] = time.perf_counter()
+                analysis = analyze_pool.submit(self._analyze, item)
+                analysis.add_done_callback(lambda f, item=item: on_analyzed(item, f))
+
+            # Analizy muszą się zakończyć (wraz z callbackami) przed zamknięciem
+            # puli wykonawczej, inaczej nie dałoby się zlecić ostatnich zadań.
+            analyze_pool.shutdown(wait=True)
+
+        succeeded = sum(1 for r in results if r.status == "success")
+        summary = {
+            "total": len(results),
+            "success": succeeded,
+            "error": len(results) - succeeded,
+            "workers": self.workers,
+            "wall_time": round(time.perf_counter() - started, 3),
+            "output_file": str(output_file),
+        }
+        logger.info(
+            f"Przetworzono {summary['total']} poleceń ({succeeded} poprawnie) "
+            f"w {summary['wall_time']} s"
+        )
+        return summary
+
+    def _analyze(self, item: BatchResult):
+        start = time.perf_counter()
+        item.timings["analysis_start"] = start
+        try:
+            return self.engine.prepare_processor(item.command)
+        finally:
+            item.timings["analysis_end"] = time.perf_counter()
+
+    def _execute(self, item: BatchResult, config, out) -> None:
+        item.timings["execution_start"] = time.perf_counter()
+        try:
+            result = self.engine.execute_processor(config)
+        except Exception as e:
+            self._finish(item, out, error=e)
+        else:
+            self._finish(item, out, result=result)
+
+    def _finish(self, item: BatchResult, out, result: Any = None, error: Optional[Exception] = None) -> None:
+        end = time.perf_counter()
+        t = item.timings
+        timings = {
+            "analysis": t["analysis_end"] - t["analysis_start"],
+            "total": end - t["queued"],
+        }
+        if "execution_start" in t:
+            timings["wait"] = t["execution_start"] - t["analysis_end"]
+            timings["execution"] = end - t["execution_start"]
+
+        item.timings = {name: round(value, 3) for name, value in timings.items()}
+        item.status = "error" if error is not None else "success"
+        item.result = result
+        item.error = str(error) if error is not None else None
+
+        line = json.dumps(asdict(item), ensure_ascii=False, default=str)
+        with self._lock:
+            out.write(line + "\n")
+            out.flush()
+        logger.info(f"[{item.index}] {item.status}: {item.command}")
+
+
+def run_batch(
+    input_file: Union[str, Path],
+    output_file: Union[str, Path],
+    workers: int = 4,
+    engine=None,
+    use_cache: bool = True,
+) -> Dict[str, Any]:
+    """Uruchamia przetwarzanie wsadowe poleceń z pliku.
+
+    Silnik utworzony przez tę funkcję jest zamykany po zakończeniu; silnik
+    przekazany przez wywołującego pozostaje otwarty.
+    """
+    commands = load_commands(input_file)
+    logger.info(f"Wczytano {len(commands)} poleceń z {input_file}")
+
+    owns_engine = engine is None
+    if owns_engine:
+        from dun.llm_analyzer import LLMAnalyzer
+        from dun.processor_engine import ProcessorEngine
+        from dun.worker_pool import worker_pool_from_settings
+        engine = ProcessorEngine(
+            LLMAnalyzer(use_cache=use_cache), worker_pool=worker_pool_from_settings()
+        )
+    try:
+        return BatchRunner(engine, workers=workers).run(commands, output_file)
+    finally:
+        if owns_engine:
+            engine.close()
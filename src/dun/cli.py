@@ -1,10 +1,12 @@
 """Command-line interface for Dun."""
 import argparse
 import sys
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
-from .processor_engine import ProcessorEngine
-from .llm_analyzer import LLMAnalyzer
+# Heavy modules (processor engine, LLM analyzer) are imported lazily, so that
+# commands forwarded to a running `dun serve` daemon start instantly.
+
+COMMANDS = ('run', 'batch', 'serve', 'email', 'version')
 
 
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
@@ -20,6 +22,23 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     cmd_parser = subparsers.add_parser('run', help='Run a command')
     cmd_parser.add_argument('command_text', nargs='?', help='Command to execute')
     cmd_parser.add_argument('--interactive', '-i', action='store_true', help='Run in interactive mode')
+    cmd_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM analysis cache')
+    cmd_parser.add_argument('--no-daemon', action='store_true',
+                            help='Always execute in-process, even if `dun serve` is running')
+    
+    # Batch command
+    batch_parser = subparsers.add_parser('batch', help='Run commands from a file in parallel')
+    batch_parser.add_argument('input_file', help='File with one command per line')
+    batch_parser.add_argument('--output', '-o', default='output/batch_results.jsonl',
+                              help='JSONL file for per-command results and timings')
+    batch_parser.add_argument('--workers', '-w', type=int, default=4,
+                              help='Number of parallel workers per pipeline stage')
+    batch_parser.add_argument('--no-cache', action='store_true', help='Bypass the LLM analysis cache')
+    
+    # Daemon command
+    serve_parser = subparsers.add_parser('serve', help='Run a resident daemon on a Unix socket')
+    serve_parser.add_argument('--socket', help='Socket path (default: $DUN_SOCKET or CACHE_DIR/dun.sock)')
+    serve_parser.add_argument('--stop', action='store_true', help='Stop a running daemon')
     
     # Email commands
     email_parser = subparsers.add_parser('email', help='Email operations')
@@ -46,6 +65,10 @@ def main(args: Optional[List[str]] = None) -> int:
     if args is None:
         args = sys.argv[1:]
     
+    # `dun "polecenie" [opcje]` is a shortcut for `dun run "polecenie" [opcje]`
+    if args and args[0] not in COMMANDS and not args[0].startswith('-'):
+        args = ['run', args[0], *args[1:]]
+    
     parsed_args = parse_args(args)
     
     if not parsed_args.command and not args:
@@ -54,9 +77,18 @@ def main(args: Optional[List[str]] = None) -> int:
     
     try:
         if parsed_args.command == 'run':
+            use_cache = not parsed_args.no_cache
             if parsed_args.interactive or not parsed_args.command_text:
-                return interactive_mode()
-            return execute_command(parsed_args.command_text)
+                return interactive_mode(use_cache=use_cache)
+            return execute_command(
+                parsed_args.command_text,
+                use_cache=use_cache,
+                use_daemon=not parsed_args.no_daemon,
+            )
+        elif parsed_args.command == 'batch':
+            return execute_batch(parsed_args)
+        elif parsed_args.command == 'serve':
+            return execute_serve(parsed_args)
         elif parsed_args.command == 'email':
             return handle_email_command(parsed_args)
         elif parsed_args.command == 'version':
@@ -71,10 +103,34 @@ def main(args: Optional[List[str]] = None) -> int:
         return 1
 
 
-def execute_command(command: str) -> int:
-    """Execute a single command."""
+def execute_command(command: str, use_cache: bool = True, use_daemon: bool = True) -> int:
+    """Execute a single command, via the `dun serve` daemon when it is running."""
+    if use_daemon:
+        from .daemon import run_request
+        
+        try:
+            reply = run_request(command, use_cache=use_cache, on_log=_print_daemon_log)
+        except (OSError, ValueError) as e:
+            print(f"Daemon unavailable ({e}), executing in-process", file=sys.stderr)
+            reply = None
+        
+        if reply is not None and reply.get('type') == 'unsupported':
+            print(f"Daemon cannot run this command ({reply['message']}), executing in-process",
+                  file=sys.stderr)
+            reply = None
+        
+        if reply is not None:
+            if reply.get('type') == 'error':
+                print(f"Error executing command: {reply['message']}", file=sys.stderr)
+                return 1
+            print(reply['result'])
+            return 0
+    
+    from .llm_analyzer import LLMAnalyzer
+    from .processor_engine import ProcessorEngine
+    
     try:
-        llm_analyzer = LLMAnalyzer()
+        llm_analyzer = LLMAnalyzer(use_cache=use_cache)
         engine = ProcessorEngine(llm_analyzer)
         result = engine.process_natural_request(command)
         print(result)
@@ -84,13 +140,50 @@ def execute_command(command: str) -> int:
         return 1
 
 
-def interactive_mode() -> int:
+def _print_daemon_log(message: Dict[str, Any]) -> None:
+    """Print a log line streamed back by the daemon."""
+    print(f"{message['level']}: {message['message']}", file=sys.stderr)
+
+
+def execute_serve(args: argparse.Namespace) -> int:
+    """Run the resident daemon, or stop a running one."""
+    from .daemon import run_server, send_request
+    
+    if args.stop:
+        if send_request({'command': 'shutdown'}, args.socket) is None:
+            print("No daemon is running", file=sys.stderr)
+            return 1
+        print("Daemon stopped")
+        return 0
+    return run_server(args.socket)
+
+
+def execute_batch(args: argparse.Namespace) -> int:
+    """Execute commands from a file with the pipelined batch runner."""
+    from .batch import run_batch
+    
+    summary = run_batch(
+        args.input_file,
+        args.output,
+        workers=args.workers,
+        use_cache=not args.no_cache,
+    )
+    print(f"Processed {summary['total']} commands ({summary['success']} succeeded, "
+          f"{summary['error']} failed) in {summary['wall_time']}s")
+    print(f"Results: {summary['output_file']}")
+    return 0 if summary['error'] == 0 else 1
+
+
+def interactive_mode(use_cache: bool = True) -> int:
     """Run in interactive mode."""
     print("Dun - Dynamiczny Procesor Danych")
     print("Wpisz 'exit' lub 'quit' aby zakończyć")
     print("Wpisz 'help' aby wyświetlić pomoc")
     
-    llm_analyzer = LLMAnalyzer()
+    from .llm_analyzer import LLMAnalyzer
+    from .processor_engine import ProcessorEngine
+    
+    llm_analyzer = LLMAnalyzer(use_cache=use_cache)
     engine = ProcessorEngine(llm_analyzer)
     
     while True:
@@ -9,6 +9,9 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from dun.core.protocols import ConfigProtocol
 
+# Environment variables passed on to processor code (as lower-case names)
+PROCESSOR_ENV_PREFIXES = ('IMAP_', 'EMAIL_', 'SMTP_')
+
 
 class AppSettings(BaseSettings):
     """Application settings with support for environment variables and .env files."""
@@ -37,6 +40,43 @@ class AppSettings(BaseSettings):
     OLLAMA_ENABLED: bool = True
     OLLAMA_BASE_URL: str = "http://localhost:11434"
     OLLAMA_TIMEOUT: int = 30
+    OLLAMA_CONNECT_TIMEOUT: float = 5.0
+    OLLAMA_MAX_CONNECTIONS: int = 10
+    OLLAMA_MAX_CONNECTIONS_PER_HOST: int = 4
+    
+    # LLM analysis cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL: int = 7 * 24 * 3600  # seconds
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+    LLM_SEMANTIC_CACHE_ENABLED: bool = True
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.95  # cosine similarity
+    LLM_EMBEDDING_MODEL: Optional[str] = None  # defaults to the analysis model
+    
+    # Compiled processor templates
+    CODE_CACHE_MAX_ENTRIES: int = 128
+    CODE_CACHE_MAX_DISK_ENTRIES: int = 1024
+    
+    # Results of processor runs whose input files did not change
+    RUN_CACHE_ENABLED: bool = True
+    RUN_CACHE_MAX_ENTRIES: int = 256
+    RUN_CACHE_HASH_CONTENT: bool = False  # also compare file contents, not just size and mtime
+    
+    # Columnar copies of parsed CSV files (Feather or .npy, memory-mapped on reuse)
+    CSV_FRAME_CACHE_ENABLED: bool = True
+    CSV_FRAME_CACHE_MAX_MB: int = 2048  # total size; least recently used files are evicted
+    
+    # Warm worker processes for processor execution
+    WORKER_POOL_ENABLED: bool = False
+    WORKER_POOL_SIZE: Optional[int] = None  # defaults to the CPU count
+    WORKER_TASK_TIMEOUT: float = 300.0  # seconds
+    WORKER_MAX_TASKS: int = 100  # tasks before a worker is recycled
+    WORKER_MAX_MEMORY_MB: int = 1024  # peak RSS before a worker is recycled
+    
+    # Keyword table of DynamicProcessorMapper (defaults to dun/config/library_keywords.json)
+    PROCESSOR_KEYWORDS_FILE: Optional[Path] = None
+    
+    # Resident `dun serve` daemon
+    DUN_SOCKET: Optional[Path] = None  # defaults to CACHE_DIR/dun.sock
     
     # File processing
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
@@ -129,6 +129,17 @@ class ProcessorEngine(ServiceProtocol):
                         data=result,
                         output_path=result.get("output_file")
                     )
+                elif "query" in processor_config:
+                    # Handle a structured query (columns, filters, aggregates)
+                    result = await processor.query_csv_files(
+                        processor_config["query"],
+                        file_paths=processor_config.get("file_paths")
+                    )
+                    return ProcessingResult(
+                        success=True,
+                        message=f"Query returned {len(result.frame)} rows",
+                        data=result.to_dict()
+                    )
                 else:
                     # Handle direct CSV processing
                     output_file = await processor.combine_csv_files(
@@ -168,6 +179,16 @@ class ProcessorEngine(ServiceProtocol):
                 error=str(e)
             )
     
+    async def analyze_requests(self, requests: List[str]) -> List[Any]:
+        """Analyze natural language requests concurrently with the registered LLM analyzer.
+        
+        Results are returned in the order of ``requests``.
+        """
+        analyzer = self.context.get_service("llm_analyzer")
+        if analyzer is None:
+            raise RuntimeError("No LLM analyzer registered in the application context")
+        return await analyzer.analyze_many(requests)
+    
     async def process_natural_request(self, request: str) -> ProcessingResult:
         """Process a natural language request by determining the appropriate processor."""
         try:
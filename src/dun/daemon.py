@@ -0,0 +1,316 @@
+"""
+Rezydentny demon ``dun serve`` i lekki klient gniazda Unix.
+
+Klient (``dun "polecenie"``) nie importuje pandas, LLMAnalyzer ani
+ProcessorEngine; te ciężkie zależności ładuje dopiero serwer.
+
+Protokół: klient wysyła jedną linię JSON z poleceniem, serwer odsyła linie
+JSON ``{"type": "log", ...}`` oraz ``{"type": "heartbeat"}`` w trakcie
+przetwarzania i na końcu jedną odpowiedź ``{"type": "result", ...}``,
+``{"type": "error", ...}`` albo ``{"type": "unsupported", ...}`` (żądania,
+którego demon nie może wykonać tak jak proces klienta).
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import signal
+import socket
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from dun.config.settings import PROCESSOR_ENV_PREFIXES, get_settings
+
+SOCKET_NAME = "dun.sock"
+# Limit długości ścieżki gniazda Unix (sun_path) z zapasem
+MAX_SOCKET_PATH = 100
+CONNECT_TIMEOUT = 5.0
+# Serwer wysyła heartbeat co HEARTBEAT_INTERVAL s, więc dłuższa cisza
+# oznacza zawieszonego demona
+HEARTBEAT_INTERVAL = 5.0
+READ_TIMEOUT = 30.0
+
+# Zmienne środowiskowe klienta przesyłane razem z żądaniem
+FORWARDED_ENV = ("OUTPUT_DIR", "OLLAMA_ENABLED")
+# Zmienne, które działają na cały proces demona, więc muszą być takie same
+PROCESS_WIDE_ENV = ("OLLAMA_ENABLED",)
+
+
+def default_socket_path() -> Path:
+    """Zwraca ścieżkę gniazda: ``DUN_SOCKET`` lub ``CACHE_DIR/dun.sock``."""
+    settings = get_settings()
+    if settings.DUN_SOCKET:
+        return Path(settings.DUN_SOCKET)
+
+    cache_dir = Path(settings.CACHE_DIR).resolve()
+    path = cache_dir / SOCKET_NAME
+    if len(str(path)) > MAX_SOCKET_PATH:
+        digest = hashlib.sha256(str(cache_dir).encode("utf-8")).hexdigest()[:12]
+        path = Path(tempfile.gettempdir()) / f"dun-{os.getuid()}-{digest}.sock"
+    return path
+
+
+def client_environ(environ: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Zwraca zmienne środowiskowe klienta istotne dla wykonania żądania."""
+    environ = os.environ if environ is None else environ
+    return {
+        key: value for key, value in environ.items()
+        if key in FORWARDED_ENV or key.startswith(PROCESSOR_ENV_PREFIXES)
+    }
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+
+def send_request(
+    payload: Dict[str, Any],
+    socket_path: Optional[Union[str, Path]] = None,
+    on_log: Optional[Callable[[Dict[str, Any]], None]] = None,
+    timeout: float = READ_TIMEOUT,
+) -> Optional[Dict[str, Any]]:
+    """Wysyła polecenie do demona i zwraca jego końcową odpowiedź.
+
+    Komunikaty ``log`` są przekazywane do ``on_log`` na bieżąco. Zwraca
+    ``None``, gdy demon nie działa (brak gniazda lub odmowa połączenia).
+
+    Raises:
+        TimeoutError: Gdy demon nie odpowiada dłużej niż ``timeout`` sekund.
+        ConnectionError: Gdy demon zamknie połączenie bez odpowiedzi.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+
+    path = Path(socket_path) if socket_path else default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(min(timeout, CONNECT_TIMEOUT))
+    try:
+        sock.connect(str(path))
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+
+    with sock:
+        sock.settimeout(timeout)
+        sock.sendall(_encode(payload))
+        with sock.makefile("r", encoding="utf-8") as reader:
+            for line in reader:
+                message = json.loads(line)
+                if message.get("type") == "heartbeat":
+                    continue
+                if message.get("type") == "log":
+                    if on_log is not None:
+                        on_log(message)
+                    continue
+                return message
+    raise ConnectionError("Demon zamknął połączenie bez odpowiedzi")
+
+
+def run_request(
+    request: str,
+    use_cache: bool = True,
+    socket_path: Optional[Union[str, Path]] = None,
+    on_log: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Zleca demonowi wykonanie żądania w kontekście bieżącego procesu.
+
+    Wraz z żądaniem wysyłany jest katalog roboczy i zmienne środowiskowe
+    klienta. Zwraca ``None``, gdy demon nie działa.
+    """
+    payload = {
+        "command": "run",
+        "request": request,
+        "use_cache": use_cache,
+        "cwd": os.getcwd(),
+        "env": client_environ(),
+    }
+    return send_request(payload, socket_path, on_log=on_log)
+
+
+class DunServer:
+    """Demon utrzymujący w pamięci LLMAnalyzer, ProcessorEngine i importy.
+
+    Polecenia są obsługiwane równolegle w puli wątków pętli zdarzeń, więc
+    współdzielą cache analiz, skompilowane szablony, stan menedżera pakietów
+    i (opcjonalnie) pulę procesów roboczych. Katalog wyjściowy i zmienne
+    procesorów (``IMAP_*``, ``EMAIL_*``, ``SMTP_*``) pochodzą z żądania;
+    żądania z innego katalogu roboczego lub z innymi ustawieniami całego
+    procesu są odsyłane klientowi do wykonania lokalnego.
+    """
+
+    def __init__(self, socket_path: Optional[Union[str, Path]] = None, engine=None):
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.engine = engine
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._client_ids = itertools.count(1)
+
+    def _load_engine(self) -> None:
+        """Ładuje (raz) wszystkie ciężkie komponenty."""
+        import pandas  # noqa: F401  rozgrzanie importu
+
+        if self.engine is None:
+            from dun.llm_analyzer import LLMAnalyzer
+            from dun.processor_engine import ProcessorEngine
+            from dun.worker_pool import worker_pool_from_settings
+            self.engine = ProcessorEngine(LLMAnalyzer(), worker_pool=worker_pool_from_settings())
+
+    async def _claim_socket(self) -> None:
+        """Usuwa nieaktualne gniazdo; zgłasza błąd, gdy demon już działa."""
+        if not self.socket_path.exists():
+            self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+            return
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(str(self.socket_path)), CONNECT_TIMEOUT
+            )
+        except (OSError, asyncio.TimeoutError):
+            alive = False
+        else:
+            writer.write(_encode({"command": "ping"}))
+            try:
+                alive = bool(await asyncio.wait_for(reader.readline(), CONNECT_TIMEOUT))
+            except (OSError, asyncio.TimeoutError):
+                alive = False
+            finally:
+                writer.close()
+        if alive:
+            raise RuntimeError(f"Demon dun już działa ({self.socket_path})")
+        self.socket_path.unlink()
+
+    async def start(self) -> None:
+        """Ładuje silnik i zaczyna nasłuchiwać na gnieździe."""
+        from loguru import logger
+
+        await self._claim_socket()
+        await asyncio.get_running_loop().run_in_executor(None, self._load_engine)
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        logger.info(f"Demon dun nasłuchuje na {self.socket_path}")
+
+    async def stop(self) -> None:
+        """Zamyka gniazdo i zwalnia zasoby silnika."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.socket_path.unlink(missing_ok=True)
+        if self.engine is not None and hasattr(self.engine, "close"):
+            self.engine.close()
+
+    async def serve_forever(self) -> None:
+        """Obsługuje polecenia do sygnału SIGINT/SIGTERM lub polecenia ``shutdown``."""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+        try:
+            await self._stopped.wait()
+        finally:
+            await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            message = json.loads(await reader.readline())
+            reply = await self._dispatch(message, writer)
+        except Exception as e:
+            reply = {"type": "error", "message": str(e)}
+
+        try:
+            writer.write(_encode(reply))
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass  # klient rozłączył się przed odebraniem wyniku
+
+    async def _dispatch(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> Dict[str, Any]:
+        command = message.get("command")
+        if command == "ping":
+            return {"type": "result", "status": "ok", "pid": os.getpid()}
+        if command == "shutdown":
+            self._stopped.set()
+            return {"type": "result", "status": "ok"}
+        if command == "run":
+            reason = self._unsupported_reason(message)
+            if reason:
+                return {"type": "unsupported", "message": reason}
+            result = await self._run(message, writer)
+            return {"type": "result", "status": "success", "result": result}
+        return {"type": "error", "message": f"Nieznane polecenie: {command}"}
+
+    @staticmethod
+    def _unsupported_reason(message: Dict[str, Any]) -> Optional[str]:
+        """Sprawdza, czy demon może wykonać żądanie tak jak proces klienta."""
+        cwd = message.get("cwd")
+        if cwd and Path(cwd).resolve() != Path.cwd().resolve():
+            return f"demon działa w innym katalogu roboczym ({Path.cwd()})"
+        env = message.get("env", {})
+        for key in PROCESS_WIDE_ENV:
+            if env.get(key) != os.environ.get(key):
+                return f"demon działa z inną wartością {key}"
+        return None
+
+    @staticmethod
+    def _output_dir(message: Dict[str, Any]) -> Optional[Path]:
+        """Katalog wyjściowy klienta (``OUTPUT_DIR`` lub ``<cwd>/output``)."""
+        if "env" not in message:
+            return None
+        cwd = Path(message.get("cwd") or Path.cwd())
+        output_dir = cwd / message["env"].get("OUTPUT_DIR", "output")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return output_dir
+
+    async def _run(self, message: Dict[str, Any], writer: asyncio.StreamWriter) -> Any:
+        """Wykonuje żądanie w wątku, przesyłając na bieżąco jego logi do klienta."""
+        from loguru import logger
+
+        loop = asyncio.get_running_loop()
+        client_id = next(self._client_ids)
+        output_dir = self._output_dir(message)
+        environ = message.get("env")
+
+        def forward(log_message) -> None:
+            record = log_message.record
+            data = _encode({
+                "type": "log",
+                "level": record["level"].name,
+                "message": record["message"],
+            })
+            loop.call_soon_threadsafe(writer.write, data)
+
+        def work() -> Any:
+            with logger.contextualize(dun_client=client_id):
+                config = self.engine.prepare_processor(
+                    message["request"], use_cache=message.get("use_cache", True)
+                )
+                return self.engine.execute_processor(
+                    config, output_dir=output_dir, environ=environ
+                )
+
+        sink_id = logger.add(
+            forward,
+            level="INFO",
+            format="{message}",
+            filter=lambda record: record["extra"].get("dun_client") == client_id,
+        )
+        try:
+            future = loop.run_in_executor(None, work)
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=HEARTBEAT_INTERVAL)
+                if done:
+                    return future.result()
+                writer.write(_encode({"type": "heartbeat"}))
+        finally:
+            logger.remove(sink_id)
+
+
+def run_server(socket_path: Optional[Union[str, Path]] = None) -> int:
+    """Uruchamia demona na pierwszym planie (``dun serve``)."""
+    asyncio.run(DunServer(socket_path).serve_forever())
+    return 0
@@ -1,33 +1,287 @@
+import ast
 import importlib
+import importlib.metadata
+import importlib.util
 import inspect
-from typing import Optional, List
+import json
+import re
+import sys
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Tuple, Union
 
-class DynamicProcessorMapper:
-    """
-    Automatyczne mapowanie żądania do biblioteki Python i dynamiczna introspekcja jej interfejsu.
+from dun.config.settings import get_settings
+from dun.processor_engine_stdlib import installed_distributions, is_stdlib_module
+from dun.services.cache import DiskCache, make_key
+
+DEFAULT_KEYWORDS_FILE = Path(__file__).parent / "config" / "library_keywords.json"
+
+_WORD_PATTERN = re.compile(r"\w+")
+# Litery, których NFKD nie rozkłada na literę bazową i znak diakrytyczny
+_FOLD_TABLE = str.maketrans({"ł": "l", "ø": "o", "ß": "ss"})
+
+
+def fold_text(text: str) -> str:
+    """Zamienia tekst na małe litery bez znaków diakrytycznych ("Wiadomość" -> "wiadomosc")."""
+    decomposed = unicodedata.normalize("NFKD", text.lower().translate(_FOLD_TABLE))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def load_library_keywords(path: Optional[Union[str, Path]] = None) -> Dict[str, Dict[str, float]]:
+    """Wczytuje tabelę ``biblioteka -> {słowo kluczowe: waga}`` z pliku JSON.
+
+    Słowo kluczowe może być listą słów (waga 1) lub słownikiem z wagami.
+    Słowa kluczowe są traktowane jako rdzenie: pasują do każdego słowa
+    żądania, które od nich się zaczyna ("plik" -> "pliki", "plików").
     """
-    LIBRARY_KEYWORDS = {
-        "pandas": ["csv", "dataframe", "excel", "read_csv", "merge", "concat", "join", "plik"],
-        "imaplib": ["mail", "imap", "inbox", "email", "fetch", "login", "wiadomość", "skrzynka"],
-        "sqlite3": ["database", "sqlite", "query", "table", "insert", "select", "baza"],
-        "requests": ["http", "url", "get", "post", "download", "api", "żądanie"],
-        # Dodaj więcej bibliotek i słów kluczowych według potrzeb
+    if path is None:
+        path = get_settings().PROCESSOR_KEYWORDS_FILE or DEFAULT_KEYWORDS_FILE
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        lib: dict.fromkeys(keywords, 1.0) if isinstance(keywords, list) else dict(keywords)
+        for lib, keywords in data.items()
     }
 
-    def detect_library(self, request: str) -> Optional[str]:
-        req = request.lower()
-        for lib, keywords in self.LIBRARY_KEYWORDS.items():
-            if any(word in req for word in keywords):
-                return lib
+
+@dataclass(frozen=True)
+class LibraryMatch:
+    """Biblioteka dopasowana do żądania wraz z wynikiem i pewnością (0-1)."""
+    library: str
+    score: float
+    confidence: float
+    keywords: tuple
+
+
+class KeywordMatcher:
+    """Drzewo prefiksowe rdzeni słów kluczowych wszystkich bibliotek.
+
+    Każde słowo żądania jest przechodzone po drzewie raz, od początku słowa
+    (granica słowa), i dopasowuje najdłuższy pasujący rdzeń, więc czas
+    oceny jest liniowy względem długości żądania niezależnie od liczby
+    bibliotek i słów kluczowych.
+    """
+
+    _TERMINAL = ""  # klucz węzła z listą (biblioteka, waga, słowo kluczowe)
+
+    def __init__(self, keywords: Mapping[str, Mapping[str, float]]):
+        self.libraries = list(keywords)
+        self._root: dict = {}
+        for lib, weights in keywords.items():
+            for keyword, weight in weights.items():
+                node = self._root
+                for ch in fold_text(keyword):
+                    node = node.setdefault(ch, {})
+                node.setdefault(self._TERMINAL, []).append((lib, float(weight), keyword))
+
+    def _match_word(self, word: str) -> list:
+        node = self._root
+        matched: list = []
+        for ch in word:
+            node = node.get(ch)
+            if node is None:
+                break
+            matched = node.get(self._TERMINAL, matched)
+        return matched
+
+    def rank(self, text: str) -> List[LibraryMatch]:
+        """Ocenia wszystkie biblioteki w jednym przejściu po tekście."""
+        scores: Dict[str, float] = {}
+        hits: Dict[str, list] = {}
+        for word in _WORD_PATTERN.findall(fold_text(text)):
+            for lib, weight, keyword in self._match_word(word):
+                scores[lib] = scores.get(lib, 0.0) + weight
+                hits.setdefault(lib, []).append(keyword)
+
+        total = sum(scores.values())
+        order = {lib: i for i, lib in enumerate(self.libraries)}
+        ranked = sorted(scores, key=lambda lib: (-scores[lib], order[lib]))
+        return [
+            LibraryMatch(lib, scores[lib], scores[lib] / total, tuple(dict.fromkeys(hits[lib])))
+            for lib in ranked
+        ]
+
+
+def _literal_all(tree: ast.Module) -> Optional[List[str]]:
+    """Zwraca ``__all__`` modułu, jeśli jest literałem listy/krotki napisów."""
+    for node in tree.body:
+        if (
+            isinstance(node, ast.Assign)
+            and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets)
+            and isinstance(node.value, (ast.List, ast.Tuple))
+            and all(isinstance(e, ast.Constant) and isinstance(e.value, str) for e in node.value.elts)
+        ):
+            return [e.value for e in node.value.elts]
+    return None
+
+
+def _resolve_star_import(node: ast.ImportFrom, path: Path, package: str, package_dir: Optional[Path]) -> Optional[Path]:
+    """Zwraca plik modułu z ``from ... import *`` w obrębie tego samego pakietu."""
+    if package_dir is None:
         return None
+    if node.level:
+        base = path.parent
+        for _ in range(node.level - 1):
+            base = base.parent
+        parts = node.module.split(".") if node.module else []
+    elif node.module and node.module.startswith(package + "."):
+        base = package_dir
+        parts = node.module.split(".")[1:]
+    else:
+        return None
+    target = base.joinpath(*parts)
+    for candidate in (target.with_suffix(".py"), target / "__init__.py"):
+        if candidate.is_file():
+            return candidate
+    return None
 
-    def list_library_functions(self, library: str) -> List[str]:
+
+def scan_module_names(
+    path: Union[str, Path],
+    package: str,
+    package_dir: Optional[Path] = None,
+    _depth: int = 0,
+) -> List[str]:
+    """Statycznie (bez importu) wyznacza publiczne nazwy modułu.
+
+    Używa ``__all__``, jeśli jest literałem; w przeciwnym razie zbiera
+    funkcje, klasy i nazwy importowane na najwyższym poziomie modułu,
+    rozwijając ``from .moduł import *`` w obrębie pakietu.
+    """
+    path = Path(path)
+    tree = ast.parse(path.read_bytes(), filename=str(path))
+    exported = _literal_all(tree)
+    if exported is not None:
+        return sorted(set(exported))
+
+    names = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.append(node.name)
+        elif isinstance(node, ast.ImportFrom):
+            if any(alias.name == "*" for alias in node.names):
+                target = _resolve_star_import(node, path, package, package_dir)
+                if target is not None and _depth < 3:
+                    names.extend(scan_module_names(target, package, package_dir, _depth + 1))
+            else:
+                names.extend(alias.asname or alias.name for alias in node.names)
+    return sorted({name for name in names if not name.startswith("_")})
+
+
+class LibraryIndex:
+    """Trwały indeks funkcji i klas bibliotek w ``CACHE_DIR/introspection``.
+
+    Wpisy są kluczowane nazwą i wersją dystrybucji (dla biblioteki
+    standardowej: wersją Pythona), więc aktualizacja pakietu unieważnia
+    jego wpis. Moduły napisane w Pythonie są skanowane statycznie (AST),
+    import i ``inspect`` służą tylko dla modułów rozszerzeń.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache: Optional[DiskCache] = None):
+        self.cache = cache
+        self._memory: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_settings(cls) -> "LibraryIndex":
+        return cls(DiskCache.from_settings("introspection", max_entries=512))
+
+    @staticmethod
+    def _version(library: str, origin: Optional[str]) -> Tuple[str, str]:
+        """Zwraca (dystrybucja, wersja) identyfikujące zawartość biblioteki."""
+        if is_stdlib_module(library):
+            return "python", sys.version
+        for distribution in installed_distributions().get(library.split(".")[0], []):
+            try:
+                return distribution, importlib.metadata.version(distribution)
+            except importlib.metadata.PackageNotFoundError:
+                continue
+        # Moduł lokalny: wersją jest czas modyfikacji pliku
+        try:
+            return "local", str(Path(origin).stat().st_mtime_ns) if origin else ""
+        except OSError:
+            return "local", ""
+
+    def functions(self, library: str) -> List[str]:
+        """Zwraca nazwy funkcji i klas biblioteki (pusta lista, gdy jej brak)."""
+        if library in self._memory:
+            return self._memory[library]
+
+        # find_spec dla nazwy z kropką importowałby pakiet nadrzędny, więc
+        # szukany jest tylko pakiet najwyższego poziomu
+        top_level = library.split(".")[0]
+        try:
+            spec = importlib.util.find_spec(top_level)
+        except (ImportError, ValueError):
+            spec = None
+        if spec is None:
+            return []
+
+        key = make_key(library, *self._version(library, spec.origin), self.FORMAT_VERSION)
+        names = self.cache.get(key) if self.cache is not None else None
+        if names is None:
+            names = self._scan(library, spec if library == top_level else None)
+            if self.cache is not None:
+                self.cache.set(key, names)
+        self._memory[library] = names
+        return names
+
+    @staticmethod
+    def _scan(library: str, spec=None) -> List[str]:
+        origin = spec.origin if spec is not None else None
+        if origin and origin.endswith(".py"):
+            locations = spec.submodule_search_locations
+            package_dir = Path(list(locations)[0]) if locations else None
+            try:
+                return scan_module_names(origin, library, package_dir)
+            except (OSError, SyntaxError, ValueError):
+                pass
         try:
             mod = importlib.import_module(library)
             return [name for name, obj in inspect.getmembers(mod) if inspect.isfunction(obj) or inspect.isclass(obj)]
         except Exception:
             return []
 
+
+class DynamicProcessorMapper:
+    """
+    Automatyczne mapowanie żądania do biblioteki Python i dynamiczna introspekcja jej interfejsu.
+    """
+    # Tabela słów kluczowych (config/library_keywords.json lub PROCESSOR_KEYWORDS_FILE)
+    # i zbudowany z niej matcher są tworzone raz, przy ładowaniu klasy
+    LIBRARY_KEYWORDS = load_library_keywords()
+    _matcher = KeywordMatcher(LIBRARY_KEYWORDS)
+
+    def __init__(
+        self,
+        keywords: Optional[Mapping[str, Mapping[str, float]]] = None,
+        index: Optional[LibraryIndex] = None,
+    ):
+        if keywords is not None:
+            self.LIBRARY_KEYWORDS = dict(keywords)
+            self._matcher = KeywordMatcher(keywords)
+        self._index = index
+
+    @property
+    def index(self) -> LibraryIndex:
+        """Indeks introspekcji bibliotek (tworzony przy pierwszym użyciu)."""
+        if self._index is None:
+            self._index = LibraryIndex.from_settings()
+        return self._index
+
+    def rank_libraries(self, request: str) -> List[LibraryMatch]:
+        """Zwraca biblioteki pasujące do żądania, od najlepiej dopasowanej."""
+        return self._matcher.rank(request)
+
+    def detect_library(self, request: str) -> Optional[str]:
+        ranked = self.rank_libraries(request)
+        return ranked[0].library if ranked else None
+
+    def list_library_functions(self, library: str) -> List[str]:
+        return self.index.functions(library)
+
     def generate_debug_info(self, request: str) -> str:
         lib = self.detect_library(request)
         if not lib:
@@ -2,52 +2,31 @@
 Analizator LLM do interpretacji żądań w języku naturalnym.
 """
 
+import asyncio
+import hashlib
 import json
 import os
+import re
+import aiohttp
 import requests
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 from loguru import logger
+from pydantic import ValidationError
 from .processor_engine import ProcessorConfig
+from dun.config.settings import get_settings
 from dun.dynamic_processor_mapper import DynamicProcessorMapper
+from dun.services.cache import (
+    AsyncSingleFlight,
+    DiskCache,
+    SemanticCache,
+    SingleFlight,
+    make_key,
+)
+from dun.services.ollama import ollama_service
 
 
-class LLMAnalyzer:
-    """Analizator wykorzystujący LLM do interpretacji żądań."""
-
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "mistral:7b"):
-        self.base_url = base_url
-        self.model = model
-        self._check_ollama_connection()
-
-    def _check_ollama_connection(self):
-        """Sprawdza połączenie z Ollama."""
-        try:
-            response = requests.get(f"{self.base_url}/api/tags")
-            if response.status_code == 200:
-                logger.success("Połączenie z Ollama nawiązane")
-            else:
-                logger.warning("Ollama niedostępna, używanie domyślnych szablonów")
-        except requests.RequestException:
-            logger.warning("Nie można połączyć się z Ollama, używanie domyślnych szablonów")
-
-    def analyze_request(self, request: str) -> ProcessorConfig:
-        """Analizuje żądanie i zwraca konfigurację procesora."""
-        self.last_request = request  # Store the last request for processing
-
-        # Spróbuj użyć LLM jeśli dostępny
-        if os.getenv("OLLAMA_ENABLED", "false").lower() == "true":
-            try:
-                return self._analyze_with_llm(request)
-            except Exception as e:
-                logger.warning(f"LLM niedostępny ({e}), używanie domyślnego procesora")
-        
-        # Dynamicznie wybierz domyślny procesor na podstawie treści żądania
-        return self._get_default_processor()
-
-    def _analyze_with_llm(self, request: str) -> ProcessorConfig:
-        """Analizuje żądanie za pomocą LLM."""
-
-        prompt = f"""
+PROMPT_TEMPLATE = """
 Przeanalizuj poniższe żądanie i zwróć konfigurację procesora danych w formacie JSON.
 
 Żądanie: {request}
@@ -69,9 +48,169 @@ Kod powinien:
 5. Obsługiwać błędy
 """
 
-        payload = {
+# Zmiana szablonu promptu unieważnia wpisy w cache analiz
+PROMPT_HASH = hashlib.sha256(PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_request(request: str) -> str:
+    """Normalizuje treść żądania na potrzeby kluczy cache."""
+    return re.sub(r"\s+", " ", request).strip()
+
+
+# Ścieżki, nazwy plików, liczby i fragmenty w cudzysłowach - żądania różniące
+# się nimi nie mogą współdzielić analizy z cache semantycznego, bo
+# wygenerowany kod zwykle zawiera je na stałe
+_ANCHOR_PATTERN = re.compile(
+    r'"[^"]*"|\'[^\']*\'|\S*[/\\]\S*|\S+\.[A-Za-z0-9]{1,5}\b|\d+'
+)
+
+
+def request_anchors(request: str) -> str:
+    """Zwraca konkretne wartości z żądania (ścieżki, pliki, liczby) jako tag cache."""
+    anchors = {
+        match.strip(".,;:!?") for match in _ANCHOR_PATTERN.findall(normalize_request(request))
+    }
+    return "|".join(sorted(anchor for anchor in anchors if anchor))
+
+
+def _run_sync(coro):
+    """Wykonuje korutynę z kodu synchronicznego (także wewnątrz działającej pętli)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class LLMAnalyzerBase:
+    """Część wspólna analizatorów: cache analiz, prompt i domyślne procesory.
+
+    Nie zawiera metod wykonujących wywołania sieciowe - te implementują
+    ``LLMAnalyzer`` (synchronicznie) i ``AsyncLLMAnalyzer`` (asynchronicznie).
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "mistral:7b",
+        cache: Optional[DiskCache] = None,
+        use_cache: bool = True,
+        semantic_cache: Optional[SemanticCache] = None,
+    ):
+        self.base_url = base_url
+        self.model = model
+        self.use_cache = use_cache
+        self.cache = cache if cache is not None else self._create_cache()
+        self.embedding_model = get_settings().LLM_EMBEDDING_MODEL or model
+        self.semantic_cache = (
+            semantic_cache if semantic_cache is not None else self._create_semantic_cache()
+        )
+
+    @staticmethod
+    def _create_cache() -> Optional[DiskCache]:
+        """Tworzy trwały cache analiz w CACHE_DIR (jeśli włączony)."""
+        settings = get_settings()
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+        return DiskCache.from_settings(
+            "llm_analysis",
+            ttl=settings.LLM_CACHE_TTL,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+
+    def _create_semantic_cache(self) -> Optional[SemanticCache]:
+        """Tworzy cache semantyczny (osobny dla modelu, promptu i modelu embeddingów)."""
+        settings = get_settings()
+        if not settings.LLM_SEMANTIC_CACHE_ENABLED:
+            return None
+        namespace = make_key(self.model, PROMPT_HASH, self.embedding_model)[:16]
+        return SemanticCache.from_settings(
+            f"llm_semantic/{namespace}",
+            threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+            max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+            ttl=settings.LLM_CACHE_TTL,
+        )
+
+    @staticmethod
+    def _llm_enabled() -> bool:
+        return os.getenv("OLLAMA_ENABLED", "false").lower() == "true"
+
+    def cache_key(self, request: str) -> str:
+        """Klucz cache: znormalizowane żądanie, model i hash szablonu promptu."""
+        return make_key(normalize_request(request), self.model, PROMPT_HASH)
+
+    def _flight_key(self, request: str, use_cache: Optional[bool]) -> str:
+        """Klucz łączenia równoległych wywołań.
+
+        Zawiera ``use_cache``, żeby żądanie omijające cache nigdy nie
+        dostało wyniku wywołania, które z cache skorzystało (i odwrotnie).
+        """
+        if use_cache is None:
+            use_cache = self.use_cache
+        return make_key(self.cache_key(request), use_cache)
+
+    @staticmethod
+    def _validate_cached(data: Any) -> Optional[ProcessorConfig]:
+        """Zwraca zwalidowaną konfigurację z wpisu cache lub None."""
+        if data is None:
+            return None
+        try:
+            return ProcessorConfig.model_validate(data)
+        except ValidationError as e:
+            logger.warning(f"Nieprawidłowy wpis w cache analiz ({e}), pomijanie")
+            return None
+
+    def _get_cached(self, key: str) -> Optional[ProcessorConfig]:
+        """Zwraca zwalidowaną konfigurację z cache lub None."""
+        config = self._validate_cached(self.cache.get(key))
+        if config is None:
+            self.cache.delete(key)
+        return config
+
+    def _lookup_semantic(self, embedding: List[float], request: str) -> Optional[ProcessorConfig]:
+        """Szuka konfiguracji zapisanej dla podobnego żądania.
+
+        Pod uwagę brane są tylko żądania z tymi samymi ścieżkami, nazwami
+        plików i liczbami (``request_anchors``).
+        """
+        hit = self.semantic_cache.lookup(embedding, tag=request_anchors(request))
+        if hit is None:
+            return None
+        data, similarity = hit
+        config = self._validate_cached(data)
+        if config is not None:
+            logger.info(f"Użyto analizy podobnego żądania z cache (podobieństwo {similarity:.3f})")
+        return config
+
+    def _lookup_exact(self, key: str, use_cache: bool) -> Optional[ProcessorConfig]:
+        """Szuka konfiguracji zapisanej dla identycznego żądania."""
+        if not use_cache or self.cache is None:
+            return None
+        config = self._get_cached(key)
+        if config is not None:
+            logger.info(f"Użyto zapisanej analizy żądania z cache ({key[:12]})")
+        return config
+
+    def _store(
+        self,
+        key: str,
+        embedding: Optional[List[float]],
+        config: ProcessorConfig,
+        request: str = "",
+    ) -> None:
+        """Zapisuje wynik analizy w cache dokładnym i semantycznym."""
+        data = config.model_dump(mode="json")
+        if self.cache is not None:
+            self.cache.set(key, data)
+        if embedding is not None and self.semantic_cache is not None:
+            self.semantic_cache.add(embedding, data, tag=request_anchors(request))
+
+    def _build_payload(self, request: str) -> Dict[str, Any]:
+        """Buduje zapytanie /api/generate dla żądania."""
+        return {
             "model": self.model,
-            "prompt": prompt,
+            "prompt": PROMPT_TEMPLATE.format(request=request),
             "stream": False,
             "options": {
                 "temperature": 0.1,
@@ -79,14 +218,9 @@ Kod powinien:
             }
         }
 
-        response = requests.post(
-            f"{self.base_url}/api/generate",
-            json=payload,
-            timeout=60
-        )
-        response.raise_for_status()
-
-        result = response.json()
+    @staticmethod
+    def _parse_llm_response(result: Dict[str, Any]) -> ProcessorConfig:
+        """Wyodrębnia konfigurację procesora z odpowiedzi /api/generate."""
         response_text = result.get("response", "")
 
         # Wyodrębnij JSON z odpowiedzi
@@ -101,13 +235,15 @@ Kod powinien:
 
         return ProcessorConfig(**config_data)
 
-    def _get_default_processor(self) -> ProcessorConfig:
+    def _get_default_processor(self, request: Optional[str] = None) -> ProcessorConfig:
         """Zaawansowane mapowanie: wykryj bibliotekę i funkcje na podstawie żądania, generuj debug info."""
         mapper = DynamicProcessorMapper()
-        req = self.last_request or ""
+        req = request if request is not None else getattr(self, "last_request", None) or ""
         lib = mapper.detect_library(req)
-        debug_info = mapper.generate_debug_info(req)
-        logger.info(f"[DynamicProcessorMapper] {debug_info}")
+        logger.info(f"[DynamicProcessorMapper] Rozpoznana biblioteka: {lib or 'brak'}")
+        # Introspekcja biblioteki tylko na potrzeby logów debugowania
+        if get_settings().LOG_LEVEL.upper() == "DEBUG":
+            logger.debug(f"[DynamicProcessorMapper] {mapper.generate_debug_info(req)}")
         # Wybierz procesor na podstawie wykrytej biblioteki
         if lib == "imaplib":
             return self._get_imap_processor()
@@ -211,134 +347,104 @@ if not csv_files:
     logger.error(error_msg)
     raise ValueError(error_msg)
 
-# Wczytaj i połącz wszystkie pliki CSV
-logger.info("Rozpoczęcie wczytywania plików CSV...")
-dfs = []
-for file in csv_files:
-    try:
-        file_path = str(file)
-        logger.info(f"Przetwarzanie pliku: {file_path}")
-        logger.debug(f"Pełna ścieżka: {os.path.abspath(file_path)}")
-        
-        # Sprawdź rozmiar pliku
-        file_size = os.path.getsize(file_path)
-        logger.debug(f"Rozmiar pliku: {file_size} bajtów")
-        
-        # Wczytaj plik CSV
-        logger.debug("Wczytywanie danych CSV...")
-        df = pd.read_csv(file_path, encoding='utf-8', encoding_errors='replace')
-        
-        # Zaloguj informacje o wczytanych danych
-        logger.info(f"  Wczytano {len(df)} wierszy i {len(df.columns)} kolumn")
-        logger.debug(f"Nazwy kolumn: {list(df.columns)}")
-        if not df.empty:
-            sample_data = df.head(2).to_string()
-            logger.debug("Przykładowe dane:")
-            logger.debug(sample_data)
-        
-        dfs.append(df)
-        logger.debug(f"Dodano dane z pliku {file_path} do listy")
-        
-    except Exception as e:
-        error_msg = f"Błąd podczas przetwarzania pliku {file}: {str(e)}"
-        logger.error(error_msg, exc_info=True)  # Zapis pełnego śladu stosu
-        continue
-
-if not dfs:
-    error_msg = "Nie udało się wczytać żadnych danych z plików CSV"
-    logger.error(error_msg)
-    raise ValueError(error_msg)
-
-logger.info(f"Przygotowano {len(dfs)} ramek danych do połączenia")
-logger.debug(f"Rozmiary ramek: {[len(df) for df in dfs]}")
-
-# Połącz wszystkie ramki danych
-try:
-    logger.info("Rozpoczęcie łączenia ramek danych...")
-    combined_df = pd.concat(dfs, ignore_index=True)
-    logger.info(f"Pomyślnie połączono dane")
-    logger.info(f"Łączna liczba wierszy: {len(combined_df)}")
-    logger.info(f"Liczba kolumn: {len(combined_df.columns)}")
-    logger.debug(f"Nazwy kolumn po połączeniu: {list(combined_df.columns)}")
-    
-    if not combined_df.empty:
-        sample_combined = combined_df.head(2).to_string()
-        logger.debug("Przykładowe dane po połączeniu:")
-        logger.debug(sample_combined)
-    else:
-        logger.warning("Połączona ramka danych jest pusta")
-    
-    # Sprawdź czy są jakieś dane do zapisania
-    if combined_df.empty:
-        error_msg = "Brak danych do zapisania - połączona ramka danych jest pusta"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
-    
-    # Sprawdź czy są jakieś wiersze danych (pomijając nagłówek)
-    if len(combined_df) == 0:
-        error_msg = "Brak wierszy danych do zapisania"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
-    
-    # Sprawdź czy są jakieś kolumny
-    if len(combined_df.columns) == 0:
-        error_msg = "Brak kolumn w danych do zapisania"
-        logger.error(error_msg)
-        raise ValueError(error_msg)
-    
-    # Użyj już ustawionej ścieżki do pliku wyjściowego (może to być katalog tymczasowy)
-    if not use_temp_dir:
-        output_file = os.path.join(output_dir, 'combined.csv')
-    
+# Połącz pliki strumieniowo: dane wczytywane są fragmentami i od razu
+# dopisywane do pliku wyjściowego, więc nie trafiają naraz do pamięci
+from dun.services.processors.csv_stream import combine_csv_stream
+
+# Użyj już ustawionej ścieżki do pliku wyjściowego (może to być katalog tymczasowy)
+if not use_temp_dir:
+    output_file = os.path.join(output_dir, 'combined.csv')
+
+# Wynik poprzedniego uruchomienia, jeśli pliki wejściowe i wyjściowy się nie zmieniły
+from dun.services.cache import run_cache_from_settings
+
+run_cache = run_cache_from_settings()
+run_key = None
+result = None
+if run_cache is not None:
+    run_key = run_cache.key(
+        'csv_processor',
+        {'input_dir': os.path.abspath(input_dir), 'output_file': os.path.abspath(output_file)},
+        csv_files,
+    )
+    result = run_cache.get(run_key)
+
+if result is not None:
+    logger.info(f"Pliki wejściowe bez zmian, używam poprzedniego wyniku: {output_file}")
+else:
+    logger.info("Rozpoczęcie wczytywania i łączenia plików CSV...")
     logger.info(f"Zapisywanie połączonych danych do pliku: {output_file}")
     logger.debug(f"Pełna ścieżka do pliku: {os.path.abspath(output_file)}")
     logger.debug(f"Czy używam katalogu tymczasowego? {use_temp_dir}")
-    
+
     try:
         # Upewnij się, że katalog docelowy istnieje
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        
-        # Zapisz dane do pliku CSV
-        combined_df.to_csv(output_file, index=False)
-        
+    
+        try:
+            combined = combine_csv_stream(
+                csv_files,
+                output_file,
+                source_column=None,
+                read_kwargs={'encoding_errors': 'replace'},
+            )
+        except ValueError:
+            error_msg = "Nie udało się wczytać żadnych danych z plików CSV"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+    
+        for failed_file, error in combined.failed.items():
+            logger.error(f"Błąd podczas przetwarzania pliku {failed_file}: {error}")
+    
+        logger.info(f"Pomyślnie połączono dane z {len(combined.files)} plików")
+        logger.info(f"Łączna liczba wierszy: {combined.rows}")
+        logger.info(f"Liczba kolumn: {len(combined.columns)}")
+        logger.debug(f"Nazwy kolumn po połączeniu: {combined.columns}")
+    
+        # Sprawdź czy są jakieś dane do zapisania
+        if combined.rows == 0:
+            os.remove(output_file)
+            error_msg = "Brak danych do zapisania - połączona ramka danych jest pusta"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+    
         # Sprawdź czy plik został utworzony i nie jest pusty
         if not os.path.exists(output_file):
             error_msg = f"Nie udało się utworzyć pliku wyjściowego: {output_file}"
             logger.error(error_msg)
             raise IOError(error_msg)
-            
+        
         if os.path.getsize(output_file) == 0:
             error_msg = f"Plik wyjściowy jest pusty: {output_file}"
             logger.error(error_msg)
             raise IOError(error_msg)
-            
+        
         logger.success(f"Pomyślnie zapisano dane do pliku: {output_file}")
         logger.debug(f"Rozmiar zapisanego pliku: {os.path.getsize(output_file)} bajtów")
-        
+    
+        # Zwróć informacje o przetworzonych danych
+        result = {
+            "status": "success",
+            "input_files": [str(f) for f in csv_files],
+            "output_file": output_file,
+            "rows_processed": combined.rows,
+            "columns": combined.columns,
+            "sample_data": combined.sample
+        }
+    
     except Exception as e:
-        logger.error(f"Błąd podczas zapisywania pliku: {str(e)}")
+        logger.error(f"Błąd podczas łączenia i zapisywania danych: {str(e)}")
         raise
     
-    # Zwróć informacje o przetworzonych danych
-    result = {
-        "status": "success",
-        "input_files": [str(f) for f in csv_files],
-        "output_file": output_file,
-        "rows_processed": len(combined_df),
-        "columns": list(combined_df.columns),
-        "sample_data": combined_df.head(2).to_dict(orient='records') if not combined_df.empty else []
-    }
-    
-except Exception as e:
-    logger.error(f"Błąd podczas łączenia i zapisywania danych: {str(e)}")
-    raise
+    if run_cache is not None:
+        run_cache.set(run_key, result, outputs=[output_file])
 
 # Pokaż podsumowanie
 print('')
 print('='*50)
 print(f'Przetworzono {len(csv_files)} plików CSV')
-print(f'Łączna liczba wierszy: {len(combined_df)}')
-columns = ", ".join(combined_df.columns)
+print(f'Łączna liczba wierszy: {result["rows_processed"]}')
+columns = ", ".join(result["columns"])
 print(f'Kolumny: {columns}')
 print(f'Wynik zapisano w: {output_file}')
 print('='*50)
@@ -445,4 +551,288 @@ logger.success(f"Pobrano {len(downloaded_files)} wiadomości do {len(result['fol
             dependencies=["imaplib", "email"],
             parameters={},
             code_template=code_template
-        )
\ No newline at end of file
+        )
+
+
+class LLMAnalyzer(LLMAnalyzerBase):
+    """Analizator wykorzystujący LLM do interpretacji żądań."""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "mistral:7b",
+        cache: Optional[DiskCache] = None,
+        use_cache: bool = True,
+        semantic_cache: Optional[SemanticCache] = None,
+        embedding_service=None,
+    ):
+        super().__init__(
+            base_url=base_url,
+            model=model,
+            cache=cache,
+            use_cache=use_cache,
+            semantic_cache=semantic_cache,
+        )
+        self.embedding_service = embedding_service or ollama_service
+        self._single_flight = SingleFlight()
+        self._check_ollama_connection()
+
+    def _check_ollama_connection(self):
+        """Sprawdza połączenie z Ollama."""
+        try:
+            response = requests.get(f"{self.base_url}/api/tags")
+            if response.status_code == 200:
+                logger.success("Połączenie z Ollama nawiązane")
+            else:
+                logger.warning("Ollama niedostępna, używanie domyślnych szablonów")
+        except requests.RequestException:
+            logger.warning("Nie można połączyć się z Ollama, używanie domyślnych szablonów")
+
+    def analyze_request(self, request: str, use_cache: Optional[bool] = None) -> ProcessorConfig:
+        """Analizuje żądanie i zwraca konfigurację procesora.
+
+        Wyniki LLM są zapisywane w trwałym cache; ``use_cache=False`` pomija
+        odczyt z cache (świeży wynik nadal zostaje zapisany).
+        """
+        self.last_request = request  # Store the last request for processing
+
+        # Spróbuj użyć LLM jeśli dostępny; identyczne równoległe żądania
+        # czekają na jedno wspólne wywołanie
+        if self._llm_enabled():
+            try:
+                return self._single_flight.do(
+                    self._flight_key(request, use_cache), self._analyze_with_cache, request, use_cache
+                )
+            except Exception as e:
+                logger.warning(f"LLM niedostępny ({e}), używanie domyślnego procesora")
+        
+        # Dynamicznie wybierz domyślny procesor na podstawie treści żądania
+        return self._get_default_processor(request)
+
+    @property
+    def coalescing_stats(self) -> Dict[str, int]:
+        """Liczniki wywołań: wszystkie, faktycznie wykonane i połączone z trwającymi."""
+        return self._single_flight.stats
+
+    def _embed(self, request: str) -> Optional[List[float]]:
+        """Zwraca embedding żądania lub None, jeśli usługa jest niedostępna."""
+        try:
+            embedding = _run_sync(self.embedding_service.embeddings(
+                normalize_request(request), model=self.embedding_model
+            ))
+        except Exception as e:
+            logger.debug(f"Embedding niedostępny ({e}), pomijanie cache semantycznego")
+            return None
+        return embedding or None
+
+    def _analyze_with_cache(self, request: str, use_cache: Optional[bool] = None) -> ProcessorConfig:
+        """Analizuje żądanie przez LLM, korzystając z trwałego cache.
+
+        Kolejność: dokładne dopasowanie, podobne żądanie (embedding), wywołanie LLM.
+        """
+        if use_cache is None:
+            use_cache = self.use_cache
+
+        key = self.cache_key(request)
+        config = self._lookup_exact(key, use_cache)
+        if config is not None:
+            return config
+
+        embedding = self._embed(request) if self.semantic_cache is not None else None
+        if use_cache and embedding is not None:
+            config = self._lookup_semantic(embedding, request)
+            if config is not None:
+                self._store(key, None, config)
+                return config
+
+        config = self._analyze_with_llm(request)
+        self._store(key, embedding, config, request)
+        return config
+
+    def _analyze_with_llm(self, request: str) -> ProcessorConfig:
+        """Analizuje żądanie za pomocą LLM."""
+        response = requests.post(
+            f"{self.base_url}/api/generate",
+            json=self._build_payload(request),
+            timeout=60
+        )
+        response.raise_for_status()
+        return self._parse_llm_response(response.json())
+
+
+class AsyncLLMAnalyzer(LLMAnalyzerBase):
+    """Asynchroniczny analizator LLM ze współdzieloną pulą połączeń aiohttp.
+
+    Wszystkie wywołania Ollama (analiza i embeddingi) korzystają z jednej
+    sesji ``aiohttp.ClientSession`` z połączeniami keep-alive, ograniczeniem
+    liczby połączeń (łącznie i na host) oraz konfigurowalnymi limitami czasu.
+    Cache analiz działa tak samo jak w ``LLMAnalyzer``, a operacje na plikach
+    cache wykonywane są w wątkach, żeby nie blokować pętli zdarzeń.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "mistral:7b",
+        cache: Optional[DiskCache] = None,
+        use_cache: bool = True,
+        semantic_cache: Optional[SemanticCache] = None,
+        max_connections: Optional[int] = None,
+        max_connections_per_host: Optional[int] = None,
+        timeout: float = 60,
+        connect_timeout: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.max_connections = max_connections or settings.OLLAMA_MAX_CONNECTIONS
+        self.max_connections_per_host = (
+            max_connections_per_host or settings.OLLAMA_MAX_CONNECTIONS_PER_HOST
+        )
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout or settings.OLLAMA_CONNECT_TIMEOUT
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock: Optional[asyncio.Lock] = None
+        self._async_single_flight = AsyncSingleFlight()
+        super().__init__(
+            base_url=base_url,
+            model=model,
+            cache=cache,
+            use_cache=use_cache,
+            semantic_cache=semantic_cache,
+        )
+
+    @property
+    def name(self) -> str:
+        return "llm_analyzer"
+
+    @property
+    def coalescing_stats(self) -> Dict[str, int]:
+        return self._async_single_flight.stats
+
+    @property
+    def is_available(self) -> bool:
+        return self._llm_enabled()
+
+    async def initialize(self) -> None:
+        """Otwiera pulę połączeń i sprawdza dostępność Ollama."""
+        await self.check_connection()
+
+    async def shutdown(self) -> None:
+        """Zamyka pulę połączeń."""
+        await self.close()
+
+    async def __aenter__(self) -> "AsyncLLMAnalyzer":
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Zwraca współdzieloną sesję HTTP, tworząc ją przy pierwszym użyciu."""
+        if self._session_lock is None:
+            self._session_lock = asyncio.Lock()
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections_per_host,
+                    keepalive_timeout=30,
+                )
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=aiohttp.ClientTimeout(
+                        total=self.timeout, sock_connect=self.connect_timeout
+                    ),
+                )
+        return self._session
+
+    async def close(self) -> None:
+        """Zamyka sesję HTTP i zwalnia połączenia."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def check_connection(self) -> bool:
+        """Sprawdza połączenie z Ollama."""
+        session = await self._get_session()
+        try:
+            async with session.get(
+                f"{self.base_url}/api/tags",
+                timeout=aiohttp.ClientTimeout(total=self.connect_timeout),
+            ) as response:
+                if response.status == 200:
+                    logger.success("Połączenie z Ollama nawiązane")
+                    return True
+                logger.warning("Ollama niedostępna, używanie domyślnych szablonów")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            logger.warning("Nie można połączyć się z Ollama, używanie domyślnych szablonów")
+        return False
+
+    async def analyze_request(self, request: str, use_cache: Optional[bool] = None) -> ProcessorConfig:
+        """Analizuje żądanie i zwraca konfigurację procesora."""
+        self.last_request = request
+
+        if self._llm_enabled():
+            try:
+                return await self._async_single_flight.do(
+                    self._flight_key(request, use_cache), self._analyze_with_cache, request, use_cache
+                )
+            except Exception as e:
+                logger.warning(f"LLM niedostępny ({e}), używanie domyślnego procesora")
+
+        return self._get_default_processor(request)
+
+    async def analyze_many(
+        self, requests: List[str], use_cache: Optional[bool] = None
+    ) -> List[ProcessorConfig]:
+        """Analizuje wiele żądań współbieżnie (kolejność wyników jak w ``requests``)."""
+        return list(await asyncio.gather(
+            *(self.analyze_request(request, use_cache) for request in requests)
+        ))
+
+    async def _embed(self, request: str) -> Optional[List[float]]:
+        """Zwraca embedding żądania (/api/embeddings) lub None przy błędzie."""
+        session = await self._get_session()
+        try:
+            async with session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.embedding_model, "prompt": normalize_request(request)},
+            ) as response:
+                response.raise_for_status()
+                result = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.debug(f"Embedding niedostępny ({e}), pomijanie cache semantycznego")
+            return None
+        return result.get("embedding") or None
+
+    async def _analyze_with_cache(
+        self, request: str, use_cache: Optional[bool] = None
+    ) -> ProcessorConfig:
+        if use_cache is None:
+            use_cache = self.use_cache
+
+        key = self.cache_key(request)
+        config = await asyncio.to_thread(self._lookup_exact, key, use_cache)
+        if config is not None:
+            return config
+
+        embedding = await self._embed(request) if self.semantic_cache is not None else None
+        if use_cache and embedding is not None:
+            config = await asyncio.to_thread(self._lookup_semantic, embedding, request)
+            if config is not None:
+                await asyncio.to_thread(self._store, key, None, config, request)
+                return config
+
+        config = await self._analyze_with_llm(request)
+        await asyncio.to_thread(self._store, key, embedding, config, request)
+        return config
+
+    async def _analyze_with_llm(self, request: str) -> ProcessorConfig:
+        session = await self._get_session()
+        async with session.post(
+            f"{self.base_url}/api/generate",
+            json=self._build_payload(request),
+        ) as response:
+            response.raise_for_status()
+            result = await response.json(content_type=None)
+        return self._parse_llm_response(result)
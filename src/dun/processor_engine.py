@@ -5,8 +5,12 @@ Główny silnik procesora danych z dynamicznym zarządzaniem bibliotekami.
 import os
 import sys
 import subprocess
+import threading
+import hashlib
 import importlib
+import importlib.util
 import json
+import tempfile
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 from loguru import logger
@@ -22,51 +26,196 @@ class ProcessorConfig(BaseModel):
     code_template: str
 
 
-from dun.processor_engine_stdlib import is_stdlib_module
+from dun.processor_engine_stdlib import (
+    distribution_name,
+    is_installed,
+    is_stdlib_module,
+    refresh_index,
+)
+from dun.config.settings import PROCESSOR_ENV_PREFIXES, get_settings
+from dun.services.cache import CodeCache
 
 class DynamicPackageManager:
-    """Menedżer dynamicznego instalowania pakietów."""
+    """Menedżer dynamicznego instalowania pakietów.
 
-    def __init__(self):
-        self.installed_packages = set()
+    Zależności procesora są sprawdzane razem (indeks biblioteki standardowej
+    i zainstalowanych dystrybucji, a dla pozostałych ``importlib.util.find_spec``),
+    a brakujące instalowane jednym wywołaniem pip z lokalnym cache pakietów
+    w ``CACHE_DIR/pip``. Nazwy importu (np. ``sklearn``) są zamieniane na
+    nazwy dystrybucji (``scikit-learn``). Nazwy pakietów, które
+    okazały się dostępne, są zapisywane w indeksie ``CACHE_DIR/packages``
+    (osobnym dla każdego środowiska Pythona), więc kolejne uruchomienia nie
+    sprawdzają ich ponownie.
+    """
 
-    def install_package(self, package_name: str) -> bool:
-        """Instaluje pakiet jeśli nie jest zainstalowany."""
-        if package_name in self.installed_packages:
-            return True
-        if is_stdlib_module(package_name):
-            logger.info(f"Pominięto instalację pakietu standardowej biblioteki: {package_name}")
-            self.installed_packages.add(package_name)
-            return True
+    def __init__(self, cache_dir: Optional[Path] = None):
+        cache_dir = Path(cache_dir) if cache_dir is not None else get_settings().CACHE_DIR
+        self.pip_cache_dir = cache_dir / "pip"
+        environment = hashlib.sha256(f"{sys.prefix}\0{sys.version}".encode("utf-8")).hexdigest()
+        self.index_path = cache_dir / "packages" / f"{environment[:16]}.json"
+        self.installed_packages = self._load_index()
+        # pip nie może działać równolegle w tym samym środowisku, a wątki
+        # przetwarzania wsadowego instalują zależności jednocześnie
+        self._lock = threading.Lock()
+
+    def _load_index(self) -> set:
         try:
-            logger.info(f"Instalowanie pakietu: {package_name}")
-            subprocess.check_call([
-                sys.executable, "-m", "pip", "install", package_name
-            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self.installed_packages.add(package_name)
-            logger.success(f"Pakiet {package_name} zainstalowany pomyślnie")
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return set(json.load(f))
+        except FileNotFoundError:
+            return set()
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Pominięto uszkodzony indeks pakietów {self.index_path}: {e}")
+            return set()
+
+    def _save_index(self) -> None:
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.index_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(sorted(self.installed_packages), f)
+            os.replace(tmp_name, self.index_path)
+        except OSError as e:
+            logger.warning(f"Nie można zapisać indeksu pakietów: {e}")
+
+    @staticmethod
+    def is_available(package_name: str) -> bool:
+        """Sprawdza bez importowania, czy moduł lub dystrybucja jest zainstalowana."""
+        if is_installed(package_name):
             return True
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Błąd instalacji pakietu {package_name}: {e}")
+        try:
+            return importlib.util.find_spec(package_name) is not None
+        except (ImportError, ValueError):
             return False
 
+    def missing_packages(self, package_names: List[str]) -> List[str]:
+        """Zwraca (bez duplikatów) pakiety, których brakuje w środowisku."""
+        missing = []
+        found = False
+        for name in dict.fromkeys(package_names):
+            if name in self.installed_packages:
+                continue
+            if is_stdlib_module(name):
+                logger.info(f"Pominięto instalację pakietu standardowej biblioteki: {name}")
+            elif not self.is_available(name):
+                missing.append(name)
+                continue
+            self.installed_packages.add(name)
+            found = True
+        if found:
+            self._save_index()
+        return missing
+
+    def _pip_install(self, package_names: List[str]) -> None:
+        distributions = [distribution_name(name) for name in package_names]
+        subprocess.check_call([
+            sys.executable, "-m", "pip", "install",
+            "--cache-dir", str(self.pip_cache_dir), *distributions,
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def install_packages(self, package_names: List[str]) -> bool:
+        """Instaluje brakujące pakiety jednym wywołaniem pip.
+
+        Gdy wspólna instalacja się nie powiedzie, pakiety są instalowane
+        pojedynczo, żeby jedna błędna nazwa nie blokowała pozostałych.
+        Zwraca ``True``, gdy wszystkie pakiety są dostępne.
+        """
+        with self._lock:
+            missing = self.missing_packages(package_names)
+            if not missing:
+                return True
+
+            logger.info(f"Instalowanie pakietów: {', '.join(missing)}")
+            try:
+                self._pip_install(missing)
+                installed = missing
+            except subprocess.CalledProcessError as e:
+                if len(missing) == 1:
+                    logger.error(f"Błąd instalacji pakietu {missing[0]}: {e}")
+                    return False
+                installed = []
+                for name in missing:
+                    try:
+                        self._pip_install([name])
+                        installed.append(name)
+                    except subprocess.CalledProcessError as e:
+                        logger.error(f"Błąd instalacji pakietu {name}: {e}")
+
+            importlib.invalidate_caches()
+            refresh_index()
+            self.installed_packages.update(installed)
+            self._save_index()
+            if installed:
+                logger.success(f"Zainstalowano pakiety: {', '.join(installed)}")
+            return len(installed) == len(missing)
+
+    def install_package(self, package_name: str) -> bool:
+        """Instaluje pakiet jeśli nie jest zainstalowany."""
+        return self.install_packages([package_name])
+
     def import_module(self, module_name: str):
         """Importuje moduł po ewentualnej instalacji."""
         try:
             return importlib.import_module(module_name)
         except ImportError:
+            # Indeks mógł być nieaktualny (np. pakiet odinstalowano)
+            with self._lock:
+                if module_name in self.installed_packages:
+                    self.installed_packages.discard(module_name)
+                    self._save_index()
             # Spróbuj zainstalować i zaimportować ponownie
             if self.install_package(module_name):
                 return importlib.import_module(module_name)
             raise
 
 
+def processor_environ(environ: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Zwraca zmienne środowiskowe udostępniane procesorom."""
+    environ = os.environ if environ is None else environ
+    return {key: value for key, value in environ.items() if key.startswith(PROCESSOR_ENV_PREFIXES)}
+
+
+def build_execution_context(
+    output_dir: str,
+    package_manager: DynamicPackageManager,
+    environ: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Przygotowuje przestrzeń nazw, w której wykonywany jest kod procesora."""
+
+    # Import required modules
+    import pandas as pd
+
+    # Prepare execution context with all necessary modules and variables
+    execution_context = {
+        'os': os,
+        'sys': sys,
+        'pd': pd,
+        'Path': Path,
+        'logger': logger,
+        'output_dir': output_dir,
+        'package_manager': package_manager,
+        'result': None,  # Will store the final result
+    }
+
+    # Add environment variables to context
+    for key, value in processor_environ(environ).items():
+        execution_context[key.lower()] = value
+
+    return execution_context
+
+
 class ProcessorEngine:
     """Główny silnik procesora danych."""
 
-    def __init__(self, llm_analyzer):
+    def __init__(self, llm_analyzer, code_cache: Optional[CodeCache] = None, worker_pool=None):
         self.llm_analyzer = llm_analyzer
         self.package_manager = DynamicPackageManager()
+        # Skompilowane (i zwalidowane) szablony kodu procesorów
+        self.code_cache = code_cache if code_cache is not None else CodeCache.from_settings()
+
+        # Opcjonalna pula rozgrzanych procesów roboczych; tworzą ją tylko
+        # długo działające procesy (``dun serve``, ``dun batch``)
+        self.worker_pool = worker_pool
         
         # Get output directory from environment or use default
         output_dir = os.getenv("OUTPUT_DIR")
@@ -81,49 +230,71 @@ class ProcessorEngine:
 
     def process_natural_request(self, request: str) -> Dict[str, Any]:
         """Przetwarza żądanie w języku naturalnym."""
+        processor_config = self.prepare_processor(request)
+
+        # 3. Wykonaj kod procesora
+        return self.execute_processor(processor_config)
+
+    def prepare_processor(self, request: str, use_cache: Optional[bool] = None) -> ProcessorConfig:
+        """Analizuje żądanie i instaluje zależności procesora (bez wykonania).
+
+        ``use_cache`` nadpisuje ustawienie cache analizatora dla tego żądania.
+        """
 
         # 1. Przeanalizuj żądanie za pomocą LLM
         logger.info("Analizowanie żądania za pomocą LLM...")
-        processor_config = self.llm_analyzer.analyze_request(request)
+        if use_cache is None:
+            processor_config = self.llm_analyzer.analyze_request(request)
+        else:
+            processor_config = self.llm_analyzer.analyze_request(request, use_cache=use_cache)
 
         # 2. Zainstaluj wymagane biblioteki
         logger.info("Instalowanie wymaganych bibliotek...")
-        for dependency in processor_config.dependencies:
-            self.package_manager.install_package(dependency)
+        self.package_manager.install_packages(processor_config.dependencies)
 
-        # 3. Wykonaj kod procesora
+        return processor_config
+
+    def execute_processor(
+        self,
+        config: ProcessorConfig,
+        output_dir: Optional[Path] = None,
+        environ: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """Wykonuje przygotowany procesor danych.
+
+        ``output_dir`` i ``environ`` pozwalają wykonać procesor z katalogiem
+        wyjściowym i zmiennymi środowiskowymi innego procesu (np. klienta demona).
+        """
         logger.info("Wykonywanie procesora danych...")
-        return self._execute_processor(processor_config)
+        return self._execute_processor(config, output_dir=output_dir, environ=environ)
 
-    def _execute_processor(self, config: ProcessorConfig) -> Dict[str, Any]:
+    def close(self) -> None:
+        """Zatrzymuje pulę procesów roboczych (jeśli używana)."""
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
+    def _execute_processor(
+        self,
+        config: ProcessorConfig,
+        output_dir: Optional[Path] = None,
+        environ: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
         """Wykonuje procesor danych na podstawie konfiguracji."""
+        output_dir = str(output_dir or self.output_dir)
 
-        # Import required modules
-        import os
-        import sys
-        import pandas as pd
-        from pathlib import Path
-        
-        # Prepare execution context with all necessary modules and variables
-        execution_context = {
-            'os': os,
-            'sys': sys,
-            'pd': pd,
-            'Path': Path,
-            'logger': logger,
-            'output_dir': str(self.output_dir),
-            'package_manager': self.package_manager,
-            'result': None,  # Will store the final result
-        }
-
-        # Add environment variables to context
-        for key, value in os.environ.items():
-            if key.startswith(('IMAP_', 'EMAIL_', 'SMTP_')):
-                execution_context[key.lower()] = value
-
-        # Wykonaj kod
+        # Wykonaj kod (kompilacja i walidacja tylko przy pierwszym użyciu szablonu)
         try:
-            exec(config.code_template, execution_context)
+            code = self.code_cache.get(config.code_template)
+
+            if self.worker_pool is not None:
+                return self.worker_pool.execute(
+                    code, output_dir, env=processor_environ(environ)
+                )
+
+            execution_context = build_execution_context(
+                output_dir, self.package_manager, environ=environ
+            )
+            exec(code, execution_context)
 
             # Pobierz wynik z kontekstu
             result = execution_context.get('result', {'status': 'completed'})
@@ -1,16 +1,85 @@
-# List of Python standard library modules (partial, most common for data/workflow)
-# This can be extended or replaced with sys.stdlib_module_names in Python 3.10+
-PYTHON_STDLIB = set([
-    'abc', 'argparse', 'array', 'asyncio', 'base64', 'binascii', 'calendar', 'collections', 'concurrent',
-    'contextlib', 'copy', 'csv', 'ctypes', 'datetime', 'decimal', 'difflib', 'dis', 'email', 'enum',
-    'functools', 'getopt', 'getpass', 'gettext', 'glob', 'gzip', 'hashlib', 'heapq', 'hmac', 'imaplib',
-    'importlib', 'inspect', 'io', 'itertools', 'json', 'logging', 'lzma', 'math', 'multiprocessing',
-    'os', 'pathlib', 'pickle', 'platform', 'plistlib', 'queue', 'random', 're', 'sched', 'secrets',
-    'shutil', 'signal', 'site', 'smtplib', 'socket', 'sqlite3', 'ssl', 'stat', 'statistics', 'string',
-    'struct', 'subprocess', 'sys', 'tempfile', 'textwrap', 'threading', 'time', 'timeit', 'traceback',
-    'types', 'typing', 'unicodedata', 'uuid', 'warnings', 'weakref', 'xml', 'zipfile',
-])
+"""Stdlib and import-name -> distribution lookups for the package manager."""
+import functools
+import importlib.metadata
+import sys
+from typing import Dict, FrozenSet, List
+
+# Exact list of top-level standard library modules for the running interpreter
+PYTHON_STDLIB: FrozenSet[str] = frozenset(sys.stdlib_module_names)
+
+# Import names commonly suggested by the LLM whose distribution is named
+# differently on PyPI (used when the package is not installed yet)
+IMPORT_ALIASES: Dict[str, str] = {
+    "attr": "attrs",
+    "bs4": "beautifulsoup4",
+    "Crypto": "pycryptodome",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "fitz": "PyMuPDF",
+    "google.protobuf": "protobuf",
+    "jwt": "PyJWT",
+    "magic": "python-magic",
+    "MySQLdb": "mysqlclient",
+    "OpenSSL": "pyOpenSSL",
+    "PIL": "Pillow",
+    "pptx": "python-pptx",
+    "psycopg2": "psycopg2-binary",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "usb": "pyusb",
+    "win32api": "pywin32",
+    "yaml": "PyYAML",
+    "zmq": "pyzmq",
+}
+
+
+def _top_level(module_name: str) -> str:
+    return module_name.split('.')[0]
+
 
 def is_stdlib_module(module_name: str) -> bool:
     """Check if a module is part of the Python standard library."""
-    return module_name.split('.')[0] in PYTHON_STDLIB
+    return _top_level(module_name) in PYTHON_STDLIB
+
+
+@functools.lru_cache(maxsize=None)
+def installed_distributions() -> Dict[str, List[str]]:
+    """Map of importable top-level names to installed distributions (built once)."""
+    return importlib.metadata.packages_distributions()
+
+
+@functools.lru_cache(maxsize=None)
+def _installed_distribution_names() -> FrozenSet[str]:
+    return frozenset(
+        _normalize(name) for names in installed_distributions().values() for name in names
+    )
+
+
+def _normalize(distribution: str) -> str:
+    return distribution.lower().replace('_', '-').replace('.', '-')
+
+
+def refresh_index() -> None:
+    """Forget the installed-distribution index (e.g. after running pip)."""
+    installed_distributions.cache_clear()
+    _installed_distribution_names.cache_clear()
+
+
+def is_installed(name: str) -> bool:
+    """Check if ``name`` is an installed import name or distribution name."""
+    if _top_level(name) in installed_distributions():
+        return True
+    return _normalize(distribution_name(name)) in _installed_distribution_names()
+
+
+def distribution_name(name: str) -> str:
+    """Return the pip distribution providing the import name ``name``."""
+    if name in IMPORT_ALIASES:
+        return IMPORT_ALIASES[name]
+    distributions = installed_distributions().get(_top_level(name))
+    if distributions:
+        return distributions[0]
+    return IMPORT_ALIASES.get(_top_level(name), name)
@@ -0,0 +1,145 @@
+"""Persistent on-disk caches stored under ``CACHE_DIR``."""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Tuple, Union
+
+from dun.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """Build a stable cache key from arbitrary JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """JSON key/value store with TTL expiry and LRU eviction.
+
+    Every entry lives in its own file, so concurrent processes never see a
+    half-written value: writes go to a temporary file that is atomically
+    renamed into place. The file modification time doubles as the LRU
+    timestamp and is refreshed on every hit.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, name: str, **kwargs: Any) -> "DiskCache":
+        """Create a cache stored in a subdirectory of ``CACHE_DIR``."""
+        return cls(get_settings().CACHE_DIR / name, **kwargs)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value or ``default`` on a miss or expired entry."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path.name}: {e}")
+            self.delete(key)
+            return default
+
+        if self.ttl is not None and time.time() - entry.get("created_at", 0) > self.ttl:
+            self.delete(key)
+            return default
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value", default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value, evicting least recently used entries if needed."""
+        entry = {"created_at": time.time(), "value": value}
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_name, self._path(key))
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present."""
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    def _entries(self) -> List[Tuple[float, Path]]:
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self) -> int:
+        """Drop the least recently used entries above ``max_entries``."""
+        if self.max_entries is None:
+            return 0
+        entries = self._entries()
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        entries.sort()
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+        logger.debug(f"Evicted {excess} entries from {self.directory}")
+        return excess
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+
+_MISSING = object()
+
+from dun.services.cache.code import CodeCache, TemplateValidationError  # noqa: E402
+from dun.services.cache.frames import FrameCache, frame_cache_from_settings  # noqa: E402
+from dun.services.cache.run import RunCache, run_cache_from_settings  # noqa: E402
+from dun.services.cache.semantic import SemanticCache  # noqa: E402
+from dun.services.cache.single_flight import AsyncSingleFlight, SingleFlight  # noqa: E402
+
+__all__ = [
+    "AsyncSingleFlight",
+    "CodeCache",
+    "DiskCache",
+    "FrameCache",
+    "RunCache",
+    "SemanticCache",
+    "SingleFlight",
+    "TemplateValidationError",
+    "frame_cache_from_settings",
+    "make_key",
+    "run_cache_from_settings",
+]
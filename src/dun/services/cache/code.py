@@ -0,0 +1,233 @@
+"""Cache of compiled processor templates."""
+import ast
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from importlib.util import MAGIC_NUMBER
+from pathlib import Path
+from types import CodeType
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from dun.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+FORBIDDEN_CALLS = frozenset({"eval", "exec", "compile", "__import__", "breakpoint", "input"})
+FORBIDDEN_ATTRIBUTE_CALLS = frozenset({("os", "system"), ("os", "popen")})
+
+
+class TemplateValidationError(ValueError):
+    """Raised when a code template fails validation."""
+
+
+def validate_template(tree: ast.AST) -> None:
+    """Reject templates that call forbidden builtins or shell helpers."""
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in FORBIDDEN_CALLS:
+            name = func.id
+        elif (
+            isinstance(func, ast.Attribute)
+            and isinstance(func.value, ast.Name)
+            and (func.value.id, func.attr) in FORBIDDEN_ATTRIBUTE_CALLS
+        ):
+            name = f"{func.value.id}.{func.attr}"
+        else:
+            continue
+        raise TemplateValidationError(
+            f"Forbidden call to {name}() in template (line {node.lineno})"
+        )
+
+
+class CodeCache:
+    """Content-addressed cache of validated, compiled code templates.
+
+    Code objects are kept in an in-memory LRU and, optionally, marshalled
+    to ``<directory>/<cache_tag>/<sha256>.bin``. Each file starts with the
+    interpreter's bytecode magic number and the source hash, so entries
+    written by another Python version or stored under the wrong name are
+    ignored and recompiled. Templates are validated when an entry is
+    filled and, for entries read from disk, once per process before the
+    stored bytecode is first used; memory hits skip validation. At most
+    ``max_disk_entries`` files are kept, least recently used ones are
+    evicted first.
+    """
+
+    SUFFIX = ".bin"
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_entries: int = 128,
+        max_disk_entries: Optional[int] = 1024,
+    ):
+        self.directory = Path(directory) / sys.implementation.cache_tag if directory else None
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, CodeType]" = OrderedDict()
+        self._validated: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, name: str = "code", **kwargs: Any) -> "CodeCache":
+        """Create a cache stored in a subdirectory of ``CACHE_DIR``."""
+        settings = get_settings()
+        kwargs.setdefault("max_entries", settings.CODE_CACHE_MAX_ENTRIES)
+        kwargs.setdefault("max_disk_entries", settings.CODE_CACHE_MAX_DISK_ENTRIES)
+        return cls(settings.CACHE_DIR / name, **kwargs)
+
+    @staticmethod
+    def key(source: str) -> str:
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters: memory hits, disk hits and compilations."""
+        with self._lock:
+            return dict(self._stats)
+
+    def get(self, source: str) -> CodeType:
+        """Return the compiled code for ``source``, compiling it on first use.
+
+        Raises:
+            TemplateValidationError: If the template has a syntax error or
+                uses a forbidden construct.
+        """
+        key = self.key(source)
+        with self._lock:
+            code = self._entries.get(key)
+            if code is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return code
+
+        code = self._load(key)
+        if code is not None:
+            self._validate_once(source, key)
+            stat = "disk_hits"
+        else:
+            code = self._compile(source, key)
+            self._store(key, code)
+            stat = "misses"
+
+        with self._lock:
+            self._validated.add(key)
+            self._stats[stat] += 1
+            self._entries[key] = code
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return code
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        return f"<processor:{key[:12]}>"
+
+    @classmethod
+    def _parse(cls, source: str, key: str) -> ast.AST:
+        try:
+            tree = ast.parse(source, filename=cls._filename(key))
+        except SyntaxError as e:
+            raise TemplateValidationError(f"Invalid template syntax: {e}") from e
+        validate_template(tree)
+        return tree
+
+    @classmethod
+    def _compile(cls, source: str, key: str) -> CodeType:
+        return compile(cls._parse(source, key), cls._filename(key), "exec")
+
+    def _validate_once(self, source: str, key: str) -> None:
+        """Validate a template loaded from disk the first time this process uses it."""
+        with self._lock:
+            if key in self._validated:
+                return
+        self._parse(source, key)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.SUFFIX}"
+
+    def _load(self, key: str) -> Optional[CodeType]:
+        if self.directory is None:
+            return None
+        try:
+            data = self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Cannot read compiled template {key}: {e}")
+            return None
+        header = MAGIC_NUMBER + key.encode("ascii")
+        if not data.startswith(header):
+            return None
+        try:
+            code = marshal.loads(data[len(header):])
+        except (EOFError, ValueError, TypeError):
+            logger.warning(f"Discarding corrupted compiled template {key}")
+            self._path(key).unlink(missing_ok=True)
+            return None
+        if not isinstance(code, CodeType):
+            return None
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return code
+
+    def _store(self, key: str, code: CodeType) -> None:
+        if self.directory is None:
+            return
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC_NUMBER + key.encode("ascii") + marshal.dumps(code))
+            os.replace(tmp_name, self._path(key))
+        except OSError as e:
+            logger.warning(f"Cannot store compiled template {key}: {e}")
+            return
+        self.evict()
+
+    def _disk_entries(self) -> List[Tuple[float, Path]]:
+        entries = []
+        for path in self.directory.glob(f"*{self.SUFFIX}"):
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+        return entries
+
+    def evict(self) -> int:
+        """Drop the least recently used files above ``max_disk_entries``."""
+        if self.directory is None or self.max_disk_entries is None:
+            return 0
+        entries = self._disk_entries()
+        excess = len(entries) - self.max_disk_entries
+        if excess <= 0:
+            return 0
+        entries.sort()
+        for _, path in entries[:excess]:
+            path.unlink(missing_ok=True)
+        logger.debug(f"Evicted {excess} compiled templates from {self.directory}")
+        return excess
+
+    def clear(self) -> None:
+        """Remove all entries from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self._validated.clear()
+        if self.directory is not None:
+            for path in self.directory.glob(f"*{self.SUFFIX}"):
+                path.unlink(missing_ok=True)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,260 @@
+"""Columnar copies of parsed CSV files, so unchanged files are not parsed again.
+
+Every entry is a directory in ``CACHE_DIR/csv_frames`` keyed by the path,
+size and modification time of the CSV file and the options it was read
+with. It holds an uncompressed Feather file when ``pyarrow`` is installed
+and otherwise one ``.npy`` file per column:
+
+* NumPy columns (numbers, bools, dates) are stored as they are;
+* text columns are dictionary encoded (integer codes plus the distinct
+  values) when values repeat, else stored as a fixed-width string array
+  with a mask of the missing values;
+* categorical columns are stored as their codes and categories.
+
+Both formats are memory-mapped when read back, which skips the text
+parsing entirely. Frames with other column types (e.g. mixed objects or
+pandas extension dtypes) are not cached. The total size of all entries is
+capped; the least recently used entries are evicted first.
+"""
+import importlib.util
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from dun.config.settings import get_settings
+from dun.services.cache import make_key
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+FEATHER_FILE = "frame.feather"
+# Text columns with more distinct values than this share of the rows are stored as strings
+DICTIONARY_RATIO = 0.5
+
+
+def _dtype_key(dtype: Any) -> Any:
+    """Stable description of a ``dtype=`` option (categories are part of a categorical dtype)."""
+    if isinstance(dtype, dict):
+        return {str(name): _dtype_key(value) for name, value in dtype.items()}
+    if isinstance(dtype, pd.CategoricalDtype):
+        return ["category", [str(value) for value in dtype.categories], dtype.ordered]
+    return None if dtype is None else str(pd.api.types.pandas_dtype(dtype))
+
+
+def _code_dtype(size: int) -> np.dtype:
+    """Smallest signed integer type for codes ``-1 .. size - 1``."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _is_numpy(dtype: Any) -> bool:
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+def _is_text(column: pd.Series) -> bool:
+    return column.dtype == object and pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty")
+
+
+class FrameCache:
+    """Parsed CSV files stored column by column with a total size cap."""
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, directory: Union[str, Path], max_bytes: Optional[int] = None, arrow: Optional[bool] = None):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.arrow = importlib.util.find_spec("pyarrow") is not None if arrow is None else arrow
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls) -> "FrameCache":
+        settings = get_settings()
+        return cls(settings.CACHE_DIR / "csv_frames", max_bytes=settings.CSV_FRAME_CACHE_MAX_MB * 1024 * 1024)
+
+    def key(self, path: Union[str, Path], read_kwargs: Dict[str, Any]) -> str:
+        """Key of ``path`` as it is now; compute it before parsing so a concurrent change is not cached.
+
+        Raises:
+            OSError: If the file cannot be accessed.
+        """
+        stat = os.stat(path)
+        options = {name: _dtype_key(value) if name == "dtype" else value for name, value in read_kwargs.items()}
+        return make_key(str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns, options, self.FORMAT_VERSION)
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return the cached frame or ``None`` on a miss."""
+        entry = self.directory / key
+        try:
+            with open(entry / META_FILE, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            frame = self._load(entry, meta)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable frame cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        try:
+            os.utime(entry / META_FILE)
+        except OSError:
+            pass
+        return frame
+
+    def set(self, key: str, frame: pd.DataFrame) -> bool:
+        """Store ``frame``; False if its columns cannot be stored."""
+        if not isinstance(frame.index, pd.RangeIndex) or frame.index.start != 0 or frame.index.step != 1:
+            return False
+        tmp_dir = Path(tempfile.mkdtemp(dir=self.directory, prefix=".tmp-"))
+        try:
+            meta = self._store(tmp_dir, frame)
+            if meta is None:
+                return False
+            with open(tmp_dir / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.rename(tmp_dir, self.directory / key)
+        except OSError as e:
+            # Also when another process stored the same entry first
+            logger.debug(f"Not caching frame {key}: {e}")
+            return False
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+        return True
+
+    def _store(self, directory: Path, frame: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        meta: Dict[str, Any] = {"rows": len(frame), "columns": list(frame.columns)}
+        if self.arrow:
+            try:
+                frame.to_feather(directory / FEATHER_FILE, compression="uncompressed")
+            except Exception as e:
+                logger.debug(f"Cannot store frame as Feather: {e}")
+                return None
+            return dict(meta, format="feather")
+
+        encodings = []
+        for position, name in enumerate(frame.columns):
+            encoding = self._store_column(directory, str(position), frame.iloc[:, position])
+            if encoding is None:
+                logger.debug(f"Cannot store column {name!r} of type {frame.dtypes.iloc[position]}")
+                return None
+            encodings.append(encoding)
+        return dict(meta, format="npy", encodings=encodings)
+
+    @staticmethod
+    def _store_values(directory: Path, name: str, values: pd.Index) -> Optional[str]:
+        """Store distinct values (categories or a text dictionary); their kind, None if unsupported."""
+        if _is_numpy(values.dtype):
+            np.save(directory / f"{name}.values.npy", values.to_numpy(), allow_pickle=False)
+            return "numpy"
+        if values.dtype == object and pd.api.types.infer_dtype(values) in ("string", "empty"):
+            np.save(directory / f"{name}.values.npy", values.to_numpy(dtype=str), allow_pickle=False)
+            return "text"
+        return None
+
+    def _store_column(self, directory: Path, name: str, column: pd.Series) -> Optional[Dict[str, Any]]:
+        if _is_numpy(column.dtype):
+            np.save(directory / f"{name}.npy", column.to_numpy(), allow_pickle=False)
+            return {"kind": "numpy"}
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            values = self._store_values(directory, name, column.cat.categories)
+            if values is None:
+                return None
+            np.save(directory / f"{name}.npy", column.cat.codes.to_numpy(), allow_pickle=False)
+            return {"kind": "category", "values": values, "ordered": bool(column.cat.ordered)}
+        if not _is_text(column):
+            return None
+
+        codes, uniques = pd.factorize(column)
+        if len(uniques) <= DICTIONARY_RATIO * len(column):
+            np.save(directory / f"{name}.npy", codes.astype(_code_dtype(len(uniques))), allow_pickle=False)
+            self._store_values(directory, name, pd.Index(uniques, dtype=object))
+            return {"kind": "dictionary"}
+        missing = column.isna().to_numpy()
+        np.save(directory / f"{name}.npy", column.fillna("").to_numpy(dtype=str), allow_pickle=False)
+        if missing.any():
+            np.save(directory / f"{name}.na.npy", missing, allow_pickle=False)
+        return {"kind": "text", "missing": bool(missing.any())}
+
+    @staticmethod
+    def _load(entry: Path, meta: Dict[str, Any]) -> pd.DataFrame:
+        if meta["format"] == "feather":
+            return pd.read_feather(entry / FEATHER_FILE, memory_map=True)
+
+        columns = {}
+        for position, encoding in enumerate(meta["encodings"]):
+            data = np.load(entry / f"{position}.npy", mmap_mode="r", allow_pickle=False)
+            kind = encoding["kind"]
+            if kind in ("dictionary", "category"):
+                values = np.load(entry / f"{position}.values.npy", allow_pickle=False)
+                if encoding.get("values", "text") == "text":
+                    values = values.astype(object)
+                if kind == "category":
+                    columns[position] = pd.Categorical.from_codes(data, pd.Index(values), ordered=encoding["ordered"])
+                else:
+                    # Code -1 (missing) picks the trailing NaN
+                    columns[position] = np.append(values, np.nan)[data]
+            elif kind == "text":
+                values = data.astype(object)
+                if encoding["missing"]:
+                    values[np.load(entry / f"{position}.na.npy", allow_pickle=False)] = np.nan
+                columns[position] = values
+            else:
+                columns[position] = data
+        frame = pd.DataFrame(columns, index=pd.RangeIndex(meta["rows"]))
+        frame.columns = meta["columns"]
+        return frame
+
+    def _entries(self) -> List[Tuple[float, int, Path]]:
+        entries = []
+        for entry in self.directory.iterdir():
+            if entry.name.startswith("."):
+                continue
+            try:
+                used = (entry / META_FILE).stat().st_mtime
+                size = sum(file.stat().st_size for file in entry.iterdir())
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            entries.append((used, size, entry))
+        return entries
+
+    def evict(self) -> int:
+        """Drop the least recently used entries until the total size is within ``max_bytes``."""
+        if self.max_bytes is None:
+            return 0
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.debug(f"Evicted {evicted} frames from {self.directory}")
+        return evicted
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for entry in self.directory.iterdir():
+            shutil.rmtree(entry, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+
+def frame_cache_from_settings() -> Optional[FrameCache]:
+    """Create the frame cache, unless ``CSV_FRAME_CACHE_ENABLED`` is off."""
+    if not get_settings().CSV_FRAME_CACHE_ENABLED:
+        return None
+    return FrameCache.from_settings()
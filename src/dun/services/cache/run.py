@@ -0,0 +1,107 @@
+"""Cache of processor run results keyed by the fingerprints of their inputs."""
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from dun.config.settings import get_settings
+from dun.services.cache import DiskCache, make_key
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_fingerprint(path: Union[str, Path], content_hash: bool = False) -> List[Any]:
+    """Return ``[path, size, mtime_ns]`` of a file, plus its SHA-256 if ``content_hash``.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    fingerprint: List[Any] = [str(path), stat.st_size, stat.st_mtime_ns]
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        fingerprint.append(digest.hexdigest())
+    return fingerprint
+
+
+def _output_state(path: Union[str, Path]) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class RunCache:
+    """Results of processor runs whose inputs did not change.
+
+    An entry is keyed by the processor name, its parameters and the
+    fingerprint (path, size, modification time and optionally a content
+    hash) of every input file. It also records the size and modification
+    time of the files the run wrote, and is dropped as soon as one of
+    them is deleted or modified.
+    """
+
+    def __init__(self, cache: DiskCache, content_hash: bool = False):
+        self.cache = cache
+        self.content_hash = content_hash
+
+    @classmethod
+    def from_settings(cls) -> "RunCache":
+        settings = get_settings()
+        return cls(
+            DiskCache.from_settings("runs", max_entries=settings.RUN_CACHE_MAX_ENTRIES),
+            content_hash=settings.RUN_CACHE_HASH_CONTENT,
+        )
+
+    def key(
+        self,
+        processor: str,
+        parameters: Dict[str, Any],
+        inputs: Sequence[Union[str, Path]],
+    ) -> Optional[str]:
+        """Build the key of a run, or ``None`` if an input cannot be fingerprinted.
+
+        The order of ``inputs`` is part of the key.
+        """
+        try:
+            fingerprints = [file_fingerprint(path, self.content_hash) for path in inputs]
+        except OSError as e:
+            logger.debug(f"Not caching {processor} run: {e}")
+            return None
+        return make_key(processor, parameters, fingerprints, self.content_hash)
+
+    def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the cached result, or ``None`` if missing or an output has changed."""
+        if key is None:
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        for path, state in entry["outputs"].items():
+            if _output_state(path) != state:
+                logger.debug(f"Output {path} changed, dropping cached run")
+                self.cache.delete(key)
+                return None
+        return entry["result"]
+
+    def set(self, key: Optional[str], result: Dict[str, Any], outputs: Sequence[Union[str, Path]] = ()) -> None:
+        """Store the result of a run together with the state of the files it wrote."""
+        if key is None:
+            return
+        states = {str(Path(path).resolve()): _output_state(path) for path in outputs}
+        self.cache.set(key, {"result": result, "outputs": states})
+
+
+def run_cache_from_settings() -> Optional[RunCache]:
+    """Create the run cache, unless ``RUN_CACHE_ENABLED`` is off."""
+    if not get_settings().RUN_CACHE_ENABLED:
+        return None
+    return RunCache.from_settings()
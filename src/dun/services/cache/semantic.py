@@ -0,0 +1,245 @@
+"""Embedding-based cache for near-duplicate requests."""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking
+    fcntl = None
+
+from dun.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Nearest-neighbour cache keyed by request embeddings.
+
+    Embeddings are L2-normalized and kept in a memory-mapped ``.npy`` matrix,
+    so a lookup is a single matrix-vector product and cosine similarity is a
+    plain dot product. Values and bookkeeping live in a JSON sidecar that is
+    replaced atomically after the matrix has been flushed. When the cache is
+    full the oldest slot is overwritten.
+
+    Entries may carry a ``tag``; a lookup only matches entries with the same
+    tag. Entries older than ``ttl`` seconds are never returned. All
+    operations are serialized with a thread lock and, for writers in other
+    processes, an ``fcntl`` lock on a file in the cache directory.
+    """
+
+    MATRIX_FILE = "embeddings.npy"
+    META_FILE = "entries.json"
+    LOCK_FILE = ".lock"
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        initial_capacity: int = 64,
+        ttl: Optional[float] = None,
+    ):
+        self.directory = Path(directory)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.initial_capacity = initial_capacity
+        self.ttl = ttl
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._matrix: Optional[np.ndarray] = None
+        self._entries: List[Any] = []
+        self._next_slot = 0
+        self._meta_mtime: Optional[int] = None
+        with self._locked(shared=True):
+            self._load()
+
+    @classmethod
+    def from_settings(cls, name: str, **kwargs: Any) -> "SemanticCache":
+        """Create a cache stored in a subdirectory of ``CACHE_DIR``."""
+        return cls(get_settings().CACHE_DIR / name, **kwargs)
+
+    @property
+    def _matrix_path(self) -> Path:
+        return self.directory / self.MATRIX_FILE
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / self.META_FILE
+
+    @contextmanager
+    def _locked(self, shared: bool = False) -> Iterator[None]:
+        """Hold the thread lock and the cross-process file lock."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.directory / self.LOCK_FILE, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        """(Re)load the sidecar and map the embedding matrix."""
+        try:
+            mtime = self._meta_path.stat().st_mtime_ns
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            matrix = np.load(self._matrix_path, mmap_mode="r+")
+        except FileNotFoundError:
+            self._reset()
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable semantic cache in {self.directory}: {e}")
+            self._clear_files()
+            return
+
+        entries = meta.get("entries", [])
+        if matrix.ndim != 2 or len(entries) > matrix.shape[0]:
+            logger.warning(f"Discarding inconsistent semantic cache in {self.directory}")
+            self._clear_files()
+            return
+
+        self._matrix = matrix
+        self._entries = entries
+        self._next_slot = meta.get("next_slot", len(entries))
+        self._meta_mtime = mtime
+
+    def _refresh(self) -> None:
+        """Pick up entries written by other processes."""
+        try:
+            mtime = self._meta_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._meta_mtime is not None:
+                self._reset()
+            return
+        if mtime != self._meta_mtime:
+            self._load()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if not vector.size or norm == 0.0:
+            return None
+        return vector / norm
+
+    def lookup(
+        self, embedding: Sequence[float], tag: Optional[str] = None
+    ) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, similarity)`` of the closest live entry above the threshold."""
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+
+        with self._locked(shared=True):
+            self._refresh()
+            if self._matrix is None or not self._entries:
+                return None
+            if query.shape[0] != self._matrix.shape[1]:
+                return None
+
+            similarities = np.asarray(self._matrix[: len(self._entries)] @ query)
+            oldest = time.time() - self.ttl if self.ttl is not None else None
+            usable = np.array([
+                entry.get("tag") == tag
+                and (oldest is None or entry["created_at"] >= oldest)
+                for entry in self._entries
+            ])
+            if not usable.any():
+                return None
+            similarities = np.where(usable, similarities, -np.inf)
+            best = int(np.argmax(similarities))
+            score = float(similarities[best])
+            if score < self.threshold:
+                return None
+            return self._entries[best]["value"], score
+
+    def add(self, embedding: Sequence[float], value: Any, tag: Optional[str] = None) -> None:
+        """Store a value under the given embedding (and optional tag)."""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+
+        with self._locked():
+            # Under the exclusive lock the files are authoritative
+            self._load()
+            if self._matrix is not None and self._matrix.shape[1] != vector.shape[0]:
+                logger.warning("Embedding dimension changed, resetting semantic cache")
+                self._clear_files()
+
+            if self._next_slot >= self.max_entries:
+                self._next_slot = 0
+            slot = self._next_slot
+            self._ensure_capacity(slot + 1, vector.shape[0])
+
+            self._matrix[slot] = vector
+            self._matrix.flush()
+            entry = {"value": value, "created_at": time.time()}
+            if tag is not None:
+                entry["tag"] = tag
+            if slot < len(self._entries):
+                self._entries[slot] = entry
+            else:
+                self._entries.append(entry)
+            self._next_slot = slot + 1
+            self._write_meta()
+
+    def _ensure_capacity(self, size: int, dim: int) -> None:
+        """Grow the memory-mapped matrix geometrically."""
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if size <= capacity:
+            return
+
+        new_capacity = max(self.initial_capacity, capacity * 2, size)
+        new_capacity = min(new_capacity, max(self.max_entries, size))
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+        os.close(fd)
+        matrix = np.lib.format.open_memmap(
+            tmp_name, mode="w+", dtype=np.float32, shape=(new_capacity, dim)
+        )
+        if self._matrix is not None:
+            matrix[:capacity] = self._matrix
+        matrix.flush()
+        del matrix
+        os.replace(tmp_name, self._matrix_path)
+        self._matrix = np.load(self._matrix_path, mmap_mode="r+")
+
+    def _write_meta(self) -> None:
+        meta = {"entries": self._entries, "next_slot": self._next_slot}
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_name, self._meta_path)
+        self._meta_mtime = self._meta_path.stat().st_mtime_ns
+
+    def _reset(self) -> None:
+        self._matrix = None
+        self._entries = []
+        self._next_slot = 0
+        self._meta_mtime = None
+
+    def _clear_files(self) -> None:
+        self._reset()
+        self._meta_path.unlink(missing_ok=True)
+        self._matrix_path.unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._locked():
+            self._clear_files()
+
+    def __len__(self) -> int:
+        with self._locked(shared=True):
+            self._refresh()
+            return len(self._entries)
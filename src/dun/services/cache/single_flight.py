@@ -0,0 +1,89 @@
+"""Coalescing of identical in-flight calls ("single flight")."""
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share its result.
+
+    The first caller for a key executes the function, every caller arriving
+    while it is still running waits for the same outcome (result or
+    exception) instead of starting its own call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters: total calls, actual executions and coalesced calls."""
+        with self._lock:
+            return dict(self._stats)
+
+    def do(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call ``fn`` unless a call with the same key is already in flight."""
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._stats["executions"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of :class:`SingleFlight`.
+
+    The shared call runs in its own task, so cancelling one waiter does not
+    cancel the call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Counters: total calls, actual executions and coalesced calls."""
+        return dict(self._stats)
+
+    async def do(
+        self, key: str, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any
+    ) -> Any:
+        """Await ``fn`` unless a call with the same key is already in flight."""
+        self._stats["calls"] += 1
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self._stats["executions"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
@@ -0,0 +1,176 @@
+"""Streaming removal of duplicate rows across CSV files.
+
+Every row (or its ``columns`` subset) is reduced to a 128-bit fingerprint
+made of two independent ``pd.util.hash_pandas_object`` hashes, computed for
+a whole chunk at once. A fingerprint is looked up in
+
+* an in-memory Bloom filter, which answers "certainly new" for almost all
+  new rows without touching the disk, and
+* an exact set of all fingerprints seen so far, kept in an SQLite table in
+  a temporary directory, which is only queried for the few rows the Bloom
+  filter reports as possibly seen.
+
+Memory is the Bloom filter (about 1.2 bytes per expected row at a 1%
+false positive rate) plus SQLite's page cache, whatever the number of
+rows. Like ``drop_duplicates``, the first occurrence is kept and missing
+values are equal to each other.
+"""
+import logging
+import math
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 10_000_000
+DEFAULT_ERROR_RATE = 0.01
+# Second hash key (16 bytes, like pandas' default key) for the low 64 bits of a fingerprint
+SECOND_HASH_KEY = "dun-dedup-rows-2"
+# Fingerprints per ``IN (...)`` query, two SQL variables each
+LOOKUP_BATCH = 400
+# SQLite page cache of the exact set, in KiB
+CACHE_KIB = 65536
+
+
+def row_fingerprints(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Two independent 64-bit hashes of every row of ``frame``."""
+    high = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+    low = pd.util.hash_pandas_object(frame, index=False, hash_key=SECOND_HASH_KEY).to_numpy()
+    return high, low
+
+
+class BloomFilter:
+    """Bit array with ``k`` positions per item, derived from two hashes by double hashing."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, high: np.ndarray, low: np.ndarray) -> np.ndarray:
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            # Wrapping uint64 arithmetic is intended
+            positions = high[:, None] + steps * (low[:, None] | np.uint64(1))
+        return positions % np.uint64(self.size)
+
+    def add(self, high: np.ndarray, low: np.ndarray) -> None:
+        positions = self._positions(high, low).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+
+    def contains(self, high: np.ndarray, low: np.ndarray) -> np.ndarray:
+        """``False`` for items certainly never added; ``True`` may be a false positive."""
+        positions = self._positions(high, low)
+        bits = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+
+class DiskHashSet:
+    """Exact set of 128-bit fingerprints in an SQLite table."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.connection = sqlite3.connect(str(path))
+        # Scratch data: no journal, no fsync
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.execute(f"PRAGMA cache_size=-{CACHE_KIB}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen (high INTEGER, low INTEGER, PRIMARY KEY (high, low)) WITHOUT ROWID"
+        )
+
+    @staticmethod
+    def _pairs(high: np.ndarray, low: np.ndarray) -> List[Tuple[int, int]]:
+        # SQLite integers are signed
+        return list(zip(high.view(np.int64).tolist(), low.view(np.int64).tolist()))
+
+    def add(self, high: np.ndarray, low: np.ndarray) -> None:
+        # Inserting in key order keeps the B-tree writes sequential
+        order = np.lexsort((low.view(np.int64), high.view(np.int64)))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO seen VALUES (?, ?)", self._pairs(high[order], low[order])
+            )
+
+    def contains(self, high: np.ndarray, low: np.ndarray) -> np.ndarray:
+        pairs = self._pairs(high, low)
+        found: Set[Tuple[int, int]] = set()
+        for start in range(0, len(pairs), LOOKUP_BATCH):
+            batch = pairs[start:start + LOOKUP_BATCH]
+            values = ", ".join(["(?, ?)"] * len(batch))
+            rows = self.connection.execute(
+                f"SELECT high, low FROM seen WHERE (high, low) IN (VALUES {values})",
+                [value for pair in batch for value in pair],
+            )
+            found.update(rows)
+        return np.fromiter((pair in found for pair in pairs), dtype=bool, count=len(pairs))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class RowDeduplicator:
+    """Drops rows whose fingerprint was seen in an earlier chunk or earlier in the same chunk.
+
+    Usable as a context manager; the exact set lives in a fresh directory
+    inside ``temp_dir`` that is removed by ``close()``.
+    """
+
+    def __init__(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        temp_dir: Optional[Union[str, Path]] = None,
+        exclude: Iterable[str] = (),
+    ):
+        self.columns = list(columns) if columns else None
+        self.exclude = set(exclude)
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.directory = Path(tempfile.mkdtemp(prefix="dedup_", dir=temp_dir))
+        self.seen = DiskHashSet(self.directory / "seen.sqlite")
+        self.rows = 0
+        self.duplicates = 0
+        self.lookups = 0
+
+    def keep(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Mask of the rows of ``chunk`` to keep; the kept rows count as seen afterwards."""
+        columns = self.columns or [name for name in chunk.columns if name not in self.exclude]
+        unknown = [name for name in columns if name not in chunk.columns]
+        if unknown:
+            raise ValueError(f"Unknown dedup columns: {', '.join(unknown)}")
+        high, low = row_fingerprints(chunk[columns])
+        # First occurrence of every fingerprint within the chunk
+        keep = ~pd.DataFrame({"high": high, "low": low}).duplicated().to_numpy()
+
+        candidates = np.flatnonzero(keep)
+        maybe_seen = candidates[self.bloom.contains(high[candidates], low[candidates])]
+        if len(maybe_seen):
+            self.lookups += len(maybe_seen)
+            keep[maybe_seen[self.seen.contains(high[maybe_seen], low[maybe_seen])]] = False
+
+        new = np.flatnonzero(keep)
+        self.bloom.add(high[new], low[new])
+        self.seen.add(high[new], low[new])
+        self.rows += len(chunk)
+        self.duplicates += len(chunk) - len(new)
+        return keep
+
+    def close(self) -> None:
+        self.seen.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+        logger.debug(
+            f"Dropped {self.duplicates} of {self.rows} rows as duplicates "
+            f"({self.lookups} exact lookups)"
+        )
+
+    def __enter__(self) -> "RowDeduplicator":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
@@ -0,0 +1,415 @@
+"""Incremental combination of CSV shards that keep arriving in the same directory.
+
+A manifest next to the combined CSV (``<output>.manifest.json``) records
+every ingested file with its fingerprint (path, size, modification time),
+the byte range its rows occupy in the output and, when the rows were
+parsed, its scanned columns and dtypes. A run then only reads the files
+that are not in the manifest yet and appends them to the output, so its
+cost is proportional to the new data.
+
+The output is rebuilt from scratch (and the manifest rewritten) when
+
+* there is no manifest, it was written with other options, or the output
+  was modified since the manifest was written,
+* an ingested file was modified or is no longer among the inputs,
+* the new files would change the combined schema, i.e. the full rebuild
+  would write the existing rows differently (e.g. an integer column that
+  becomes a float column), or
+* the output was a byte-level concatenation and a new file has another
+  header line.
+
+Rows are appended in the order the files were ingested; the output of an
+incremental run is the same as a full rebuild of the files in that order.
+"""
+import io
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, Future, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import pandas as pd
+
+from dun.services.cache.run import file_fingerprint
+from dun.services.processors.csv_schema import (
+    DEFAULT_CHUNK_SIZE,
+    FileSchema,
+    SchemaCache,
+    SchemaPlan,
+    infer_schema,
+    resolve_schema,
+)
+from dun.services.processors.csv_stream import (
+    CombineResult,
+    _copy_range,
+    _write_part,
+    read_header_line,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_SUFFIX = ".manifest.json"
+FORMAT_VERSION = 1
+
+
+def manifest_path(output_file: Union[str, Path]) -> Path:
+    """Path of the manifest kept next to ``output_file``."""
+    output_file = Path(output_file)
+    return output_file.with_name(output_file.name + MANIFEST_SUFFIX)
+
+
+def _output_state(path: Union[str, Path]) -> Optional[List[int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@dataclass
+class IngestedFile:
+    """An input whose rows are stored in ``output[offset:offset + length]``."""
+    path: str
+    fingerprint: List[Any]
+    offset: int
+    length: int
+    rows: Optional[int] = None  # unknown for byte-level copies
+    schema: Optional[Dict[str, Any]] = None  # ``FileSchema.to_dict()`` without statistics
+
+
+@dataclass
+class Manifest:
+    """Files ingested into one combined CSV and the options they were combined with."""
+    options: Dict[str, Any]
+    mode: str  # "bytes" (bodies copied verbatim) or "parse"
+    header: str
+    union: Dict[str, str] = field(default_factory=dict)  # column -> dtype name ("parse" only)
+    files: List[IngestedFile] = field(default_factory=list)
+    output: Optional[List[int]] = None  # size and mtime_ns of the output after the last run
+    version: int = FORMAT_VERSION
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> Optional["Manifest"]:
+        """Read a manifest; ``None`` if it is missing, unreadable or of another version."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FORMAT_VERSION:
+                return None
+            data["files"] = [IngestedFile(**entry) for entry in data["files"]]
+            return cls(**data)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+            return None
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the manifest atomically."""
+        path = Path(path)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(asdict(self), f, ensure_ascii=False)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    @property
+    def schemas(self) -> List[FileSchema]:
+        return [FileSchema.from_dict(entry.path, entry.schema) for entry in self.files]
+
+    @property
+    def columns(self) -> List[str]:
+        if self.mode == "parse":
+            return list(self.union)
+        read_kwargs = {k: v for k, v in self.options["read_kwargs"].items() if k != "encoding"}
+        return [str(name) for name in pd.read_csv(io.StringIO(self.header), nrows=0, **read_kwargs).columns]
+
+
+@dataclass
+class IncrementalResult(CombineResult):
+    """Summary of an incremental run; ``files`` and ``rows`` cover the appended files only."""
+    rebuilt: bool = False
+
+
+def _union_names(dtypes: pd.Series) -> Dict[str, str]:
+    return {str(name): str(dtype) for name, dtype in dtypes.items()}
+
+
+def _stale_reason(
+    manifest: Optional[Manifest],
+    options: Dict[str, Any],
+    output_file: Path,
+    file_paths: Sequence[Union[str, Path]],
+) -> Optional[str]:
+    """Why the output has to be rebuilt, or ``None`` if new files can be appended."""
+    if manifest is None:
+        return "no manifest"
+    if manifest.options != options:
+        return "options changed"
+    if manifest.output is None or manifest.output != _output_state(output_file):
+        return "output modified"
+    inputs = {str(path) for path in file_paths}
+    for entry in manifest.files:
+        if entry.path not in inputs:
+            return f"{entry.path} removed"
+        try:
+            fingerprint = file_fingerprint(entry.path)
+        except OSError:
+            return f"{entry.path} unreadable"
+        if fingerprint != entry.fingerprint:
+            return f"{entry.path} modified"
+    return None
+
+
+def _append_bytes(
+    manifest: Manifest,
+    out: int,
+    file_paths: Sequence[Union[str, Path]],
+    encoding: str,
+) -> Optional[List[IngestedFile]]:
+    """Append the bodies of files sharing the manifest header; ``None`` if a header differs."""
+    header = manifest.header.encode(encoding)
+    for path in file_paths:
+        if read_header_line(path) != header:
+            return None
+    terminator = b"\r\n" if header.endswith(b"\r\n") else b"\n"
+    entries = []
+    for path in file_paths:
+        fingerprint = file_fingerprint(path)
+        offset = os.lseek(out, 0, os.SEEK_END)
+        with open(path, "rb", buffering=0) as src:
+            size = os.fstat(src.fileno()).st_size
+            body = size - len(header)
+            if body > 0:
+                _copy_range(src.fileno(), out, len(header), body)
+                if os.pread(src.fileno(), 1, size - 1) != b"\n":
+                    os.write(out, terminator)
+        entries.append(IngestedFile(str(path), fingerprint, offset, os.lseek(out, 0, os.SEEK_END) - offset))
+    return entries
+
+
+def _append_parsed(
+    plan: SchemaPlan,
+    dtypes: pd.Series,
+    out: int,
+    output_file: Path,
+    chunk_size: int,
+    read_kwargs: Dict[str, Any],
+    write_kwargs: Dict[str, Any],
+    encoding: str,
+    sample: List[Dict[str, Any]],
+    sample_rows: int,
+    executor: Optional[Executor],
+) -> List[IngestedFile]:
+    """Append the rows of ``plan.files`` aligned to ``dtypes``, converting files in parallel."""
+    options = dict(
+        chunk_size=chunk_size, source_column=plan.source_column, read_kwargs=read_kwargs,
+        write_kwargs=write_kwargs, sample_rows=sample_rows,
+    )
+    entries: List[IngestedFile] = []
+    parts: List[str] = []
+    futures: List[Future] = []
+    try:
+        # Fingerprint before reading, so a file modified meanwhile is re-read on the next run
+        fingerprints = [file_fingerprint(schema.path) for schema in plan.files]
+        for _ in plan.files:
+            part_fd, part = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".part")
+            os.close(part_fd)
+            parts.append(part)
+        if executor is not None:
+            futures = [
+                executor.submit(_write_part, part, encoding, schema, dtypes=dtypes,
+                                read_dtypes=plan.read_dtypes(schema), **options)
+                for schema, part in zip(plan.files, parts)
+            ]
+        for i, (schema, part) in enumerate(zip(plan.files, parts)):
+            if futures:
+                rows, file_sample = futures[i].result()
+            else:
+                rows, file_sample = _write_part(
+                    part, encoding, schema, dtypes=dtypes, read_dtypes=plan.read_dtypes(schema), **options
+                )
+            sample.extend(file_sample[:sample_rows - len(sample)])
+            offset = os.lseek(out, 0, os.SEEK_END)
+            with open(part, "rb") as part_file:
+                _copy_range(part_file.fileno(), out, 0, os.fstat(part_file.fileno()).st_size)
+            stored = dict(schema.to_dict(), stats={})
+            entries.append(IngestedFile(
+                str(schema.path), fingerprints[i], offset, os.lseek(out, 0, os.SEEK_END) - offset, rows, stored
+            ))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        raise
+    finally:
+        for part in parts:
+            Path(part).unlink(missing_ok=True)
+    return entries
+
+
+def combine_csv_incremental(
+    file_paths: Sequence[Union[str, Path]],
+    output_file: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    source_column: Optional[str] = None,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    write_kwargs: Optional[Dict[str, Any]] = None,
+    encoding: str = "utf-8",
+    sample_rows: int = 2,
+    executor: Optional[Executor] = None,
+    compact: bool = False,
+    schema_cache: Optional[SchemaCache] = None,
+) -> IncrementalResult:
+    """Append the files of ``file_paths`` that are not in the manifest of ``output_file`` to it.
+
+    Falls back to a full rebuild in the cases listed in the module
+    docstring. Without a ``source_column`` and with identical header lines
+    the file bodies are copied byte for byte, otherwise the rows are parsed
+    and aligned to the combined schema (with the compact dtypes of
+    ``csv_schema`` if ``compact``). Files that cannot be read are skipped,
+    reported in ``failed`` and tried again on the next run.
+
+    An interrupted append is truncated back to the previous output; a
+    rebuild is written to a temporary file and renamed into place.
+
+    Raises:
+        ValueError: If a rebuild is needed and none of the files could be read.
+    """
+    read_kwargs = dict(read_kwargs or {})
+    read_kwargs.setdefault("encoding", encoding)
+    write_kwargs = dict(write_kwargs or {})
+    output_file = Path(output_file)
+    options = {
+        "source_column": source_column,
+        "read_kwargs": read_kwargs,
+        "write_kwargs": write_kwargs,
+        "encoding": encoding,
+    }
+    manifest_file = manifest_path(output_file)
+
+    manifest = Manifest.load(manifest_file)
+    reason = _stale_reason(manifest, options, output_file, file_paths)
+    if reason is None:
+        ingested = {entry.path for entry in manifest.files}
+        new_paths = list(dict.fromkeys(str(path) for path in file_paths if str(path) not in ingested))
+        if not new_paths:
+            logger.info(f"No new files to append to {output_file}")
+            return IncrementalResult(output_file, 0, manifest.columns, [])
+        result = _append(manifest, new_paths, output_file, chunk_size, read_kwargs, write_kwargs,
+                         encoding, sample_rows, executor, compact, schema_cache)
+        if result is not None:
+            manifest.save(manifest_file)
+            logger.info(f"Appended {len(result.files)} files to {output_file}")
+            return result
+        reason = "schema changed"
+
+    logger.info(f"Rebuilding {output_file}: {reason}")
+    file_paths = list(dict.fromkeys(str(path) for path in file_paths))
+    mode = "parse"
+    header = ""
+    if source_column is None and "\n,".encode(encoding) == b"\n,":
+        headers = [read_header_line(path) for path in file_paths]
+        if headers and headers[0] is not None and all(h == headers[0] for h in headers):
+            mode = "bytes"
+            header = headers[0].decode(encoding)
+    manifest = Manifest(options, mode, header)
+
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        if mode == "parse":
+            plan = infer_schema(file_paths, chunk_size, source_column, read_kwargs,
+                                compact=compact, cache=schema_cache, executor=executor)
+            manifest.union = _union_names(plan.union)
+            manifest.header = pd.DataFrame(columns=plan.union.index).to_csv(index=False, **write_kwargs)
+        with open(tmp_name, "wb", buffering=0) as out:
+            out.write(manifest.header.encode(encoding))
+        result = _append(manifest, file_paths, Path(tmp_name), chunk_size, read_kwargs, write_kwargs,
+                         encoding, sample_rows, executor, compact, schema_cache,
+                         plan=plan if mode == "parse" else None)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    manifest.output = _output_state(output_file)
+    manifest.save(manifest_file)
+    result.output_file = output_file
+    result.rebuilt = True
+    return result
+
+
+def _append(
+    manifest: Manifest,
+    file_paths: List[str],
+    output_file: Path,
+    chunk_size: int,
+    read_kwargs: Dict[str, Any],
+    write_kwargs: Dict[str, Any],
+    encoding: str,
+    sample_rows: int,
+    executor: Optional[Executor],
+    compact: bool,
+    schema_cache: Optional[SchemaCache],
+    plan: Optional[SchemaPlan] = None,
+) -> Optional[IncrementalResult]:
+    """Append ``file_paths`` to ``output_file`` and record them in ``manifest``.
+
+    Returns ``None`` (leaving the output untouched) when the files cannot
+    be appended without changing the rows already written.
+    """
+    sample: List[Dict[str, Any]] = []
+    failed: Dict[str, str] = {}
+    dtypes: Optional[pd.Series] = None
+    if manifest.mode == "parse" and plan is None:
+        source_column = manifest.options["source_column"]
+        try:
+            new = infer_schema(file_paths, chunk_size, source_column, read_kwargs,
+                               cache=schema_cache, executor=executor)
+        except ValueError as e:
+            logger.error(f"No new files could be appended: {e}")
+            return IncrementalResult(output_file, 0, manifest.columns, [], failed={
+                str(path): str(e) for path in file_paths
+            })
+        union = resolve_schema(manifest.schemas + new.files, source_column)
+        if _union_names(union) != manifest.union:
+            return None
+        # Compact dtypes only need the statistics of the rows being read
+        plan = SchemaPlan(new.files, union, source_column, new.failed, compact)
+    if plan is not None:
+        dtypes = plan.dtypes()
+        failed = plan.failed
+
+    previous = os.stat(output_file)
+    previous_size = previous.st_size
+    # Not O_APPEND: copy_file_range() refuses to write to such files
+    fd = os.open(output_file, os.O_WRONLY)
+    os.lseek(fd, previous_size, os.SEEK_SET)
+    try:
+        if manifest.mode == "bytes":
+            entries = _append_bytes(manifest, fd, file_paths, encoding)
+            if entries is None:
+                return None
+        else:
+            entries = _append_parsed(plan, dtypes, fd, output_file, chunk_size, read_kwargs, write_kwargs,
+                                     encoding, sample, sample_rows, executor)
+    except BaseException:
+        os.ftruncate(fd, previous_size)
+        # Keep the manifest valid, so the next run appends instead of rebuilding
+        os.utime(fd, ns=(previous.st_atime_ns, previous.st_mtime_ns))
+        raise
+    finally:
+        os.close(fd)
+
+    manifest.files.extend(entries)
+    manifest.output = _output_state(output_file)
+    rows = sum(entry.rows or 0 for entry in entries)
+    return IncrementalResult(
+        output_file, rows, manifest.columns, [Path(entry.path) for entry in entries], failed=failed, sample=sample
+    )
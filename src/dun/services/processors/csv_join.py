@@ -0,0 +1,368 @@
+"""Memory-bounded hash join of two sets of CSV files.
+
+Each side is a list of CSV files read as one table (their union schema, as
+in ``combine_csv_stream``). The side with fewer bytes on disk is the build
+side: it is loaded into an in-memory hash table and the other side is
+streamed through it chunk by chunk. Keys are hashed per chunk with
+``pd.util.hash_pandas_object`` and matched with ``np.searchsorted`` against
+the sorted build hashes, and the candidate pairs are then checked on the
+key values. No row is compared in a Python loop.
+
+When the build side grows beyond ``memory_budget`` bytes, both sides are
+split into partitions on disk by key hash (a grace hash join) and each
+pair of partitions is joined in memory.
+
+The rows match ``pd.merge(left, right, on=on, how=how, suffixes=suffixes)``
+up to their order. Rows come in the order of the streamed side, and
+unmatched build rows come last (per partition in a grace join). Integer
+and boolean columns of a side that can be missing in the result use
+pandas' nullable dtypes, so their values are written without a ``.0``.
+Like ``pd.merge``, missing keys match each other.
+"""
+import logging
+import math
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import dataclass
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from dun.services.processors.csv_schema import DEFAULT_CHUNK_SIZE, SchemaPlan, infer_schema
+from dun.services.processors.csv_stream import _extend_sample, iter_aligned
+from dun.services.processors.table_writer import open_writer
+
+logger = logging.getLogger(__name__)
+
+JOIN_TYPES = ("inner", "left", "outer")
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+
+@dataclass
+class JoinResult:
+    """Summary of a join."""
+    output_file: Path
+    rows: int
+    columns: List[str]
+    build_side: str
+    partitions: int = 1  # more than one for a grace hash join
+    sample: Optional[List[Dict[str, Any]]] = None
+
+
+class _Side:
+    """One input table: its files, its columns and the dtypes it is read with."""
+
+    def __init__(self, name: str, plan: SchemaPlan, on: Sequence[str], nullable: bool):
+        self.name = name
+        self.plan = plan
+        self.dtypes = plan.union.copy()
+        if nullable:
+            # Keeps integers integers when unmatched rows are filled with <NA>
+            for column, dtype in self.dtypes.items():
+                if column in on:
+                    continue
+                if dtype.kind in "iu":
+                    self.dtypes[column] = pd.Int64Dtype()
+                elif dtype.kind == "b":
+                    self.dtypes[column] = pd.BooleanDtype()
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.dtypes.index)
+
+    def chunks(self, chunk_size: int, read_kwargs: Dict[str, Any]) -> Iterator[pd.DataFrame]:
+        for schema in self.plan.files:
+            for chunk in iter_aligned(schema, self.dtypes, chunk_size, source_column=None, read_kwargs=read_kwargs):
+                yield chunk.reset_index(drop=True)
+
+
+def _key_dtype(left: Any, right: Any, name: str) -> Any:
+    """The dtype both sides' key column ``name`` is compared as (rules of ``pd.merge``)."""
+    if left == right:
+        return left
+    numeric = (left.kind in "iufb", right.kind in "iufb")
+    if all(numeric):
+        return np.result_type(left, right)
+    raise ValueError(f"Cannot join on column {name!r} of types {left} and {right}")
+
+
+def hash_keys(frame: pd.DataFrame, on: Sequence[str]) -> np.ndarray:
+    """Vectorized 64-bit hashes of the key columns of every row."""
+    return pd.util.hash_pandas_object(frame[list(on)], index=False).to_numpy()
+
+
+def _keys_equal(left: pd.DataFrame, right: pd.DataFrame, on: Sequence[str]) -> np.ndarray:
+    """Row-wise key equality of two aligned frames; missing keys are equal."""
+    equal = np.ones(len(left), dtype=bool)
+    for name in on:
+        a, b = left[name].to_numpy(), right[name].to_numpy()
+        a_na, b_na = pd.isna(a), pd.isna(b)
+        both = ~a_na & ~b_na
+        column_equal = a_na & b_na
+        column_equal[both] = a[both] == b[both]
+        equal &= column_equal
+    return equal
+
+
+class HashTable:
+    """Build rows indexed by the sorted hashes of their keys."""
+
+    def __init__(self, frame: pd.DataFrame, on: Sequence[str]):
+        self.frame = frame.reset_index(drop=True)
+        self.on = list(on)
+        hashes = hash_keys(self.frame, self.on)
+        self.order = np.argsort(hashes, kind="stable")
+        self.hashes = hashes[self.order]
+        self.matched = np.zeros(len(self.frame), dtype=bool)
+
+    def probe(self, chunk: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Index pairs ``(chunk row, build row)`` of all matches, in chunk order."""
+        hashes = hash_keys(chunk, self.on)
+        start = np.searchsorted(self.hashes, hashes, side="left")
+        counts = np.searchsorted(self.hashes, hashes, side="right") - start
+        probe_rows = np.repeat(np.arange(len(chunk)), counts)
+        # Positions start[i], ..., start[i] + counts[i] - 1 for every chunk row i
+        offsets = np.arange(len(probe_rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        build_rows = self.order[np.repeat(start, counts) + offsets]
+        # Drop hash collisions
+        keep = _keys_equal(
+            chunk.iloc[probe_rows].reset_index(drop=True), self.frame.iloc[build_rows].reset_index(drop=True), self.on
+        )
+        probe_rows, build_rows = probe_rows[keep], build_rows[keep]
+        self.matched[build_rows] = True
+        return probe_rows, build_rows
+
+
+class _Output:
+    """Assembles joined rows in the column layout of ``pd.merge``."""
+
+    def __init__(self, left: _Side, right: _Side, on: Sequence[str], suffixes: Tuple[str, str]):
+        self.on = list(on)
+        overlap = (set(left.columns) & set(right.columns)) - set(on)
+        self.left = [(name, name + suffixes[0] if name in overlap else name) for name in left.columns]
+        self.right = [(name, name + suffixes[1] if name in overlap else name) for name in right.columns if name not in on]
+        dtypes = {out: left.dtypes[name] for name, out in self.left}
+        dtypes.update({out: right.dtypes[name] for name, out in self.right})
+        self.dtypes = pd.Series(dtypes, dtype=object)
+
+    @staticmethod
+    def _take(frame: pd.DataFrame, rows: np.ndarray) -> pd.DataFrame:
+        """Rows of ``frame`` at ``rows``; ``-1`` gives a row of missing values."""
+        if frame.empty:
+            return frame.reindex(np.arange(len(rows)))
+        taken = frame.iloc[np.maximum(rows, 0)].reset_index(drop=True)
+        present = rows >= 0
+        if not present.all():
+            taken = taken.where(np.broadcast_to(present[:, None], taken.shape))
+        return taken
+
+    def rows(self, left: pd.DataFrame, left_rows: np.ndarray, right: pd.DataFrame, right_rows: np.ndarray) -> pd.DataFrame:
+        left_part, right_part = self._take(left, left_rows), self._take(right, right_rows)
+        data = {}
+        for name, out in self.left:
+            if name in self.on:
+                # Keys of unmatched right rows come from the right side
+                data[out] = left_part[name].where(left_rows >= 0, right_part[name])
+            else:
+                data[out] = left_part[name]
+        for name, out in self.right:
+            data[out] = right_part[name]
+        frame = pd.DataFrame(data)
+        for name, dtype in self.dtypes.items():
+            if frame[name].dtype != dtype:
+                frame[name] = frame[name].astype(dtype)
+        return frame
+
+
+def _memory(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(deep=True, index=False).sum())
+
+
+def _empty(side: _Side) -> pd.DataFrame:
+    return pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in side.dtypes.items()})
+
+
+def _spill(frames: Iterable[pd.DataFrame], on: Sequence[str], directory: Path, prefix: str, partitions: int) -> List[Path]:
+    """Split rows by key hash into ``partitions`` files of pickled frames."""
+    paths = [directory / f"{prefix}{i}.pkl" for i in range(partitions)]
+    files = [open(path, "wb") for path in paths]
+    try:
+        for frame in frames:
+            # High bits: the hash table sorts by the whole hash anyway
+            part = (hash_keys(frame, on) >> np.uint64(32)) % np.uint64(partitions)
+            for i in np.unique(part):
+                pickle.dump(frame[part == i].reset_index(drop=True), files[i], protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _load(path: Path) -> Iterator[pd.DataFrame]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class _Join:
+    """Probes chunks of one side against a hash table of the other."""
+
+    def __init__(self, build: _Side, probe: _Side, output: _Output, how: str):
+        self.build = build
+        self.probe = probe
+        self.output = output
+        self.keep_probe = how == "outer" or (how == "left" and probe.name == "left")
+        self.keep_build = how == "outer" or (how == "left" and build.name == "left")
+
+    def _assemble(
+        self, probe: pd.DataFrame, probe_rows: np.ndarray, build: pd.DataFrame, build_rows: np.ndarray
+    ) -> pd.DataFrame:
+        if self.probe.name == "left":
+            return self.output.rows(probe, probe_rows, build, build_rows)
+        return self.output.rows(build, build_rows, probe, probe_rows)
+
+    def rows(self, build_frame: pd.DataFrame, probe_chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Joined rows of ``build_frame`` and the probe chunks, chunk by chunk."""
+        table = HashTable(build_frame, self.output.on)
+        for chunk in probe_chunks:
+            probe_rows, build_rows = table.probe(chunk)
+            if self.keep_probe:
+                unmatched = np.setdiff1d(np.arange(len(chunk)), probe_rows)
+                probe_rows = np.concatenate([probe_rows, unmatched])
+                build_rows = np.concatenate([build_rows, np.full(len(unmatched), -1)])
+                order = np.argsort(probe_rows, kind="stable")
+                probe_rows, build_rows = probe_rows[order], build_rows[order]
+            if len(probe_rows):
+                yield self._assemble(chunk, probe_rows, table.frame, build_rows)
+        if self.keep_build:
+            unmatched = np.flatnonzero(~table.matched)
+            if len(unmatched):
+                yield self._assemble(_empty(self.probe), np.full(len(unmatched), -1), table.frame, unmatched)
+
+
+def join_csv(
+    left_paths: Sequence[Union[str, Path]],
+    right_paths: Sequence[Union[str, Path]],
+    output_file: Union[str, Path],
+    on: Sequence[str],
+    how: str = "inner",
+    suffixes: Tuple[str, str] = ("_x", "_y"),
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    write_kwargs: Optional[Dict[str, Any]] = None,
+    encoding: str = "utf-8",
+    sample_rows: int = 2,
+    output_format: str = "csv",
+    compression: Optional[str] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    temp_dir: Optional[Union[str, Path]] = None,
+) -> JoinResult:
+    """Join the rows of ``left_paths`` and ``right_paths`` on ``on`` into ``output_file``.
+
+    ``how`` is ``inner``, ``left`` or ``outer``. Partitions of a grace join
+    are written to a fresh directory inside ``temp_dir`` that is removed
+    afterwards. The output is written to a temporary file and renamed into
+    place.
+
+    Raises:
+        ValueError: If ``how`` is unknown, a key column is missing or has
+            incompatible types on the two sides, or a side has no readable file.
+    """
+    if how not in JOIN_TYPES:
+        raise ValueError(f"Unknown join type: {how}")
+    read_kwargs = dict(read_kwargs or {})
+    read_kwargs.setdefault("encoding", encoding)
+    output_file = Path(output_file)
+    on = list(on)
+
+    plans = {}
+    for name, paths in (("left", left_paths), ("right", right_paths)):
+        plans[name] = infer_schema(paths, chunk_size, read_kwargs=read_kwargs)
+        missing = [column for column in on if column not in plans[name].union.index]
+        if missing:
+            raise ValueError(f"Key columns missing on the {name} side: {', '.join(missing)}")
+    left = _Side("left", plans["left"], on, nullable=how == "outer")
+    right = _Side("right", plans["right"], on, nullable=how in ("left", "outer"))
+    key_dtypes = {}
+    for column in on:
+        # Both sides are read with the common type, so equal keys hash alike
+        common = _key_dtype(left.dtypes[column], right.dtypes[column], column)
+        # but, as in pd.merge, keys keep the left type unless right keys fill in
+        key_dtypes[column] = common if how == "outer" else left.dtypes[column]
+        left.dtypes[column] = right.dtypes[column] = common
+    output = _Output(left, right, on, suffixes)
+    output.dtypes.update(pd.Series(key_dtypes, dtype=object))
+
+    sizes = {side.name: sum(os.path.getsize(schema.path) for schema in side.plan.files) for side in (left, right)}
+    build, probe = (left, right) if sizes["left"] < sizes["right"] else (right, left)
+    join = _Join(build, probe, output, how)
+
+    directory = None
+    partitions = 1
+    sample: List[Dict[str, Any]] = []
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        with open_writer(output_format, tmp_name, output.dtypes, compression, encoding, write_kwargs) as writer:
+            build_chunks = build.chunks(chunk_size, read_kwargs)
+            loaded: List[pd.DataFrame] = []
+            used = 0
+            for chunk in build_chunks:
+                loaded.append(chunk)
+                used += _memory(chunk)
+                if used > memory_budget:
+                    break
+
+            if used <= memory_budget:
+                logger.info(f"Hash join with {sum(map(len, loaded))} {build.name} rows in memory")
+                build_frame = pd.concat(loaded, ignore_index=True) if loaded else _empty(build)
+                loaded = []
+                batches = [join.rows(build_frame, probe.chunks(chunk_size, read_kwargs))]
+            else:
+                # Estimate the whole build side from the rows read so far
+                total_rows = sum(schema.rows for schema in build.plan.files)
+                partitions = max(2, math.ceil(2 * used / sum(map(len, loaded)) * total_rows / memory_budget))
+                logger.info(f"Build side exceeds {memory_budget} bytes, grace hash join with {partitions} partitions")
+                directory = Path(tempfile.mkdtemp(prefix="join_", dir=temp_dir))
+                build_parts = _spill(chain(loaded, build_chunks), on, directory, "build", partitions)
+                loaded = []
+                probe_parts = _spill(probe.chunks(chunk_size, read_kwargs), on, directory, "probe", partitions)
+                batches = (
+                    join.rows(_load_partition(build_part, build, memory_budget), _load(probe_part))
+                    for build_part, probe_part in zip(build_parts, probe_parts)
+                )
+            for frame in chain.from_iterable(batches):
+                writer.write(frame)
+                _extend_sample(sample, frame, sample_rows)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    return JoinResult(
+        output_file=output_file,
+        rows=writer.rows,
+        columns=list(output.dtypes.index),
+        build_side=build.name,
+        partitions=partitions,
+        sample=sample,
+    )
+
+
+def _load_partition(path: Path, side: _Side, memory_budget: int) -> pd.DataFrame:
+    frames = list(_load(path))
+    frame = pd.concat(frames, ignore_index=True) if frames else _empty(side)
+    if _memory(frame) > memory_budget:
+        logger.warning(f"Partition {path.name} exceeds the memory budget (skewed keys)")
+    return frame
@@ -1,17 +1,53 @@
 """CSV Processor service for handling CSV file operations."""
+import asyncio
 import logging
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Union
+from typing import ContextManager, List, Literal, Optional, Dict, Any, Tuple, Union
 
 import pandas as pd
 from pydantic import BaseModel, Field, validator
 
 from dun.core.protocols import ServiceProtocol
+from dun.dynamic_processor_mapper import fold_text
+from dun.services.processors.csv_dedup import DEFAULT_CAPACITY, RowDeduplicator
+from dun.services.processors.csv_incremental import combine_csv_incremental
+from dun.services.processors.csv_join import join_csv
+from dun.services.processors.csv_query import Aggregate, Filter, Query, QueryResult, RangeCache, query_csv
+from dun.services.processors.csv_schema import SchemaCache, SchemaPlan, infer_schema
+from dun.services.processors.csv_sort import sort_csv_stream
+from dun.services.processors.csv_summary import summarize_csv
+from dun.services.processors.csv_stream import (
+    DEFAULT_CHUNK_SIZE,
+    SOURCE_COLUMN,
+    align_chunk,
+    combine_csv_stream,
+    concat_csv_bytes,
+)
+from dun.services.processors.table_writer import SUFFIXES, open_writer, resolve_format
+from dun.services.cache import FrameCache, RunCache, frame_cache_from_settings, run_cache_from_settings
 from dun.services.filesystem import fs
 from dun.config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# "... po customer_id", "... on customer_id", "... by column id"
+JOIN_KEY_PATTERN = re.compile(r"\b(?:po|on|by|wg|według)\s+(?:kolumnie\s+|column\s+)?[`'\"]?([\w.]+)", re.IGNORECASE)
+# Words naming a file share at least this prefix with its name ("klientów" -> klienci.csv)
+JOIN_NAME_PREFIX = 5
+# Aggregates named in requests such as "pokaż sumę kolumny amount dla 2024" (folded words)
+QUERY_AGGREGATES = {
+    "sum": "sum", "suma": "sum", "sume": "sum", "sumy": "sum", "total": "sum",
+    "mean": "mean", "average": "mean", "avg": "mean", "srednia": "mean", "sredniej": "mean",
+    "min": "min", "minimum": "min", "max": "max", "maximum": "max", "maksimum": "max",
+    "count": "count", "liczba": "count", "liczbe": "count",
+}
+QUERY_YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+# Rows sampled to find the date column a year refers to
+QUERY_SAMPLE_ROWS = 100
+
 class CSVProcessorConfig(BaseModel):
     """Configuration for CSV Processor."""
     input_dir: Path = Field(default_factory=lambda: Path("data"))
@@ -20,6 +56,40 @@ class CSVProcessorConfig(BaseModel):
     delimiter: str = ","
     encoding: str = "utf-8"
     include_header: bool = True
+    # Add a ``_source_file`` column; without it files with identical headers
+    # are concatenated byte for byte
+    add_source_column: bool = True
+    # Stream inputs in chunks of ``chunk_size`` rows instead of loading them all
+    streaming: bool = True
+    chunk_size: int = Field(default=DEFAULT_CHUNK_SIZE, gt=0)
+    # Parse files in parallel: threads (the C parser releases the GIL),
+    # processes (for very wide files) or one after another
+    read_executor: Literal["thread", "process", "serial"] = "thread"
+    read_workers: Optional[int] = Field(default=None, gt=0)  # executor default
+    # Format of the combined file; parquet/feather fall back to npz without pyarrow
+    output_format: Literal["csv", "parquet", "feather", "npz"] = "csv"
+    compression: Optional[str] = "zstd"  # parquet/feather codec, deflate for npz
+    # Infer one schema for all files first and read them with compact dtypes
+    # (downcast numbers, category, dates); scans (and the column ranges
+    # recorded by queries) are cached by file mtime
+    compact_dtypes: bool = True
+    schema_cache: bool = True
+    # Return the previous output when no input file changed (see RUN_CACHE_*)
+    run_cache: bool = True
+    # Reuse columnar copies of files parsed before by ``read_csv`` (see CSV_FRAME_CACHE_*)
+    frame_cache: bool = True
+    # Only append files not yet listed in ``<output>.manifest.json`` (CSV output)
+    incremental: bool = False
+    # Sort the combined rows by these columns out of core (runs spilled to a temp dir)
+    sort_by: Optional[List[str]] = None
+    sort_ascending: bool = True
+    # Drop repeated rows (only ``dedup_columns`` compared if given, never the
+    # source column); seen rows are kept in a Bloom filter and a disk-backed set
+    dedup: bool = False
+    dedup_columns: Optional[List[str]] = None
+    dedup_capacity: int = Field(default=DEFAULT_CAPACITY, gt=0)  # expected distinct rows
+    # Memory for the hash table of a join; larger build sides are partitioned on disk
+    join_memory_mb: int = Field(default=256, gt=0)
     
     @validator('input_dir', 'output_dir', pre=True)
     def ensure_path(cls, v):
@@ -36,6 +106,10 @@ class CSVProcessingError(Exception):
 class CSVProcessor(ServiceProtocol):
     """Service for processing CSV files."""
     
+    # Options that change the combined output (part of the run cache key)
+    RUN_PARAMETERS = {"delimiter", "encoding", "add_source_column", "compression", "compact_dtypes", "incremental",
+                      "sort_ascending", "dedup", "dedup_columns"}
+    
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = CSVProcessorConfig(**(config or {}))
         self.settings = get_settings()
@@ -43,6 +117,12 @@ class CSVProcessor(ServiceProtocol):
         # Set default output file if not specified
         if self.config.output_file is None:
             self.config.output_file = self.config.output_dir / "combined.csv"
+        
+        self._executor: Optional[Executor] = None
+        self._schema_cache: Optional[SchemaCache] = None
+        self._range_cache: Optional[RangeCache] = None
+        self._run_cache: Optional[RunCache] = None
+        self._frame_cache: Optional[FrameCache] = None
     
     @property
     def name(self) -> str:
@@ -59,42 +139,117 @@ class CSVProcessor(ServiceProtocol):
     
     async def shutdown(self) -> None:
         """Clean up resources."""
-        pass
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    @property
+    def executor(self) -> Optional[Executor]:
+        """Executor parsing files in parallel (created on first use, None when serial)."""
+        if self._executor is None and self.config.read_executor != "serial":
+            if self.config.read_executor == "process":
+                self._executor = ProcessPoolExecutor(self.config.read_workers)
+            else:
+                self._executor = ThreadPoolExecutor(self.config.read_workers, thread_name_prefix="dun-csv")
+        return self._executor
+    
+    @property
+    def schema_cache(self) -> Optional[SchemaCache]:
+        """Cache of file scans in ``CACHE_DIR/csv_schema`` (None when disabled)."""
+        if self._schema_cache is None and self.config.schema_cache:
+            self._schema_cache = SchemaCache.from_settings()
+        return self._schema_cache
+    
+    @property
+    def range_cache(self) -> Optional[RangeCache]:
+        """Column ranges recorded by queries in ``CACHE_DIR/csv_ranges`` (None when disabled)."""
+        if self._range_cache is None and self.config.schema_cache:
+            self._range_cache = RangeCache.from_settings()
+        return self._range_cache
+    
+    @property
+    def run_cache(self) -> Optional[RunCache]:
+        """Cache of combine results in ``CACHE_DIR/runs`` (None when disabled)."""
+        if self._run_cache is None and self.config.run_cache:
+            self._run_cache = run_cache_from_settings()
+        return self._run_cache
+    
+    @property
+    def frame_cache(self) -> Optional[FrameCache]:
+        """Columnar copies of parsed files in ``CACHE_DIR/csv_frames`` (None when disabled)."""
+        if self._frame_cache is None and self.config.frame_cache:
+            self._frame_cache = frame_cache_from_settings()
+        return self._frame_cache
+    
+    @property
+    def read_kwargs(self) -> Dict[str, Any]:
+        return {"delimiter": self.config.delimiter, "encoding": self.config.encoding}
     
     async def find_csv_files(self) -> List[Path]:
         """Find all CSV files in the input directory."""
         if not self.config.input_dir.exists():
             raise FileNotFoundError(f"Input directory not found: {self.config.input_dir}")
         
-        return fs.find_files(
+        return await asyncio.to_thread(
+            fs.find_files,
             directory=self.config.input_dir,
             extensions=["csv"],
             recursive=True
         )
     
-    async def read_csv(self, file_path: Union[str, Path]) -> pd.DataFrame:
-        """Read a single CSV file into a pandas DataFrame."""
+    async def read_csv(self, file_path: Union[str, Path], dtype: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Read a single CSV file into a pandas DataFrame (in the read executor)."""
         file_path = Path(file_path)
         if not file_path.exists():
             raise FileNotFoundError(f"CSV file not found: {file_path}")
         
         try:
-            df = pd.read_csv(
+            df = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                self._read_csv_sync,
                 file_path,
-                delimiter=self.config.delimiter,
-                encoding=self.config.encoding
+                dict(self.read_kwargs, dtype=dtype),
+                self.frame_cache,
             )
             logger.info(f"Read {len(df)} rows from {file_path.name}")
             return df
         except Exception as e:
             raise CSVProcessingError(f"Error reading {file_path}: {e}")
     
+    @staticmethod
+    def _read_csv_sync(
+        file_path: Path, read_kwargs: Dict[str, Any], frame_cache: Optional[FrameCache] = None
+    ) -> pd.DataFrame:
+        if frame_cache is None:
+            return pd.read_csv(file_path, **read_kwargs)
+        # Keyed before parsing, so a file changed meanwhile is not cached under its new mtime
+        key = frame_cache.key(file_path, read_kwargs)
+        df = frame_cache.get(key)
+        if df is None:
+            df = pd.read_csv(file_path, **read_kwargs)
+            frame_cache.set(key, df)
+        return df
+    
+    async def read_csv_files(
+        self,
+        file_paths: List[Union[str, Path]],
+        dtypes: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[Tuple[Path, Union[pd.DataFrame, Exception]]]:
+        """Read files in parallel; results (or per-file errors) keep the order of ``file_paths``."""
+        dtypes = dtypes or [None] * len(file_paths)
+        results = await asyncio.gather(
+            *(self.read_csv(file_path, dtype) for file_path, dtype in zip(file_paths, dtypes)),
+            return_exceptions=True,
+        )
+        return [(Path(file_path), result) for file_path, result in zip(file_paths, results)]
+    
     async def combine_csv_files(
         self,
         file_paths: Optional[List[Union[str, Path]]] = None,
-        output_file: Optional[Union[str, Path]] = None
+        output_file: Optional[Union[str, Path]] = None,
+        sort_by: Optional[List[str]] = None
     ) -> Path:
-        """Combine multiple CSV files into a single file."""
+        """Combine multiple CSV files into a single file, sorted by ``sort_by`` if given."""
         if file_paths is None:
             file_paths = await self.find_csv_files()
         
@@ -102,6 +257,10 @@ class CSVProcessor(ServiceProtocol):
             raise CSVProcessingError("No CSV files found to process")
         
         output_file = Path(output_file) if output_file else self.config.output_file
+        sort_by = sort_by or self.config.sort_by
+        output_format = resolve_format(self.config.output_format)
+        if output_format != "csv":
+            output_file = output_file.with_suffix(SUFFIXES[output_format])
         
         # Ensure output directory exists and is writable
         output_dir = output_file.parent
@@ -113,38 +272,366 @@ class CSVProcessor(ServiceProtocol):
             output_file = temp_dir / output_file.name
             logger.warning(f"Output directory not writable, using temporary directory: {output_file}")
         
+        run_cache = self.run_cache
+        run_key = None
+        if run_cache is not None:
+            parameters = self.config.model_dump(mode="json", include=self.RUN_PARAMETERS)
+            parameters.update(output_file=str(output_file.resolve()), output_format=output_format, sort_by=sort_by)
+            if self.config.add_source_column:
+                # The paths are written to the output as given
+                parameters["file_paths"] = [str(file_path) for file_path in file_paths]
+            run_key = await asyncio.to_thread(run_cache.key, self.name, parameters, file_paths)
+            cached = run_cache.get(run_key)
+            if cached is not None:
+                logger.info(f"Input files unchanged, reusing {cached['output_file']}")
+                return Path(cached["output_file"])
+        
+        output_file = await self._combine(file_paths, output_file, output_format, sort_by)
+        if run_cache is not None:
+            run_cache.set(run_key, {"output_file": str(output_file)}, outputs=[output_file])
+        return output_file
+    
+    async def _combine(
+        self,
+        file_paths: List[Union[str, Path]],
+        output_file: Path,
+        output_format: str,
+        sort_by: Optional[List[str]] = None,
+    ) -> Path:
+        """Combine the files with the cheapest applicable method (off the event loop)."""
+        if sort_by:
+            if self.config.incremental:
+                logger.warning(f"Incremental mode cannot keep the output sorted, rebuilding {output_file}")
+            return await asyncio.to_thread(self._combine_sorted, file_paths, output_file, output_format, sort_by)
+        
+        if self.config.incremental and self.config.dedup:
+            logger.warning(f"Incremental mode cannot drop duplicates across runs, rebuilding {output_file}")
+        elif self.config.incremental:
+            if output_format == "csv":
+                return await asyncio.to_thread(self._combine_incremental, file_paths, output_file)
+            logger.warning(f"Incremental mode supports CSV output only, rebuilding {output_file}")
+        
+        if output_format == "csv" and not self.config.add_source_column and not self.config.dedup and await asyncio.to_thread(
+            self._combine_bytes, file_paths, output_file
+        ):
+            return output_file
+        
+        if self.config.streaming or self.config.dedup:
+            return await asyncio.to_thread(self._combine_streaming, file_paths, output_file, output_format)
+        
         try:
-            # Read and combine all CSV files
+            # Read all CSV files in parallel, then combine them in the given order
+            plan = await asyncio.to_thread(self._plan_schema, file_paths) if self.config.compact_dtypes else None
+            if plan is not None:
+                file_paths = [schema.path for schema in plan.files]
             dfs = []
-            for file_path in file_paths:
-                try:
-                    df = await self.read_csv(file_path)
-                    # Add source file column
-                    df['_source_file'] = str(file_path)
-                    dfs.append(df)
-                except Exception as e:
-                    logger.error(f"Error processing {file_path}: {e}")
+            read_dtypes = [plan.read_dtypes(schema) for schema in plan.files] if plan else None
+            for file_path, df in await self.read_csv_files(file_paths, read_dtypes):
+                if isinstance(df, Exception):
+                    logger.error(f"Error processing {file_path}: {df}")
                     continue
+                # Add source file column
+                if self.config.add_source_column:
+                    df[SOURCE_COLUMN] = str(file_path)
+                if plan is not None:
+                    df = align_chunk(df, plan.dtypes(parse_dates=output_format != "csv"))
+                dfs.append(df)
             
             if not dfs:
                 raise CSVProcessingError("No valid CSV data to combine")
             
-            # Combine all DataFrames
-            combined_df = pd.concat(dfs, ignore_index=True)
+            # Combine all DataFrames and write them to the output file
+            combined_df = await asyncio.to_thread(self._write_combined, dfs, output_file, output_format)
+            
+            logger.info(f"Combined {len(dfs)} files into {output_file} with {len(combined_df)} rows")
+            return output_file
             
-            # Write combined data to output file
+        except Exception as e:
+            raise CSVProcessingError(f"Error combining CSV files: {e}")
+    
+    def _plan_schema(self, file_paths: List[Union[str, Path]]) -> SchemaPlan:
+        """Scan all files (or reuse cached scans) and plan their compact schema."""
+        try:
+            return infer_schema(
+                file_paths,
+                self.config.chunk_size,
+                source_column=SOURCE_COLUMN if self.config.add_source_column else None,
+                read_kwargs=self.read_kwargs,
+                compact=True,
+                cache=self.schema_cache,
+                executor=self.executor,
+            )
+        except ValueError as e:
+            raise CSVProcessingError(str(e))
+    
+    def _write_combined(self, dfs: List[pd.DataFrame], output_file: Path, output_format: str) -> pd.DataFrame:
+        combined_df = pd.concat(dfs, ignore_index=True)
+        if output_format == "csv":
             combined_df.to_csv(
                 output_file,
                 index=False,
                 encoding=self.config.encoding,
                 sep=self.config.delimiter
             )
-            
-            logger.info(f"Combined {len(dfs)} files into {output_file} with {len(combined_df)} rows")
-            return output_file
-            
+        else:
+            with open_writer(output_format, output_file, combined_df.dtypes, self.config.compression) as writer:
+                writer.write(combined_df)
+        return combined_df
+    
+    def _combine_bytes(self, file_paths: List[Union[str, Path]], output_file: Path) -> bool:
+        """Concatenate files with identical headers without parsing; False if they differ."""
+        try:
+            written = concat_csv_bytes(file_paths, output_file, encoding=self.config.encoding)
+        except OSError as e:
+            raise CSVProcessingError(f"Error combining CSV files: {e}")
+        
+        if written is None:
+            logger.debug("CSV headers differ, combining by parsing")
+            return False
+        logger.info(f"Concatenated {len(file_paths)} files into {output_file} ({written} bytes)")
+        return True
+    
+    def _deduplicator(self) -> ContextManager[Optional[RowDeduplicator]]:
+        """Duplicate filter for one combine (a no-op context when ``dedup`` is off)."""
+        if not self.config.dedup:
+            return nullcontext()
+        return RowDeduplicator(
+            self.config.dedup_columns,
+            capacity=self.config.dedup_capacity,
+            temp_dir=fs.get_temp_dir(prefix="dun_csv_"),
+            exclude=[SOURCE_COLUMN],
+        )
+    
+    def _combine_streaming(
+        self, file_paths: List[Union[str, Path]], output_file: Path, output_format: str = "csv"
+    ) -> Path:
+        """Combine files chunk by chunk; peak memory depends on ``chunk_size`` only."""
+        try:
+            with self._deduplicator() as dedup:
+                result = combine_csv_stream(
+                    file_paths,
+                    output_file,
+                    chunk_size=self.config.chunk_size,
+                    source_column=SOURCE_COLUMN if self.config.add_source_column else None,
+                    read_kwargs=self.read_kwargs,
+                    write_kwargs={"sep": self.config.delimiter},
+                    encoding=self.config.encoding,
+                    executor=self.executor,
+                    output_format=output_format,
+                    compression=self.config.compression,
+                    compact=self.config.compact_dtypes,
+                    schema_cache=self.schema_cache,
+                    dedup=dedup,
+                )
+        except Exception as e:
+            raise CSVProcessingError(f"Error combining CSV files: {e}")
+        
+        logger.info(f"Combined {len(result.files)} files into {output_file} with {result.rows} rows")
+        return output_file
+    
+    def _combine_sorted(
+        self, file_paths: List[Union[str, Path]], output_file: Path, output_format: str, sort_by: List[str]
+    ) -> Path:
+        """External merge sort; sorted runs are spilled to the file system service's temp dir."""
+        try:
+            with self._deduplicator() as dedup:
+                result = sort_csv_stream(
+                    file_paths,
+                    output_file,
+                    sort_by,
+                    ascending=self.config.sort_ascending,
+                    chunk_size=self.config.chunk_size,
+                    source_column=SOURCE_COLUMN if self.config.add_source_column else None,
+                    read_kwargs=self.read_kwargs,
+                    write_kwargs={"sep": self.config.delimiter},
+                    encoding=self.config.encoding,
+                    executor=self.executor,
+                    output_format=output_format,
+                    compression=self.config.compression,
+                    compact=self.config.compact_dtypes,
+                    schema_cache=self.schema_cache,
+                    temp_dir=fs.get_temp_dir(prefix="dun_csv_"),
+                    dedup=dedup,
+                )
+        except Exception as e:
+            raise CSVProcessingError(f"Error combining CSV files: {e}")
+        
+        logger.info(f"Combined {len(result.files)} files into {output_file} with {result.rows} rows sorted by {sort_by}")
+        return output_file
+    
+    def _combine_incremental(self, file_paths: List[Union[str, Path]], output_file: Path) -> Path:
+        """Append only the files not yet ingested into ``output_file`` (see ``csv_incremental``)."""
+        try:
+            result = combine_csv_incremental(
+                file_paths,
+                output_file,
+                chunk_size=self.config.chunk_size,
+                source_column=SOURCE_COLUMN if self.config.add_source_column else None,
+                read_kwargs=self.read_kwargs,
+                write_kwargs={"sep": self.config.delimiter},
+                encoding=self.config.encoding,
+                executor=self.executor,
+                compact=self.config.compact_dtypes,
+                schema_cache=self.schema_cache,
+            )
         except Exception as e:
             raise CSVProcessingError(f"Error combining CSV files: {e}")
+        
+        action = "Rebuilt" if result.rebuilt else "Appended"
+        logger.info(f"{action} {len(result.files)} files into {output_file}")
+        return output_file
+    
+    async def summarize_csv_files(self, file_paths: Optional[List[Union[str, Path]]] = None) -> Dict[str, Any]:
+        """Per-column statistics of the files in one streaming pass, without writing output."""
+        if file_paths is None:
+            file_paths = await self.find_csv_files()
+        
+        if not file_paths:
+            raise CSVProcessingError("No CSV files found to process")
+        
+        try:
+            summary = await asyncio.to_thread(
+                summarize_csv, file_paths, self.config.chunk_size, self.read_kwargs, self.executor
+            )
+        except ValueError as e:
+            raise CSVProcessingError(str(e))
+        
+        logger.info(f"Summarized {len(summary.files)} files with {summary.rows} rows")
+        return summary.to_dict()
+    
+    async def query_csv_files(
+        self,
+        query: Union[Query, Dict[str, Any]],
+        file_paths: Optional[List[Union[str, Path]]] = None
+    ) -> QueryResult:
+        """Run a query (see ``csv_query``) over the files, reading only the columns and files it needs."""
+        if file_paths is None:
+            file_paths = await self.find_csv_files()
+        
+        if not file_paths:
+            raise CSVProcessingError("No CSV files found to process")
+        
+        try:
+            query = query if isinstance(query, Query) else Query.from_dict(query)
+            result = await asyncio.to_thread(
+                query_csv,
+                file_paths,
+                query,
+                self.config.chunk_size,
+                self.read_kwargs,
+                self.executor,
+                self.schema_cache,
+                self.range_cache,
+            )
+        except ValueError as e:
+            raise CSVProcessingError(str(e))
+        
+        logger.info(
+            f"Queried {len(result.files)} files ({len(result.skipped)} skipped by column ranges, "
+            f"{result.rows_scanned} rows read): {len(result.frame)} result rows"
+        )
+        return result
+    
+    async def join_csv_files(
+        self,
+        left: Union[str, Path, List[Union[str, Path]]],
+        right: Union[str, Path, List[Union[str, Path]]],
+        on: Union[str, List[str]],
+        how: Literal["inner", "left", "outer"] = "inner",
+        output_file: Optional[Union[str, Path]] = None
+    ) -> Path:
+        """Join two CSV files (or lists of files read as one table) on the ``on`` columns."""
+        left_paths = left if isinstance(left, list) else [left]
+        right_paths = right if isinstance(right, list) else [right]
+        on = [on] if isinstance(on, str) else list(on)
+        output_format = resolve_format(self.config.output_format)
+        output_file = Path(output_file) if output_file else self.config.output_dir / "joined.csv"
+        output_file = output_file.with_suffix(SUFFIXES[output_format])
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        try:
+            result = await asyncio.to_thread(
+                join_csv,
+                left_paths,
+                right_paths,
+                output_file,
+                on,
+                how=how,
+                chunk_size=self.config.chunk_size,
+                read_kwargs=self.read_kwargs,
+                write_kwargs={"sep": self.config.delimiter},
+                encoding=self.config.encoding,
+                output_format=output_format,
+                compression=self.config.compression,
+                memory_budget=self.config.join_memory_mb * 1024 * 1024,
+                temp_dir=fs.get_temp_dir(prefix="dun_csv_"),
+            )
+        except Exception as e:
+            raise CSVProcessingError(f"Error joining CSV files: {e}")
+        
+        mode = f"grace hash join, {result.partitions} partitions" if result.partitions > 1 else "hash join"
+        logger.info(f"Joined {left_paths} and {right_paths} on {on} into {output_file}: {result.rows} rows ({mode})")
+        return output_file
+    
+    @staticmethod
+    def _parse_join_request(request: str, files: List[Path]) -> Optional[Dict[str, Any]]:
+        """Find the two files and the key of "join customers with orders on customer_id"."""
+        key = JOIN_KEY_PATTERN.search(request)
+        if key is None:
+            return None
+        words = [(match.start(), match.group()) for match in re.finditer(r"\w+", fold_text(request[:key.start()]))]
+        mentioned = {}
+        for file_path in files:
+            stem = fold_text(file_path.stem)
+            prefix = stem[:JOIN_NAME_PREFIX]
+            for position, word in words:
+                if word.startswith(prefix) or stem.startswith(word[:JOIN_NAME_PREFIX]) and len(word) >= len(prefix):
+                    mentioned.setdefault(file_path, position)
+                    break
+        if len(mentioned) != 2:
+            return None
+        left, right = sorted(mentioned, key=mentioned.get)
+        request_lower = fold_text(request)
+        how = "inner"
+        if any(word in request_lower for word in ("outer", "full", "pelne")):
+            how = "outer"
+        elif "left" in request_lower or "lewe" in request_lower:
+            how = "left"
+        return {"left": left, "right": right, "on": key.group(1), "how": how}
+    
+    def _parse_query_request(self, request: str, files: List[Path]) -> Optional[Query]:
+        """Build the query of "sum of column amount for 2024" from the column names of the files."""
+        words = re.findall(r"[\w.]+", fold_text(request))
+        aggregate = next((i for i, word in enumerate(words) if word in QUERY_AGGREGATES), None)
+        if aggregate is None or not files:
+            return None
+        sample = pd.read_csv(files[0], nrows=QUERY_SAMPLE_ROWS, **self.read_kwargs)
+        columns = list(dict.fromkeys(
+            name for file_path in files for name in pd.read_csv(file_path, nrows=0, **self.read_kwargs).columns
+        ))
+        
+        where = []
+        year = QUERY_YEAR_PATTERN.search(request)
+        date_columns = [
+            name for name in sample.columns
+            if sample[name].dtype == object and sample[name].notna().any()
+            and sample[name].dropna().str.match(r"\d{4}-\d{2}-\d{2}").all()
+        ]
+        if year is not None:
+            year_columns = [name for name in columns if fold_text(name) in ("year", "rok")]
+            if date_columns:
+                where.append(Filter(date_columns[0], "startswith", year.group()))
+            elif year_columns:
+                where.append(Filter(year_columns[0], "==", int(year.group())))
+            else:
+                return None
+        
+        by_name = {fold_text(name): name for name in columns if name not in date_columns}
+        column = next((by_name[word] for word in words[aggregate + 1:] if word in by_name), None)
+        func = QUERY_AGGREGATES[words[aggregate]]
+        if column is None and func != "count":
+            return None
+        return Query(where=where, aggregates=[Aggregate(func, column)])
     
     async def process_csv_request(self, request: str) -> Dict[str, Any]:
         """Process a natural language request for CSV operations."""
@@ -154,6 +641,27 @@ class CSVProcessor(ServiceProtocol):
         # Simple keyword-based processing for demonstration
         request_lower = request.lower()
         
+        if "join" in request_lower or "połącz" in request_lower or "merge" in request_lower:
+            join = self._parse_join_request(request, await self.find_csv_files())
+            if join is not None:
+                output_file = await self.join_csv_files(**join)
+                return {
+                    "status": "success",
+                    "message": f"Successfully joined {join['left'].name} and {join['right'].name} on {join['on']}",
+                    "output_file": str(output_file)
+                }
+        
+        if any(word in QUERY_AGGREGATES for word in re.findall(r"\w+", fold_text(request))):
+            files = await self.find_csv_files()
+            query = await asyncio.to_thread(self._parse_query_request, request, files)
+            if query is not None:
+                result = await self.query_csv_files(query, files)
+                return {
+                    "status": "success",
+                    "message": f"Queried {len(result.files)} CSV files ({len(result.skipped)} skipped)",
+                    "result": result.to_dict()
+                }
+        
         if "combine" in request_lower or "join" in request_lower:
             output_file = await self.combine_csv_files()
             return {
@@ -161,6 +669,13 @@ class CSVProcessor(ServiceProtocol):
                 "message": f"Successfully combined CSV files into {output_file}",
                 "output_file": str(output_file)
             }
+        elif any(word in request_lower for word in ("summary", "summarize", "describe", "podsumowanie", "statystyk")):
+            summary = await self.summarize_csv_files()
+            return {
+                "status": "success",
+                "message": f"Summarized {len(summary['files'])} CSV files with {summary['rows']} rows",
+                "summary": summary
+            }
         elif "list" in request_lower or "show" in request_lower:
             files = await self.find_csv_files()
             return {
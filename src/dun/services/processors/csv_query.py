@@ -0,0 +1,488 @@
+"""Column projection and filter pushdown for queries over CSV files.
+
+A ``Query`` names the columns it returns, row filters and optionally
+group-by columns with aggregates. Instead of loading and concatenating the
+files, every file is read chunk by chunk with
+
+* ``usecols`` restricted to the columns the query touches,
+* explicit ``dtype=`` hints taken from the cached scan of the file (see
+  ``csv_schema``), so no chunk has to infer its types, and
+* the filters applied to each chunk as it is read; with aggregates every
+  chunk is reduced to partial results (sums, counts, minima, maxima per
+  group) right away, so memory follows the number of groups.
+
+Files are skipped without being opened when their column ranges prove that
+no row can match: the numeric minimum and maximum of the cached scan, and
+the ranges every query records per file in ``CACHE_DIR/csv_ranges`` (keyed
+by path, size, modification time and read options, like the scans). A
+filter never matches a missing value, so a file without a filter column is
+skipped as well.
+"""
+import logging
+import operator
+import os
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from dun.services.cache import DiskCache, make_key
+from dun.services.processors.csv_schema import DEFAULT_CHUNK_SIZE, FileSchema, SchemaCache, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+OPERATORS = set(COMPARISONS) | {"in", "between", "startswith"}
+# Partial results each aggregate is computed from, and how partials are combined
+PARTIALS = {"sum": ["sum"], "count": ["count"], "mean": ["sum", "count"], "min": ["min"], "max": ["max"]}
+COMBINE = {"sum": "sum", "count": "sum", "size": "sum", "min": "min", "max": "max"}
+
+
+def _as_number(value: Any) -> Any:
+    """``value`` (or each of a list) as a float if it is numeric text, else unchanged."""
+    if isinstance(value, list):
+        return [_as_number(item) for item in value]
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+@dataclass
+class Filter:
+    """Row condition ``column <op> value``; missing values never match."""
+    column: str
+    op: str
+    value: Any
+
+    def __post_init__(self) -> None:
+        if self.op not in OPERATORS:
+            raise ValueError(f"Unknown filter operator: {self.op}")
+        if self.op in ("in", "between"):
+            self.value = list(self.value)
+            if self.op == "between" and len(self.value) != 2:
+                raise ValueError(f"'between' needs two bounds, got {self.value}")
+
+    def _comparable(self, column: pd.Series) -> Tuple[pd.Series, Any]:
+        # Numbers written as text in the query compare with numeric columns and vice versa
+        if column.dtype.kind in "iuf":
+            return column, _as_number(self.value)
+        values = self.value if isinstance(self.value, list) else [self.value]
+        if column.dtype == object and all(_is_number(value) for value in values):
+            return pd.to_numeric(column, errors="coerce"), self.value
+        return column, self.value
+
+    def mask(self, column: pd.Series) -> np.ndarray:
+        """Boolean mask of the values of ``column`` that match."""
+        if self.op == "startswith":
+            matches = column.astype("string").str.startswith(str(self.value))
+            return matches.fillna(False).to_numpy(dtype=bool)
+        values, value = self._comparable(column)
+        if self.op == "in":
+            matches = values.isin(value)
+        elif self.op == "between":
+            matches = (values >= value[0]) & (values <= value[1])
+        else:
+            matches = COMPARISONS[self.op](values, value)
+        return (matches & values.notna()).to_numpy(dtype=bool)
+
+    def may_match(self, value_range: Optional[List[Any]]) -> bool:
+        """False only if no value within ``[minimum, maximum]`` can match (``None``: all missing)."""
+        if value_range is None:
+            return False
+        low, high = value_range
+        value = _as_number(self.value) if _is_number(low) else self.value
+        try:
+            if self.op == "startswith":
+                prefix = str(value)
+                return not isinstance(low, str) or low[:len(prefix)] <= prefix <= high[:len(prefix)]
+            if self.op == "in":
+                return any(low <= item <= high for item in value)
+            if self.op == "between":
+                return value[0] <= high and low <= value[1]
+            if self.op == "!=":
+                return not low == high == value
+            if self.op == "==":
+                return low <= value <= high
+            # The smallest value decides for < and <=, the largest for > and >=
+            return bool(COMPARISONS[self.op](low if self.op in ("<", "<=") else high, value))
+        except TypeError:
+            return True  # not comparable (e.g. numbers against text), read the file
+
+
+@dataclass
+class Aggregate:
+    """``func`` of ``column`` per group; ``count`` without a column counts rows."""
+    func: str
+    column: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.func not in PARTIALS:
+            raise ValueError(f"Unknown aggregate: {self.func}")
+        if self.column is None and self.func != "count":
+            raise ValueError(f"Aggregate '{self.func}' needs a column")
+
+    @property
+    def name(self) -> str:
+        return self.func if self.column is None else f"{self.func}_{self.column}"
+
+    @property
+    def partials(self) -> List[str]:
+        if self.column is None:
+            return ["size"]
+        return [f"{part}:{self.column}" for part in PARTIALS[self.func]]
+
+
+@dataclass
+class Query:
+    """Columns, filters and aggregates of a query over CSV files.
+
+    Without ``aggregates`` or ``group_by`` the matching rows are returned,
+    restricted to ``select`` (all columns if empty) and to the first
+    ``limit``. Otherwise one row per group is returned; ``group_by`` alone
+    counts the rows of every group. ``dtypes`` override the read dtypes.
+    """
+    select: List[str] = field(default_factory=list)
+    where: List[Filter] = field(default_factory=list)
+    group_by: List[str] = field(default_factory=list)
+    aggregates: List[Aggregate] = field(default_factory=list)
+    dtypes: Dict[str, Any] = field(default_factory=dict)
+    limit: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.group_by and not self.aggregates:
+            self.aggregates = [Aggregate("count")]
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Query":
+        """Build a query from JSON, e.g. as emitted by an LLM::
+
+            {"select": ["amount"], "where": [{"column": "date", "op": "startswith", "value": "2024"}],
+             "group_by": ["region"], "aggregates": [{"func": "sum", "column": "amount"}]}
+
+        Raises:
+            ValueError: If an operator or aggregate is unknown.
+        """
+        try:
+            return cls(
+                select=list(data.get("select") or []),
+                where=[Filter(**item) for item in data.get("where") or []],
+                group_by=list(data.get("group_by") or []),
+                aggregates=[Aggregate(**item) for item in data.get("aggregates") or []],
+                dtypes=dict(data.get("dtypes") or {}),
+                limit=data.get("limit"),
+            )
+        except TypeError as e:
+            raise ValueError(f"Invalid query: {e}")
+
+    @property
+    def is_aggregate(self) -> bool:
+        return bool(self.aggregates)
+
+    @property
+    def output_columns(self) -> List[str]:
+        if self.is_aggregate:
+            return self.group_by + [aggregate.name for aggregate in self.aggregates]
+        return list(self.select)
+
+    @property
+    def columns(self) -> List[str]:
+        """Columns read from the files (empty: all of them)."""
+        if not self.is_aggregate and not self.select:
+            return []
+        names = self.group_by if self.is_aggregate else self.select
+        names = names + [aggregate.column for aggregate in self.aggregates if aggregate.column is not None]
+        return list(dict.fromkeys(names + [condition.column for condition in self.where]))
+
+    def partial(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Partial aggregates of ``frame``: one row per group, combinable with ``combine``."""
+        specs = {
+            name: (aggregate.column, name.split(":", 1)[0])
+            for aggregate in self.aggregates if aggregate.column is not None
+            for name in aggregate.partials
+        }
+        if self.group_by:
+            groups = frame.groupby(self.group_by, dropna=False, sort=False, observed=True)
+            partial = groups.agg(**specs) if specs else pd.DataFrame(index=groups.size().index)
+            partial["size"] = groups.size()
+            return partial
+        row = {name: [getattr(frame[column], func)()] for name, (column, func) in specs.items()}
+        row["size"] = [len(frame)]
+        return pd.DataFrame(row)
+
+    def combine(self, partials: Sequence[pd.DataFrame]) -> pd.DataFrame:
+        """Merge partial aggregates of disjoint sets of rows."""
+        combined = pd.concat(partials)
+        how = {name: COMBINE[name.split(":", 1)[0]] for name in combined.columns}
+        if self.group_by:
+            return combined.groupby(level=list(range(len(self.group_by))), dropna=False, sort=False).agg(how)
+        return pd.DataFrame({name: [combined[name].agg(func)] for name, func in how.items()})
+
+    def finish(self, partial: pd.DataFrame) -> pd.DataFrame:
+        """Final aggregates from the combined partials."""
+        result = pd.DataFrame(index=partial.index)
+        for aggregate in self.aggregates:
+            if aggregate.column is None:
+                result[aggregate.name] = partial["size"]
+            elif aggregate.func == "mean":
+                total, count = (partial[name] for name in aggregate.partials)
+                result[aggregate.name] = total.where(count > 0) / count.where(count > 0)
+            else:
+                result[aggregate.name] = partial[aggregate.partials[0]]
+        if self.group_by:
+            result = result.sort_index().reset_index()
+        return result.reset_index(drop=True)
+
+
+@dataclass
+class QueryResult:
+    """Rows or aggregates of a query and the files it read."""
+    frame: pd.DataFrame
+    files: List[Path] = field(default_factory=list)  # files read
+    skipped: List[Path] = field(default_factory=list)  # files proven not to match
+    failed: Dict[str, str] = field(default_factory=dict)
+    rows_scanned: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable result; missing values become ``None``."""
+        records = self.frame.astype(object).where(self.frame.notna(), None)
+        return {
+            "columns": [str(name) for name in self.frame.columns],
+            "data": records.to_dict("records"),
+            "files": [str(path) for path in self.files],
+            "skipped": [str(path) for path in self.skipped],
+            "failed": self.failed,
+            "rows_scanned": self.rows_scanned,
+        }
+
+
+class RangeCache:
+    """Minimum and maximum of columns per file, recorded by queries.
+
+    Entries hold the header of the file and ``[minimum, maximum]`` (``None``
+    when every value is missing) of the columns read so far.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+
+    @classmethod
+    def from_settings(cls) -> "RangeCache":
+        return cls(DiskCache.from_settings("csv_ranges", max_entries=4096))
+
+    def key(self, path: Union[str, Path], read_kwargs: Dict[str, Any]) -> str:
+        stat = os.stat(path)
+        return make_key(str(Path(path).resolve()), stat.st_size, stat.st_mtime_ns, read_kwargs, self.FORMAT_VERSION)
+
+    def get(self, key: str) -> Dict[str, Any]:
+        return self.cache.get(key) or {"columns": None, "ranges": {}}
+
+    def update(self, key: str, columns: List[str], ranges: Dict[str, Optional[List[Any]]]) -> None:
+        entry = self.get(key)
+        self.cache.set(key, {"columns": columns, "ranges": {**entry["ranges"], **ranges}})
+
+
+def _schema_ranges(schema: FileSchema) -> Dict[str, Optional[List[Any]]]:
+    """Ranges the scan of a file proves: numeric minimum/maximum and all-missing columns."""
+    ranges: Dict[str, Optional[List[Any]]] = {}
+    for name in schema.columns:
+        stats = schema.stats.get(name)
+        if schema.rows == 0 or schema.all_na.get(name):
+            ranges[name] = None
+        elif stats is not None and stats.minimum is not None and schema.dtypes[name].kind in "iuf":
+            ranges[name] = [stats.minimum, stats.maximum]
+    return ranges
+
+
+_UNKNOWN = object()
+
+
+def _column_range(column: pd.Series) -> Any:
+    values = column.dropna()
+    if values.empty:
+        return None
+    if column.dtype.kind not in "biuf" and column.dtype != object:
+        return _UNKNOWN
+    try:
+        low, high = values.min(), values.max()
+    except TypeError:
+        return _UNKNOWN  # mixed types
+    if isinstance(low, np.generic):
+        low, high = low.item(), high.item()
+    return [low, high]
+
+
+def _merge_range(left: Any, right: Any) -> Any:
+    if left is _UNKNOWN or right is _UNKNOWN:
+        return _UNKNOWN
+    if left is None or right is None:
+        return right if left is None else left
+    try:
+        return [min(left[0], right[0]), max(left[1], right[1])]
+    except TypeError:
+        return _UNKNOWN
+
+
+@dataclass
+class FileQuery:
+    """Result of a query over one file."""
+    path: Path
+    columns: List[str]  # header of the file
+    frame: Optional[pd.DataFrame]  # matching rows or partial aggregates
+    rows: int = 0  # rows read
+    ranges: Optional[Dict[str, Optional[List[Any]]]] = None  # of the read columns, if read completely
+    skipped: bool = False  # a filter column is missing
+
+
+def query_file(
+    path: Union[str, Path],
+    query: Query,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    dtypes: Optional[Dict[str, Any]] = None,
+    **read_kwargs: Any,
+) -> FileQuery:
+    """Run ``query`` over one file, reading only the columns it touches."""
+    header = list(pd.read_csv(path, nrows=0, **read_kwargs).columns)
+    present = set(header)
+    if any(condition.column not in present for condition in query.where):
+        return FileQuery(Path(path), header, None, ranges={}, skipped=True)
+
+    wanted = query.columns
+    usecols = [name for name in wanted if name in present] if wanted else None
+    read_dtypes = {name: dtype for name, dtype in {**(dtypes or {}), **query.dtypes}.items()
+                   if usecols is None and name in present or usecols is not None and name in usecols}
+    parts: List[pd.DataFrame] = []
+    ranges: Dict[str, Any] = {}
+    rows = matched = 0
+    complete = True
+    for chunk in iter_chunks(path, chunk_size, usecols=usecols, dtype=read_dtypes or None, **read_kwargs):
+        rows += len(chunk)
+        for name in chunk.columns:
+            ranges[name] = _merge_range(ranges.get(name), _column_range(chunk[name]))
+        if wanted:
+            chunk = chunk.reindex(columns=wanted)
+        mask = np.ones(len(chunk), dtype=bool)
+        for condition in query.where:
+            mask &= condition.mask(chunk[condition.column])
+        chunk = chunk[mask]
+        if query.is_aggregate:
+            parts.append(query.partial(chunk))
+            continue
+        parts.append(chunk)
+        matched += len(chunk)
+        if query.limit is not None and matched >= query.limit:
+            complete = False
+            break
+
+    if query.is_aggregate:
+        frame = query.combine(parts) if parts else None
+    else:
+        frame = pd.concat(parts, ignore_index=True) if parts else None
+    known = {name: value for name, value in ranges.items() if value is not _UNKNOWN} if complete else None
+    return FileQuery(Path(path), header, frame, rows, known)
+
+
+def query_csv(
+    file_paths: Sequence[Union[str, Path]],
+    query: Query,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    executor: Optional[Executor] = None,
+    schema_cache: Optional[SchemaCache] = None,
+    range_cache: Optional[RangeCache] = None,
+) -> QueryResult:
+    """Run ``query`` over ``file_paths`` as if they were concatenated.
+
+    Files whose cached column ranges prove that no row matches are skipped;
+    the others are read (in parallel with an ``executor``) and their results
+    combined in the order of ``file_paths``. Files that cannot be read are
+    skipped and reported in ``failed``.
+
+    Raises:
+        ValueError: If none of the files could be read or a column is in none of them.
+    """
+    read_kwargs = dict(read_kwargs or {})
+    result = QueryResult(pd.DataFrame())
+    headers: List[List[str]] = []
+    pending: List[tuple] = []
+    for path in file_paths:
+        try:
+            schema = schema_cache.get(path, read_kwargs) if schema_cache is not None else None
+            range_key = range_cache.key(path, read_kwargs) if range_cache is not None else None
+        except OSError:
+            schema, range_key = None, None  # reported when the file is read
+        entry = range_cache.get(range_key) if range_key is not None else {"columns": None, "ranges": {}}
+        columns = entry["columns"] or (schema.columns if schema is not None else None)
+        ranges = {**(_schema_ranges(schema) if schema is not None else {}), **entry["ranges"]}
+        if columns is not None:
+            ranges.update({name: None for name in query.columns if name not in columns})
+        if any(condition.column in ranges and not condition.may_match(ranges[condition.column])
+               for condition in query.where):
+            headers.append(columns)
+            result.skipped.append(Path(path))
+            continue
+        dtypes = {name: dtype for name, dtype in schema.dtypes.items()} if schema is not None else None
+        args = (path, query, chunk_size, dtypes)
+        future: Optional[Future] = executor.submit(query_file, *args, **read_kwargs) if executor else None
+        pending.append((path, range_key, future, args))
+
+    frames: List[pd.DataFrame] = []
+    matched = 0
+    for index, (path, range_key, future, args) in enumerate(pending):
+        try:
+            part = future.result() if future is not None else query_file(*args, **read_kwargs)
+        except Exception as e:
+            logger.error(f"Error processing {path}: {e}")
+            result.failed[str(path)] = str(e)
+            continue
+        headers.append(part.columns)
+        if part.skipped:
+            result.skipped.append(part.path)
+        else:
+            result.files.append(part.path)
+            result.rows_scanned += part.rows
+        if range_key is not None and part.ranges is not None:
+            range_cache.update(range_key, part.columns, part.ranges)
+        if part.frame is not None:
+            frames.append(part.frame)
+            matched += len(part.frame)
+        if not query.is_aggregate and query.limit is not None and matched >= query.limit:
+            for _, _, rest, _ in pending[index + 1:]:
+                if rest is not None:
+                    rest.cancel()
+            break
+
+    if not headers:
+        raise ValueError("No valid CSV data to query")
+    known = set().union(*headers)
+    unknown = [name for name in query.columns if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+
+    if query.is_aggregate:
+        frames = frames or [query.partial(pd.DataFrame(columns=query.columns))]
+        result.frame = query.finish(query.combine(frames))
+    else:
+        columns = query.output_columns or list(dict.fromkeys(name for header in headers for name in header))
+        frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        frame = frame.reindex(columns=columns)
+        result.frame = frame.head(query.limit) if query.limit is not None else frame
+    return result
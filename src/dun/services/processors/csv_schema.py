@@ -0,0 +1,333 @@
+"""Schema inference for sets of CSV shards.
+
+Every input is scanned chunk by chunk to learn its columns, the dtype
+``pd.read_csv`` would infer for the whole file, which columns are entirely
+empty and a few statistics per column (numeric range, whether the numbers
+survive ``float32``, distinct strings and date formats). From these a
+``SchemaPlan`` derives
+
+* the union schema (column order and dtypes) of ``pd.concat`` of all
+  files, resolved by letting pandas concatenate one-row proxies, and
+* optionally a compact version of it: downcast integers and floats,
+  ``category`` for low-cardinality text (including the source column) and
+  parsed dates, passed as explicit ``dtype=`` to every read.
+
+Compact dtypes are lossless: the combined CSV text is the same as with the
+inferred ones. Scans are cached per file in ``CACHE_DIR/csv_schema`` and
+invalidated when the file size or modification time changes.
+"""
+import logging
+import os
+import re
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+# The same helper the C parser uses to merge the dtypes of its internal chunks
+from pandas.core.dtypes.cast import find_common_type
+
+from dun.services.cache import DiskCache, make_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 100_000
+# Text columns with at most this many distinct values (and at most one
+# distinct value per two rows) are stored as ``category``
+CATEGORY_LIMIT = 1000
+CATEGORY_RATIO = 0.5
+# Dates are parsed only in formats pandas writes back unchanged
+DATE_FORMATS = {
+    "%Y-%m-%d": re.compile(r"\d{4}-\d{2}-\d{2}"),
+    "%Y-%m-%d %H:%M:%S": re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}"),
+}
+INT_DTYPES = [np.dtype(t) for t in ("int8", "int16", "int32", "int64")]
+
+
+@dataclass
+class ColumnStats:
+    """Statistics of one column of one file, collected while scanning."""
+    count: int = 0  # non-missing values
+    text: bool = True  # every non-empty chunk was read as text
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    float32: bool = True  # every number round-trips through float32
+    values: Optional[List[str]] = field(default_factory=list)  # distinct texts, None above CATEGORY_LIMIT
+    date_formats: List[str] = field(default_factory=lambda: list(DATE_FORMATS))
+
+    def update(self, column: pd.Series) -> None:
+        values = column.dropna()
+        if values.empty:
+            return
+        self.count += len(values)
+        if column.dtype == object:
+            if self.values is not None:
+                distinct = set(self.values).union(values.astype(str).unique())
+                self.values = sorted(distinct) if len(distinct) <= CATEGORY_LIMIT else None
+            strings = values.astype(str)
+            self.date_formats = [
+                fmt for fmt in self.date_formats
+                if strings.str.fullmatch(DATE_FORMATS[fmt]).all()
+                and pd.to_datetime(strings, format=fmt, errors="coerce").notna().all()
+            ]
+            return
+
+        self.text = False
+        if column.dtype.kind in "iuf":
+            low, high = values.min().item(), values.max().item()
+            self.minimum = low if self.minimum is None else min(self.minimum, low)
+            self.maximum = high if self.maximum is None else max(self.maximum, high)
+            as_float = values.astype(np.float64)
+            self.float32 = self.float32 and bool((as_float.astype(np.float32) == as_float).all())
+
+
+@dataclass
+class FileSchema:
+    """Columns, whole-file dtypes and column statistics of one CSV input."""
+    path: Path
+    columns: List[str]
+    dtypes: Dict[str, Any]
+    all_na: Dict[str, bool]
+    rows: int
+    stats: Dict[str, ColumnStats] = field(default_factory=dict)
+
+    @property
+    def object_columns(self) -> List[str]:
+        """Columns read as text; re-read as such so their values keep their original form."""
+        return [name for name, dtype in self.dtypes.items() if dtype == object]
+
+    def proxy(self, source_column: Optional[str] = None) -> pd.DataFrame:
+        """A frame with at most one row that ``pd.concat`` treats like the whole file."""
+        data = {}
+        for name in self.columns:
+            dtype = self.dtypes[name]
+            if self.rows == 0:
+                values: Any = []
+            elif self.all_na[name]:
+                values = [None]
+            elif isinstance(dtype, np.dtype) and dtype != object:
+                values = np.zeros(1, dtype=dtype)
+            else:
+                values = ["x"]
+            data[name] = pd.Series(values, dtype=dtype)
+        if source_column is not None:
+            data[source_column] = pd.Series(["x"] * min(self.rows, 1), dtype=object)
+        return pd.DataFrame(data)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable form for the schema cache."""
+        return {
+            "columns": self.columns,
+            "dtypes": {name: str(dtype) for name, dtype in self.dtypes.items()},
+            "all_na": self.all_na,
+            "rows": self.rows,
+            "stats": {name: asdict(stats) for name, stats in self.stats.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, path: Union[str, Path], data: Dict[str, Any]) -> "FileSchema":
+        return cls(
+            path=Path(path),
+            columns=data["columns"],
+            dtypes={name: np.dtype(dtype) for name, dtype in data["dtypes"].items()},
+            all_na=data["all_na"],
+            rows=data["rows"],
+            stats={name: ColumnStats(**stats) for name, stats in data["stats"].items()},
+        )
+
+
+def iter_chunks(
+    path: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **read_kwargs: Any,
+) -> Iterator[pd.DataFrame]:
+    """Yield the rows of a CSV file in frames of at most ``chunk_size`` rows."""
+    with pd.read_csv(path, chunksize=chunk_size, **read_kwargs) as reader:
+        yield from reader
+
+
+def scan_file(
+    path: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **read_kwargs: Any,
+) -> FileSchema:
+    """Learn the columns, whole-file dtypes and column statistics of a CSV file in one streaming pass."""
+    columns: Optional[List[str]] = None
+    dtypes: Dict[str, Any] = {}
+    all_na: Dict[str, bool] = {}
+    stats: Dict[str, ColumnStats] = {}
+    rows = 0
+    for chunk in iter_chunks(path, chunk_size, **read_kwargs):
+        if columns is None:
+            columns = list(chunk.columns)
+            dtypes = dict(chunk.dtypes)
+            all_na = dict.fromkeys(columns, True)
+            stats = {name: ColumnStats() for name in columns}
+        if chunk.empty:
+            continue
+        na_columns = chunk.isna().all()
+        for name in columns:
+            if rows:
+                dtypes[name] = find_common_type([dtypes[name], chunk[name].dtype])
+            else:
+                dtypes[name] = chunk[name].dtype
+            all_na[name] = all_na[name] and bool(na_columns[name])
+            stats[name].update(chunk[name])
+        rows += len(chunk)
+    return FileSchema(Path(path), columns or [], dtypes, all_na, rows, stats)
+
+
+def resolve_schema(schemas: Sequence[FileSchema], source_column: Optional[str] = None) -> pd.Series:
+    """Column order and dtypes of the concatenation of all files (as ``pd.concat``)."""
+    proxies = [schema.proxy(source_column) for schema in schemas]
+    return pd.concat(proxies, ignore_index=True).dtypes
+
+
+class SchemaCache:
+    """Scans of CSV files keyed by path, size, modification time and read options."""
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+
+    @classmethod
+    def from_settings(cls) -> "SchemaCache":
+        return cls(DiskCache.from_settings("csv_schema", max_entries=4096))
+
+    def _key(self, path: Union[str, Path], read_kwargs: Dict[str, Any]) -> str:
+        stat = os.stat(path)
+        resolved = str(Path(path).resolve())
+        return make_key(resolved, stat.st_size, stat.st_mtime_ns, read_kwargs, self.FORMAT_VERSION)
+
+    def get(self, path: Union[str, Path], read_kwargs: Dict[str, Any]) -> Optional[FileSchema]:
+        data = self.cache.get(self._key(path, read_kwargs))
+        return FileSchema.from_dict(path, data) if data is not None else None
+
+    def set(self, schema: FileSchema, read_kwargs: Dict[str, Any]) -> None:
+        self.cache.set(self._key(schema.path, read_kwargs), schema.to_dict())
+
+
+def _smallest_int(low: float, high: float) -> np.dtype:
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return INT_DTYPES[-1]
+
+
+@dataclass
+class SchemaPlan:
+    """Scanned files and the schema used to read and combine them."""
+    files: List[FileSchema]
+    union: pd.Series  # dtypes of ``pd.concat`` of the files
+    source_column: Optional[str] = None
+    failed: Dict[str, str] = field(default_factory=dict)
+    compact: bool = False
+    numeric: Dict[str, np.dtype] = field(default_factory=dict)
+    categories: Dict[str, pd.CategoricalDtype] = field(default_factory=dict)
+    date_formats: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if self.compact:
+            self._compact()
+
+    def _stats(self, name: str) -> List[ColumnStats]:
+        """Statistics of the files with at least one value in column ``name``."""
+        return [schema.stats[name] for schema in self.files if name in schema.stats and schema.stats[name].count]
+
+    def _compact(self) -> None:
+        for name, dtype in self.union.items():
+            if name == self.source_column:
+                paths = list(dict.fromkeys(str(schema.path) for schema in self.files))
+                self.categories[name] = pd.CategoricalDtype(paths)
+                continue
+            stats = self._stats(name)
+            if not stats:
+                continue
+            if dtype.kind in "iu" and all(s.minimum is not None for s in stats):
+                self.numeric[name] = _smallest_int(min(s.minimum for s in stats), max(s.maximum for s in stats))
+            elif dtype.kind == "f" and all(s.float32 for s in stats):
+                self.numeric[name] = np.dtype(np.float32)
+            elif dtype == object and all(s.text for s in stats):
+                count = sum(s.count for s in stats)
+                formats = [fmt for fmt in DATE_FORMATS if all(fmt in s.date_formats for s in stats)]
+                if formats:
+                    self.date_formats[name] = formats[0]
+                if all(s.values is not None for s in stats):
+                    values = sorted(set().union(*(s.values for s in stats)))
+                    if len(values) <= CATEGORY_LIMIT and len(values) <= CATEGORY_RATIO * count:
+                        self.categories[name] = pd.CategoricalDtype(values)
+
+    def _target(self, name: str, parse_dates: bool) -> Any:
+        if parse_dates and name in self.date_formats:
+            return np.dtype("datetime64[ns]")
+        if name in self.categories:
+            return self.categories[name]
+        return self.numeric.get(name, self.union[name])
+
+    def dtypes(self, parse_dates: bool = False) -> pd.Series:
+        """Dtypes of the combined table; dates are parsed only if ``parse_dates``."""
+        return pd.Series({name: self._target(name, parse_dates) for name in self.union.index}, dtype=object)
+
+    def read_dtypes(self, schema: FileSchema) -> Dict[str, Any]:
+        """Explicit ``dtype=`` for reading ``schema.path``; dates are parsed after reading."""
+        read: Dict[str, Any] = dict.fromkeys(schema.object_columns, object)
+        for name in schema.columns:
+            if name in self.categories:
+                read[name] = self.categories[name]
+            elif name in self.numeric:
+                read[name] = self.numeric[name]
+        return read
+
+
+def infer_schema(
+    file_paths: Sequence[Union[str, Path]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    source_column: Optional[str] = None,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    compact: bool = False,
+    cache: Optional[SchemaCache] = None,
+    executor: Optional[Executor] = None,
+) -> SchemaPlan:
+    """Scan ``file_paths`` (in parallel with an ``executor``) and plan the combined schema.
+
+    Files that cannot be read are skipped and reported in ``failed``.
+
+    Raises:
+        ValueError: If none of the files could be read.
+    """
+    read_kwargs = dict(read_kwargs or {})
+    schemas: List[FileSchema] = []
+    failed: Dict[str, str] = {}
+    pending = []
+    for path in file_paths:
+        try:
+            cached = cache.get(path, read_kwargs) if cache is not None else None
+        except OSError:
+            cached = None  # reported by the scan below
+        if cached is not None:
+            pending.append((path, cached, None))
+        elif executor is not None:
+            pending.append((path, None, executor.submit(scan_file, path, chunk_size, **read_kwargs)))
+        else:
+            pending.append((path, None, None))
+
+    for path, schema, future in pending:
+        if schema is None:
+            try:
+                schema = future.result() if future is not None else scan_file(path, chunk_size, **read_kwargs)
+            except Exception as e:
+                logger.error(f"Error processing {path}: {e}")
+                failed[str(path)] = str(e)
+                continue
+            if cache is not None:
+                cache.set(schema, read_kwargs)
+        schemas.append(schema)
+    if not schemas:
+        raise ValueError("No valid CSV data to combine")
+
+    union = resolve_schema(schemas, source_column)
+    return SchemaPlan(schemas, union, source_column, failed, compact)
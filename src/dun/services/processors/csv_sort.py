@@ -0,0 +1,405 @@
+"""Out-of-core sort of combined CSV files: sorted runs and a k-way heap merge.
+
+The output matches ``pd.concat(frames).sort_values(sort_by, kind="stable",
+na_position="last")`` of the fully loaded inputs, with memory bounded by
+the chunk size:
+
+1. each input is checked for being sorted already by reading only its key
+   columns; a sorted file is used as a run as it is;
+2. every other file is read in chunks, each chunk is sorted in memory and
+   spilled to a run file of pickled blocks in a temporary directory;
+3. the runs are merged. A heap holds the last key of the current block of
+   every run; everything up to the smallest of them can be emitted, so
+   each step sorts one small batch instead of comparing single rows.
+   More than ``fan_in`` runs are first merged in groups into longer runs.
+
+Ties keep the order of the input files and of the rows within them.
+"""
+import heapq
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from dun.services.processors.csv_dedup import RowDeduplicator
+from dun.services.processors.csv_schema import DEFAULT_CHUNK_SIZE, FileSchema, SchemaCache, SchemaPlan, infer_schema
+from dun.services.processors.csv_stream import SOURCE_COLUMN, CombineResult, _extend_sample, iter_aligned, iter_chunks
+from dun.services.processors.table_writer import open_writer
+
+logger = logging.getLogger(__name__)
+
+# Runs merged at once; more are merged in several passes
+DEFAULT_FAN_IN = 64
+# Smallest block read from a run during the merge; tiny blocks make every step a pandas call per row
+MIN_BLOCK_SIZE = 1024
+
+
+class _Descending:
+    """Reverses the order of a key value for descending sorts."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.value < self.value
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.value == other.value
+
+
+class SortKey:
+    """Row order of ``sort_values(columns, ascending, na_position="last")``."""
+
+    def __init__(self, columns: Sequence[str], ascending: bool = True):
+        self.columns = list(columns)
+        self.ascending = ascending
+
+    def row(self, frame: pd.DataFrame, index: int) -> Tuple[Any, ...]:
+        """Comparable key of row ``index``; missing values sort last."""
+        key = []
+        for name in self.columns:
+            value = frame[name].iloc[index]
+            if pd.isna(value):
+                key.append((True, None if self.ascending else _Descending(None)))
+            else:
+                key.append((False, value if self.ascending else _Descending(value)))
+        return tuple(key)
+
+    def compare(self, frame: pd.DataFrame, bound: Tuple[Any, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """Masks of the rows that sort before and equal to the key ``bound``."""
+        less = np.zeros(len(frame), dtype=bool)
+        equal = np.ones(len(frame), dtype=bool)
+        for name, (bound_na, bound_value) in zip(self.columns, bound):
+            values = frame[name].to_numpy()
+            na = pd.isna(values)
+            if bound_na:
+                column_less, column_equal = ~na, na
+            else:
+                if not self.ascending:
+                    bound_value = bound_value.value
+                column_less = np.zeros(len(frame), dtype=bool)
+                column_equal = np.zeros(len(frame), dtype=bool)
+                present = values[~na]
+                column_less[~na] = present < bound_value if self.ascending else present > bound_value
+                column_equal[~na] = present == bound_value
+            less |= equal & column_less
+            equal &= column_equal
+        return less, equal
+
+    def is_sorted(self, frame: pd.DataFrame) -> bool:
+        """Whether the rows of ``frame`` are already in order."""
+        if len(frame) < 2:
+            return True
+        head, tail = frame.iloc[1:], frame.iloc[:-1]
+        # Compare every row with its predecessor, column by column
+        less = np.zeros(len(head), dtype=bool)
+        equal = np.ones(len(head), dtype=bool)
+        for name in self.columns:
+            current, previous = head[name].to_numpy(), tail[name].to_numpy()
+            current_na, previous_na = pd.isna(current), pd.isna(previous)
+            both = ~current_na & ~previous_na
+            column_less = previous_na & ~current_na
+            column_equal = current_na & previous_na
+            if both.any():
+                a, b = current[both], previous[both]
+                column_less[both] = a < b if self.ascending else a > b
+                column_equal[both] = a == b
+            less |= equal & column_less
+            equal &= column_equal
+        return not less.any()
+
+    def sort(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return frame.sort_values(self.columns, ascending=self.ascending, kind="stable", na_position="last")
+
+
+def _key_columns(schema: FileSchema, key: SortKey) -> List[str]:
+    return [name for name in key.columns if name in schema.columns]
+
+
+def is_file_sorted(
+    schema: FileSchema,
+    key: SortKey,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    read_dtypes: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """Check the order of a file by reading only its key columns.
+
+    Key columns missing from the file (or the source column) are constant
+    within it and do not affect its order.
+    """
+    columns = _key_columns(schema, key)
+    if not columns:
+        return True
+    file_key = SortKey(columns, key.ascending)
+    dtype = {name: dtype for name, dtype in (read_dtypes or {}).items() if name in columns}
+    previous: Optional[pd.DataFrame] = None
+    for chunk in iter_chunks(schema.path, chunk_size, usecols=columns, dtype=dtype, **(read_kwargs or {})):
+        if chunk.empty:
+            continue
+        chunk = chunk[columns]
+        if previous is not None:
+            chunk = pd.concat([previous, chunk], ignore_index=True)
+        if not file_key.is_sorted(chunk):
+            return False
+        previous = chunk.iloc[-1:]
+    return True
+
+
+class Run:
+    """A sorted sequence of aligned rows, read block by block."""
+
+    def blocks(self) -> Iterator[pd.DataFrame]:
+        raise NotImplementedError
+
+
+class FileRun(Run):
+    """An input file that is sorted already."""
+
+    def __init__(self, schema: FileSchema, dtypes: pd.Series, block_size: int, **options: Any):
+        self.schema = schema
+        self.dtypes = dtypes
+        self.block_size = block_size
+        self.options = options
+
+    def blocks(self) -> Iterator[pd.DataFrame]:
+        for block in iter_aligned(self.schema, self.dtypes, self.block_size, **self.options):
+            yield block.reset_index(drop=True)
+
+
+class SpillRun(Run):
+    """Sorted rows pickled block by block into a file in the temporary directory."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+
+    @classmethod
+    def write(cls, blocks: Iterator[pd.DataFrame], directory: Path) -> "SpillRun":
+        fd, name = tempfile.mkstemp(dir=directory, suffix=".run")
+        with open(fd, "wb") as f:
+            for block in blocks:
+                pickle.dump(block.reset_index(drop=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return cls(name)
+
+    def blocks(self) -> Iterator[pd.DataFrame]:
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+
+def _split(frame: pd.DataFrame, block_size: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(frame), block_size):
+        yield frame.iloc[start:start + block_size]
+
+
+def spill_file(
+    schema: FileSchema,
+    dtypes: pd.Series,
+    key: SortKey,
+    directory: Path,
+    chunk_size: int,
+    block_size: int,
+    **options: Any,
+) -> List[SpillRun]:
+    """Sort a file chunk by chunk into runs; a chunk continuing the previous one in order extends its run."""
+    runs: List[SpillRun] = []
+    out = None
+    last: Optional[pd.DataFrame] = None
+    try:
+        for chunk in iter_aligned(schema, dtypes, chunk_size, **options):
+            chunk = key.sort(chunk)
+            if out is None or not key.is_sorted(pd.concat([last, chunk.iloc[:1]], ignore_index=True)):
+                if out is not None:
+                    out.close()
+                fd, name = tempfile.mkstemp(dir=directory, suffix=".run")
+                out = open(fd, "wb")
+                runs.append(SpillRun(name))
+            for block in _split(chunk, block_size):
+                pickle.dump(block.reset_index(drop=True), out, protocol=pickle.HIGHEST_PROTOCOL)
+            last = chunk.iloc[-1:]
+    finally:
+        if out is not None:
+            out.close()
+    return runs
+
+
+def merge_runs(runs: Sequence[Run], key: SortKey) -> Iterator[pd.DataFrame]:
+    """K-way merge of sorted runs; ties keep the order of ``runs``."""
+    readers = [run.blocks() for run in runs]
+    current: List[Optional[pd.DataFrame]] = [None] * len(runs)
+    heap: List[Tuple[Tuple[Any, ...], int]] = []
+
+    def advance(index: int) -> None:
+        for block in readers[index]:
+            if len(block):
+                current[index] = block
+                heapq.heappush(heap, (key.row(block, len(block) - 1), index))
+                return
+        current[index] = None
+
+    for index in range(len(runs)):
+        advance(index)
+    while heap:
+        bound, bound_run = heap[0]
+        parts = []
+        for index, block in enumerate(current):
+            if block is None:
+                continue
+            less, equal = key.compare(block, bound)
+            # Rows are sorted, so the emitted rows are a prefix of the block
+            count = int(np.count_nonzero(less | equal if index <= bound_run else less))
+            if count:
+                parts.append(block.iloc[:count])
+                current[index] = block.iloc[count:]
+        yield key.sort(pd.concat(parts, ignore_index=True)) if len(parts) > 1 else parts[0]
+        while heap and not len(current[heap[0][1]]):
+            _, index = heapq.heappop(heap)
+            advance(index)
+
+
+def sort_csv_stream(
+    file_paths: Sequence[Union[str, Path]],
+    output_file: Union[str, Path],
+    sort_by: Sequence[str],
+    ascending: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    source_column: Optional[str] = SOURCE_COLUMN,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    write_kwargs: Optional[Dict[str, Any]] = None,
+    encoding: str = "utf-8",
+    sample_rows: int = 2,
+    executor: Optional[Executor] = None,
+    output_format: str = "csv",
+    compression: Optional[str] = None,
+    compact: bool = False,
+    schema_cache: Optional[SchemaCache] = None,
+    temp_dir: Optional[Union[str, Path]] = None,
+    fan_in: int = DEFAULT_FAN_IN,
+    block_size: Optional[int] = None,
+    dedup: Optional[RowDeduplicator] = None,
+) -> CombineResult:
+    """Combine CSV files into ``output_file`` sorted by ``sort_by``, out of core.
+
+    Takes the same options as ``combine_csv_stream``. Runs are spilled to a
+    fresh directory inside ``temp_dir`` (the system default if omitted)
+    that is removed afterwards. With an ``executor`` files are checked and
+    sorted into runs in parallel. The merge holds one block of
+    ``block_size`` rows (by default ``chunk_size / fan_in``, at least
+    ``MIN_BLOCK_SIZE``) per run in memory. A ``dedup`` filters the merged
+    rows, so the first of equal rows in sorted order is kept.
+
+    Raises:
+        ValueError: If none of the files could be read or a sort column is unknown.
+    """
+    read_kwargs = dict(read_kwargs or {})
+    read_kwargs.setdefault("encoding", encoding)
+    output_file = Path(output_file)
+    key = SortKey(sort_by, ascending)
+
+    plan = infer_schema(
+        file_paths, chunk_size, source_column, read_kwargs,
+        compact=compact, cache=schema_cache, executor=executor,
+    )
+    unknown = [name for name in key.columns if name not in plan.union.index]
+    if unknown:
+        raise ValueError(f"Unknown sort columns: {', '.join(unknown)}")
+    dtypes = plan.dtypes(parse_dates=output_format != "csv")
+    block_size = block_size or max(MIN_BLOCK_SIZE, chunk_size // fan_in)
+    options = dict(source_column=source_column, read_kwargs=read_kwargs)
+
+    directory = Path(tempfile.mkdtemp(prefix="sort_", dir=temp_dir))
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        runs = _make_runs(plan, dtypes, key, directory, chunk_size, block_size, executor, options)
+        while len(runs) > fan_in:
+            logger.debug(f"Merging {len(runs)} runs in groups of {fan_in}")
+            merged: List[Run] = []
+            for start in range(0, len(runs), fan_in):
+                group = runs[start:start + fan_in]
+                blocks = (block for batch in merge_runs(group, key) for block in _split(batch, block_size))
+                merged.append(SpillRun.write(blocks, directory))
+                for run in group:
+                    if isinstance(run, SpillRun):
+                        run.path.unlink(missing_ok=True)
+            runs = merged
+        sample: List[Dict[str, Any]] = []
+        with open_writer(output_format, tmp_name, dtypes, compression, encoding, write_kwargs) as writer:
+            for batch in merge_runs(runs, key):
+                if dedup is not None:
+                    batch = batch[dedup.keep(batch)]
+                writer.write(batch)
+                _extend_sample(sample, batch, sample_rows)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return CombineResult(
+        output_file=output_file,
+        rows=writer.rows,
+        columns=list(dtypes.index),
+        files=[schema.path for schema in plan.files],
+        failed=plan.failed,
+        sample=sample,
+    )
+
+
+def _make_runs(
+    plan: SchemaPlan,
+    dtypes: pd.Series,
+    key: SortKey,
+    directory: Path,
+    chunk_size: int,
+    block_size: int,
+    executor: Optional[Executor],
+    options: Dict[str, Any],
+) -> List[Run]:
+    """Use sorted files as runs and spill the others as sorted chunks, in file order."""
+    submit = executor.submit if executor is not None else _call
+    checks = [
+        submit(is_file_sorted, schema, key, chunk_size, options["read_kwargs"], plan.read_dtypes(schema))
+        for schema in plan.files
+    ]
+    spills = {}
+    for schema, check in zip(plan.files, checks):
+        if not check.result():
+            spills[schema.path] = submit(
+                spill_file, schema, dtypes, key, directory, chunk_size, block_size,
+                read_dtypes=plan.read_dtypes(schema), **options,
+            )
+    runs: List[Run] = []
+    for schema in plan.files:
+        if schema.path in spills:
+            runs.extend(spills[schema.path].result())
+        else:
+            runs.append(FileRun(schema, dtypes, block_size, read_dtypes=plan.read_dtypes(schema), **options))
+    logger.info(f"{len(plan.files) - len(spills)} of {len(plan.files)} files already sorted, {len(runs)} runs to merge")
+    return runs
+
+
+class _Done:
+    """Result of a call made without an executor."""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def result(self) -> Any:
+        return self.value
+
+
+def _call(function: Any, *args: Any, **kwargs: Any) -> _Done:
+    return _Done(function(*args, **kwargs))
@@ -0,0 +1,314 @@
+"""Streaming (out-of-core) combination of CSV files.
+
+The combined output matches ``pd.concat(frames).to_csv(...)`` of the fully
+loaded inputs, but only one chunk of rows is held in memory at a time:
+
+1. every input is scanned chunk by chunk (see ``csv_schema``) to learn its
+   columns and the dtypes ``pd.read_csv`` would infer for the whole file;
+2. the union schema (column order and dtypes) is resolved by letting
+   pandas concatenate tiny one-row proxies of every file, so the result
+   follows exactly the same upcasting rules as ``pd.concat``;
+3. the inputs are read again in chunks, aligned to that schema and
+   appended to the output.
+
+When every input starts with the same header line and no source column is
+requested, ``concat_csv_bytes`` skips parsing altogether and copies the
+file bodies byte for byte.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import Executor, Future, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from dun.services.processors.csv_dedup import RowDeduplicator
+from dun.services.processors.csv_schema import (  # noqa: F401  re-exported
+    DEFAULT_CHUNK_SIZE,
+    FileSchema,
+    SchemaCache,
+    infer_schema,
+    iter_chunks,
+    resolve_schema,
+    scan_file,
+)
+from dun.services.processors.table_writer import open_writer
+
+logger = logging.getLogger(__name__)
+
+SOURCE_COLUMN = "_source_file"
+# Longest header line the byte-level fast path looks for
+MAX_HEADER_BYTES = 1 << 20
+COPY_BLOCK_SIZE = 1 << 24
+
+
+@dataclass
+class CombineResult:
+    """Summary of a combine run."""
+    output_file: Path
+    rows: int
+    columns: List[str]
+    files: List[Path]
+    failed: Dict[str, str] = field(default_factory=dict)
+    sample: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def align_chunk(chunk: pd.DataFrame, dtypes: pd.Series) -> pd.DataFrame:
+    """Reorder ``chunk`` to the union schema, adding missing columns and casting dtypes."""
+    chunk = chunk.reindex(columns=dtypes.index)
+    for name, dtype in dtypes.items():
+        if chunk[name].dtype != dtype:
+            chunk[name] = chunk[name].astype(dtype)
+    return chunk
+
+
+def iter_aligned(
+    schema: FileSchema,
+    dtypes: pd.Series,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    source_column: Optional[str] = SOURCE_COLUMN,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    read_dtypes: Optional[Dict[str, Any]] = None,
+) -> Iterator[pd.DataFrame]:
+    """Yield the rows of one file in chunks aligned to the union schema.
+
+    ``read_dtypes`` defaults to reading the file's text columns as text.
+    """
+    if read_dtypes is None:
+        read_dtypes = dict.fromkeys(schema.object_columns, object)
+    for chunk in iter_chunks(schema.path, chunk_size, dtype=read_dtypes, **(read_kwargs or {})):
+        if chunk.empty:
+            continue
+        if source_column is not None:
+            chunk[source_column] = str(schema.path)
+        yield align_chunk(chunk, dtypes)
+
+
+def write_aligned(
+    schema: FileSchema,
+    out: IO[str],
+    dtypes: pd.Series,
+    write_kwargs: Optional[Dict[str, Any]] = None,
+    sample_rows: int = 2,
+    **options: Any,
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Append the rows of one file, aligned to the union schema, to ``out`` as CSV (no header).
+
+    Returns the number of rows written and up to ``sample_rows`` of them.
+    """
+    rows = 0
+    sample: List[Dict[str, Any]] = []
+    for chunk in iter_aligned(schema, dtypes, **options):
+        chunk.to_csv(out, header=False, index=False, **(write_kwargs or {}))
+        rows += len(chunk)
+        _extend_sample(sample, chunk, sample_rows)
+    return rows, sample
+
+
+def _extend_sample(sample: List[Dict[str, Any]], chunk: pd.DataFrame, sample_rows: int) -> None:
+    if len(sample) < sample_rows:
+        sample.extend(chunk.head(sample_rows - len(sample)).to_dict(orient="records"))
+
+
+def _write_part(part: str, encoding: str, *args: Any, **kwargs: Any) -> Tuple[int, List[Dict[str, Any]]]:
+    """``write_aligned`` into its own file; runs in an executor worker."""
+    with open(part, "w", encoding=encoding, newline="") as out:
+        return write_aligned(*args, out=out, **kwargs)
+
+
+def combine_csv_stream(
+    file_paths: Sequence[Union[str, Path]],
+    output_file: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    source_column: Optional[str] = SOURCE_COLUMN,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    write_kwargs: Optional[Dict[str, Any]] = None,
+    encoding: str = "utf-8",
+    sample_rows: int = 2,
+    executor: Optional[Executor] = None,
+    output_format: str = "csv",
+    compression: Optional[str] = None,
+    compact: bool = False,
+    schema_cache: Optional[SchemaCache] = None,
+    dedup: Optional[RowDeduplicator] = None,
+) -> CombineResult:
+    """Combine CSV files into ``output_file`` with memory bounded by ``chunk_size``.
+
+    Files that cannot be read are skipped and reported in ``failed``. The
+    output is written to a temporary file and renamed into place, so a
+    failed run never leaves a truncated result behind. ``output_format``
+    selects the writer from ``table_writer`` (``write_kwargs`` apply to
+    CSV only, ``compression`` to the other formats).
+
+    With an ``executor`` (threads or processes) the files are scanned in
+    parallel. For CSV output each file is also converted into its own part
+    file in parallel and the parts are then concatenated in the order of
+    ``file_paths``. Memory is bounded by ``chunk_size`` per worker.
+
+    ``compact`` reads and writes the compact dtypes of ``csv_schema`` (dates
+    are parsed only for non-CSV output); ``schema_cache`` reuses the scans
+    of unchanged files.
+
+    With a ``dedup`` (see ``csv_dedup``) rows seen before are dropped, the
+    first occurrence is kept; the files are then written one after another.
+
+    Raises:
+        ValueError: If none of the files could be read.
+    """
+    read_kwargs = dict(read_kwargs or {})
+    read_kwargs.setdefault("encoding", encoding)
+    write_kwargs = dict(write_kwargs or {})
+    output_file = Path(output_file)
+
+    plan = infer_schema(
+        file_paths, chunk_size, source_column, read_kwargs,
+        compact=compact, cache=schema_cache, executor=executor,
+    )
+    schemas = plan.files
+    dtypes = plan.dtypes(parse_dates=output_format != "csv")
+    options = dict(chunk_size=chunk_size, source_column=source_column, read_kwargs=read_kwargs)
+    rows = 0
+    sample: List[Dict[str, Any]] = []
+    parts: List[str] = []
+    futures: List[Future] = []
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        with open_writer(output_format, tmp_name, dtypes, compression, encoding, write_kwargs) as writer:
+            if executor is None or output_format != "csv" or dedup is not None:
+                for schema in schemas:
+                    for chunk in iter_aligned(schema, dtypes, read_dtypes=plan.read_dtypes(schema), **options):
+                        if dedup is not None:
+                            chunk = chunk[dedup.keep(chunk)]
+                        writer.write(chunk)
+                        _extend_sample(sample, chunk, sample_rows)
+                rows = writer.rows
+            else:
+                writer.file.flush()
+                for _ in schemas:
+                    part_fd, part = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".part")
+                    os.close(part_fd)
+                    parts.append(part)
+                futures = [
+                    executor.submit(
+                        _write_part, part, encoding, schema, dtypes=dtypes, read_dtypes=plan.read_dtypes(schema),
+                        write_kwargs=write_kwargs, sample_rows=sample_rows, **options,
+                    )
+                    for schema, part in zip(schemas, parts)
+                ]
+                for part, future in zip(parts, futures):
+                    file_rows, file_sample = future.result()
+                    rows += file_rows
+                    sample.extend(file_sample[:sample_rows - len(sample)])
+                    with open(part, "rb") as part_file:
+                        _copy_range(part_file.fileno(), writer.file.fileno(), 0, os.fstat(part_file.fileno()).st_size)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        raise
+    finally:
+        for part in parts:
+            Path(part).unlink(missing_ok=True)
+
+    return CombineResult(
+        output_file=output_file,
+        rows=rows,
+        columns=list(dtypes.index),
+        files=[schema.path for schema in schemas],
+        failed=plan.failed,
+        sample=sample,
+    )
+
+
+def read_header_line(path: Union[str, Path], limit: int = MAX_HEADER_BYTES) -> Optional[bytes]:
+    """Return the first line of ``path`` including its line terminator.
+
+    Returns ``None`` when the file has no complete first line within
+    ``limit`` bytes or the line ends inside a quoted field.
+    """
+    with open(path, "rb") as f:
+        head = f.readline(limit)
+    if not head.endswith(b"\n") or head.count(b'"') % 2:
+        return None
+    return head
+
+
+def _copy_range(src: int, dst: int, offset: int, count: int) -> None:
+    """Append ``count`` bytes of ``src`` starting at ``offset`` to ``dst`` in the kernel if possible."""
+    end = offset + count
+    for copy in ("copy_file_range", "sendfile"):
+        if not hasattr(os, copy):
+            continue
+        try:
+            while offset < end:
+                if copy == "copy_file_range":
+                    copied = os.copy_file_range(src, dst, min(end - offset, COPY_BLOCK_SIZE), offset)
+                else:
+                    copied = os.sendfile(dst, src, offset, min(end - offset, COPY_BLOCK_SIZE))
+                if not copied:
+                    break
+                offset += copied
+        except OSError:
+            # Not supported for this pair of files (e.g. across file systems)
+            continue
+        if offset >= end:
+            return
+    while offset < end:
+        block = os.pread(src, min(end - offset, COPY_BLOCK_SIZE), offset)
+        if not block:
+            raise OSError(f"Unexpected end of file after {offset} bytes")
+        os.write(dst, block)
+        offset += len(block)
+
+
+def concat_csv_bytes(
+    file_paths: Sequence[Union[str, Path]],
+    output_file: Union[str, Path],
+    encoding: str = "utf-8",
+) -> Optional[int]:
+    """Concatenate CSV files that share a byte-identical header line without parsing them.
+
+    The header is written once and the bodies are appended with kernel-side
+    copies (``copy_file_range``/``sendfile``) where available. Identical
+    header lines also mean the same delimiter, quoting and line terminator.
+
+    Returns:
+        The number of bytes written, or ``None`` (and nothing is written)
+        when the headers differ or ``encoding`` is not ASCII-compatible;
+        the caller should then parse the files instead.
+    """
+    if "\n,".encode(encoding) != b"\n,":
+        return None
+    headers = [read_header_line(path) for path in file_paths]
+    if not headers or headers[0] is None or any(header != headers[0] for header in headers):
+        return None
+    header = headers[0]
+    terminator = b"\r\n" if header.endswith(b"\r\n") else b"\n"
+
+    output_file = Path(output_file)
+    fd, tmp_name = tempfile.mkstemp(dir=output_file.parent, prefix=f".{output_file.name}.", suffix=".tmp")
+    written = 0
+    try:
+        with open(fd, "wb", buffering=0) as out:
+            written += out.write(header)
+            for path in file_paths:
+                with open(path, "rb", buffering=0) as src:
+                    size = os.fstat(src.fileno()).st_size
+                    body = size - len(header)
+                    if body <= 0:
+                        continue
+                    _copy_range(src.fileno(), out.fileno(), len(header), body)
+                    written += body
+                    if os.pread(src.fileno(), 1, size - 1) != b"\n":
+                        written += out.write(terminator)
+        os.replace(tmp_name, output_file)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return written
@@ -0,0 +1,330 @@
+"""Single-pass summary statistics of CSV files with constant memory per column.
+
+Every input is read once in chunks; each chunk updates, per column,
+
+* the count of values and missing values and the minimum/maximum,
+* the mean and variance of numbers (Welford's algorithm, merged per chunk
+  with the parallel formula of Chan et al.),
+* the approximate number of distinct values (HyperLogLog) and
+* approximate quantiles of numbers (a KLL compactor sketch).
+
+All updates are vectorized over the chunk and all states can be merged, so
+files are summarized independently (in parallel with an executor) and then
+combined. Nothing is written to disk. Columns missing from a file count
+as missing values for all of its rows, as in ``pd.concat`` of the files.
+"""
+import logging
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from dun.services.processors.csv_schema import DEFAULT_CHUNK_SIZE, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+KLL_K = 200  # capacity of the top compactor, ~1% rank error
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized ``int.bit_length`` of unsigned 64-bit integers."""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = (values >> np.uint64(shift)) > 0
+        length[high] += shift
+        values[high] >>= np.uint64(shift)
+    length += (values > 0).astype(np.uint8)
+    return length
+
+
+class HyperLogLog:
+    """Approximate distinct count in ``2 ** precision`` bytes."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        """Add values given as 64-bit hashes."""
+        if not len(hashes):
+            return
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # Position of the first set bit of the remaining bits, counted from the top
+        rank = (width + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * np.log(m / zeros)
+        return float(estimate)
+
+
+class QuantileSketch:
+    """KLL sketch: a hierarchy of compactors, items on level ``h`` weigh ``2 ** h``.
+
+    A full level is sorted and every other item (starting at a random
+    offset) is promoted to the next level. Lower levels get geometrically
+    smaller capacities, so memory is ``O(k)`` for any number of items.
+    """
+
+    def __init__(self, k: int = KLL_K, seed: int = 0):
+        self.k = k
+        self.count = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: np.ndarray) -> None:
+        if not len(values):
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.count += other.count
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+
+    def _compress(self) -> None:
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # An odd item out stays on this level
+            kept, items = items[len(items) - len(items) % 2:], items[:len(items) - len(items) % 2]
+            promoted = items[self._rng.integers(2)::2]
+            self.levels[level] = kept
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # A new level shrinks the capacities below it
+            level = 0
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Approximate quantiles (inverted CDF, i.e. always one of the values seen)."""
+        if not self.count:
+            return [None] * len(qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h, dtype=np.float64) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+        return [float(items[i]) for i in np.clip(index, 0, len(items) - 1)]
+
+
+@dataclass
+class ColumnSummary:
+    """Mergeable statistics of one column."""
+    count: int = 0
+    nulls: int = 0
+    numbers: int = 0
+    texts: int = 0
+    integer: bool = True
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    text_minimum: Optional[str] = None
+    text_maximum: Optional[str] = None
+    mean: float = 0.0
+    m2: float = 0.0
+    distinct: HyperLogLog = field(default_factory=HyperLogLog)
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def update(self, column: pd.Series) -> None:
+        values = column.dropna()
+        self.nulls += len(column) - len(values)
+        self.count += len(values)
+        if values.empty:
+            return
+        if pd.api.types.is_bool_dtype(values.dtype) or pd.api.types.is_numeric_dtype(values.dtype):
+            self._update_numbers(values)
+        else:
+            self._update_texts(values.astype(str).to_numpy(dtype=object))
+
+    def _update_numbers(self, values: pd.Series) -> None:
+        self.integer = self.integer and not pd.api.types.is_float_dtype(values.dtype)
+        array = values.to_numpy(dtype=np.float64)
+        self.distinct.update_hashes(pd.util.hash_array(array))
+        self.sketch.update(array)
+        self._merge_moments(len(array), float(array.mean()), float(np.square(array - array.mean()).sum()))
+        low, high = float(array.min()), float(array.max())
+        self.minimum = low if self.minimum is None else min(self.minimum, low)
+        self.maximum = high if self.maximum is None else max(self.maximum, high)
+
+    def _update_texts(self, array: np.ndarray) -> None:
+        self.texts += len(array)
+        self.distinct.update_hashes(pd.util.hash_array(array))
+        low, high = array.min(), array.max()
+        self.text_minimum = low if self.text_minimum is None else min(self.text_minimum, low)
+        self.text_maximum = high if self.text_maximum is None else max(self.text_maximum, high)
+
+    def _merge_moments(self, count: int, mean: float, m2: float) -> None:
+        total = self.numbers + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.numbers * count / total
+        self.numbers = total
+
+    def merge(self, other: "ColumnSummary") -> None:
+        self.count += other.count
+        self.nulls += other.nulls
+        if other.numbers:
+            self.integer = self.integer and other.integer
+            self._merge_moments(other.numbers, other.mean, other.m2)
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        if other.texts:
+            self.texts += other.texts
+            self.text_minimum = other.text_minimum if self.text_minimum is None else min(self.text_minimum, other.text_minimum)
+            self.text_maximum = other.text_maximum if self.text_maximum is None else max(self.text_maximum, other.text_maximum)
+        self.distinct.merge(other.distinct)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def kind(self) -> str:
+        if self.numbers and self.texts:
+            return "mixed"
+        return "number" if self.numbers else "text" if self.texts else "empty"
+
+    def _number(self, value: Optional[float]) -> Any:
+        return int(value) if value is not None and self.integer else value
+
+    def to_dict(self, quantiles: Sequence[float] = QUANTILES) -> Dict[str, Any]:
+        """JSON-serializable summary; number statistics cover the numeric values only."""
+        summary: Dict[str, Any] = {
+            "type": self.kind,
+            "count": self.count,
+            "nulls": self.nulls,
+            "distinct": int(round(self.distinct.estimate())) if self.count else 0,
+        }
+        if self.kind == "text":
+            summary.update(min=self.text_minimum, max=self.text_maximum)
+        elif self.numbers:
+            summary.update(
+                min=self._number(self.minimum),
+                max=self._number(self.maximum),
+                mean=self.mean,
+                variance=self.m2 / (self.numbers - 1) if self.numbers > 1 else None,
+                quantiles={
+                    str(q): self._number(value) for q, value in zip(quantiles, self.sketch.quantiles(quantiles))
+                },
+            )
+        return summary
+
+
+@dataclass
+class TableSummary:
+    """Statistics of all columns of one or more CSV files."""
+    rows: int = 0
+    files: List[Path] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    columns: Dict[str, ColumnSummary] = field(default_factory=dict)
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        for name in chunk.columns:
+            if name not in self.columns:
+                self._add_column(str(name))
+        for name, column in self.columns.items():
+            if name in chunk.columns:
+                column.update(chunk[name])
+            else:
+                column.nulls += len(chunk)
+        self.rows += len(chunk)
+
+    def _add_column(self, name: str) -> None:
+        column = ColumnSummary()
+        # Rows read before the column first appeared have no value in it
+        column.nulls = self.rows
+        self.columns[name] = column
+
+    def merge(self, other: "TableSummary") -> None:
+        for name in other.columns:
+            if name not in self.columns:
+                self._add_column(name)
+        for name, column in self.columns.items():
+            if name in other.columns:
+                column.merge(other.columns[name])
+            else:
+                column.nulls += other.rows
+        self.rows += other.rows
+        self.files.extend(other.files)
+        self.failed.update(other.failed)
+
+    def to_dict(self, quantiles: Sequence[float] = QUANTILES) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "files": [str(path) for path in self.files],
+            "failed": self.failed,
+            "columns": {name: column.to_dict(quantiles) for name, column in self.columns.items()},
+        }
+
+
+def summarize_file(
+    path: Union[str, Path],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **read_kwargs: Any,
+) -> TableSummary:
+    """Summarize one CSV file in a single streaming pass."""
+    summary = TableSummary(files=[Path(path)])
+    for chunk in iter_chunks(path, chunk_size, **read_kwargs):
+        summary.update(chunk)
+    return summary
+
+
+def summarize_csv(
+    file_paths: Sequence[Union[str, Path]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_kwargs: Optional[Dict[str, Any]] = None,
+    executor: Optional[Executor] = None,
+) -> TableSummary:
+    """Summarize ``file_paths`` as if they were concatenated, reading every file once.
+
+    With an ``executor`` the files are summarized in parallel and merged in
+    the order of ``file_paths``. Files that cannot be read are skipped and
+    reported in ``failed``.
+
+    Raises:
+        ValueError: If none of the files could be read.
+    """
+    read_kwargs = dict(read_kwargs or {})
+    pending: List[Tuple[Union[str, Path], Any]] = [
+        (path, executor.submit(summarize_file, path, chunk_size, **read_kwargs) if executor else None)
+        for path in file_paths
+    ]
+    summary = TableSummary()
+    for path, future in pending:
+        try:
+            file_summary = future.result() if future is not None else summarize_file(path, chunk_size, **read_kwargs)
+        except Exception as e:
+            logger.error(f"Error processing {path}: {e}")
+            summary.failed[str(path)] = str(e)
+            continue
+        summary.merge(file_summary)
+    if not summary.files:
+        raise ValueError("No valid CSV data to summarize")
+    return summary
@@ -0,0 +1,206 @@
+"""Chunked writers for combined tables: CSV, Parquet, Feather (Arrow IPC) and NumPy ``.npz``.
+
+Every writer receives the column dtypes up front and then any number of
+chunks with exactly those columns, so a table of any size can be written
+with memory bounded by the chunk size. Parquet and Feather need the
+optional ``pyarrow`` package; ``.npz`` only needs NumPy.
+"""
+import importlib.util
+import logging
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, IO, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ("csv", "parquet", "feather", "npz")
+ARROW_FORMATS = ("parquet", "feather")
+SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "npz": ".npz"}
+
+
+def has_pyarrow() -> bool:
+    """Check if pyarrow is installed without importing it."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def resolve_format(output_format: str) -> str:
+    """Return the format that can actually be written (``npz`` when pyarrow is missing)."""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+    if output_format in ARROW_FORMATS and not has_pyarrow():
+        logger.warning(f"pyarrow is not installed, writing .npz instead of {output_format}")
+        return "npz"
+    return output_format
+
+
+def is_text_dtype(dtype: Any) -> bool:
+    """Columns stored as strings by the columnar writers (everything but NumPy numbers, bools and dates)."""
+    return not isinstance(dtype, np.dtype) or dtype == object
+
+
+def as_text(column: pd.Series) -> pd.Series:
+    """Convert the values of a mixed-type or categorical column to strings, keeping missing values."""
+    column = column.astype(object)
+    return column.where(column.isna(), column.astype(str))
+
+
+class TableWriter:
+    """Base class for chunked table writers (usable as a context manager)."""
+
+    def __init__(self, path: Union[str, Path], dtypes: pd.Series):
+        self.path = Path(path)
+        self.dtypes = dtypes
+        self.rows = 0
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Append ``chunk``, whose columns and dtypes match ``dtypes``."""
+        self._write(chunk)
+        self.rows += len(chunk)
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Finish the file; nothing is readable before this is called."""
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class CsvTableWriter(TableWriter):
+    """Writes CSV text; the header is written immediately."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        dtypes: pd.Series,
+        encoding: str = "utf-8",
+        write_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(path, dtypes)
+        self.write_kwargs = dict(write_kwargs or {})
+        self.file: IO[str] = open(self.path, "w", encoding=encoding, newline="")
+        pd.DataFrame(columns=dtypes.index).to_csv(self.file, index=False, **self.write_kwargs)
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        chunk.to_csv(self.file, header=False, index=False, **self.write_kwargs)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class ArrowTableWriter(TableWriter):
+    """Writes Parquet (one row group per chunk) or Feather v2, i.e. the Arrow IPC file format."""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        dtypes: pd.Series,
+        output_format: str = "parquet",
+        compression: Optional[str] = "zstd",
+    ):
+        super().__init__(path, dtypes)
+        import pyarrow as pa
+
+        self._pa = pa
+        self._text_columns = [name for name, dtype in dtypes.items() if is_text_dtype(dtype)]
+        self.schema = pa.schema([
+            pa.field(str(name), pa.string() if is_text_dtype(dtype) else pa.from_numpy_dtype(dtype))
+            for name, dtype in dtypes.items()
+        ])
+        if output_format == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(str(self.path), self.schema, compression=compression or "none")
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._writer = pa.ipc.new_file(str(self.path), self.schema, options=options)
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        chunk = chunk.copy(deep=False)
+        for name in self._text_columns:
+            chunk[name] = as_text(chunk[name])
+        table = self._pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class NpzTableWriter(TableWriter):
+    """Writes one ``<column>.npy`` array per column into an ``.npz`` archive.
+
+    Columns are spooled to temporary files while chunks arrive, because the
+    ``.npy`` header needs the final row count (and, for text columns, the
+    longest string). Missing values in text columns are stored as ``""``.
+    """
+
+    def __init__(self, path: Union[str, Path], dtypes: pd.Series, compression: Optional[str] = None):
+        super().__init__(path, dtypes)
+        self.compression = zipfile.ZIP_DEFLATED if compression else zipfile.ZIP_STORED
+        self._spool = {name: tempfile.TemporaryFile() for name in dtypes.index}
+        self._text_width = {name: 1 for name, dtype in dtypes.items() if is_text_dtype(dtype)}
+
+    def _write(self, chunk: pd.DataFrame) -> None:
+        for name, spool in self._spool.items():
+            if name in self._text_width:
+                values = as_text(chunk[name]).fillna("").to_numpy(dtype=str)
+                self._text_width[name] = max(self._text_width[name], values.dtype.itemsize // 4)
+                np.save(spool, values, allow_pickle=False)
+            else:
+                spool.write(chunk[name].to_numpy(dtype=self.dtypes[name]).tobytes())
+
+    def close(self) -> None:
+        try:
+            with zipfile.ZipFile(self.path, "w", compression=self.compression, allowZip64=True) as archive:
+                for name, spool in self._spool.items():
+                    self._write_column(archive, str(name), spool)
+        finally:
+            for spool in self._spool.values():
+                spool.close()
+
+    def _write_column(self, archive: zipfile.ZipFile, name: str, spool: IO[bytes]) -> None:
+        width = self._text_width.get(name)
+        dtype = np.dtype(f"<U{width}") if width else self.dtypes[name]
+        header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (self.rows,)}
+        spool.seek(0)
+        with archive.open(f"{name}.npy", "w", force_zip64=True) as entry:
+            np.lib.format.write_array_header_1_0(entry, header)
+            if width is None:
+                shutil.copyfileobj(spool, entry, 1 << 20)
+                return
+            end = spool.seek(0, 2)
+            spool.seek(0)
+            while spool.tell() < end:
+                entry.write(np.load(spool, allow_pickle=False).astype(dtype).tobytes())
+
+
+def open_writer(
+    output_format: str,
+    path: Union[str, Path],
+    dtypes: pd.Series,
+    compression: Optional[str] = None,
+    encoding: str = "utf-8",
+    write_kwargs: Optional[Dict[str, Any]] = None,
+) -> TableWriter:
+    """Create the chunked writer for ``output_format``.
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If a Parquet/Feather writer is requested without pyarrow.
+    """
+    if output_format == "csv":
+        return CsvTableWriter(path, dtypes, encoding=encoding, write_kwargs=write_kwargs)
+    if output_format in ARROW_FORMATS:
+        return ArrowTableWriter(path, dtypes, output_format=output_format, compression=compression)
+    if output_format == "npz":
+        return NpzTableWriter(path, dtypes, compression=compression)
+    raise ValueError(f"Unknown output format: {output_format}")
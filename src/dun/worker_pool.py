@@ -0,0 +1,279 @@
+"""
+Pula rozgrzanych procesów roboczych wykonujących kod procesorów.
+"""
+
+import importlib
+import marshal
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from types import CodeType
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from dun.config.settings import get_settings
+
+STARTUP_TIMEOUT = 120.0
+# Co tyle sekund oczekujący na wolny proces sprawdza, czy pula nie została zamknięta
+ACQUIRE_POLL_INTERVAL = 0.1
+
+
+class WorkerError(RuntimeError):
+    """Błąd wykonania procesora w procesie roboczym."""
+
+
+def _peak_rss_mb() -> float:
+    """Zwraca szczytowe zużycie pamięci bieżącego procesu (MB)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux raportuje kilobajty, macOS bajty
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _worker_main(conn) -> None:
+    """Pętla procesu roboczego: odbiera skompilowany kod i odsyła ``result``."""
+    # Rozgrzanie importów przed zgłoszeniem gotowości
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    from dun.processor_engine import DynamicPackageManager, build_execution_context
+
+    package_manager = DynamicPackageManager()
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if task is None:
+            break
+
+        code_bytes, output_dir, env = task
+        # Pakiety mogły zostać doinstalowane przez proces nadrzędny
+        importlib.invalidate_caches()
+        try:
+            context = build_execution_context(output_dir, package_manager, environ=env)
+            exec(marshal.loads(code_bytes), context)
+            reply = ("ok", context.get("result", {"status": "completed"}))
+        except BaseException as e:
+            reply = ("error", f"{type(e).__name__}: {e}")
+
+        try:
+            conn.send(reply + (_peak_rss_mb(),))
+        except Exception as e:  # np. wynik, którego nie da się zserializować
+            conn.send(("error", f"Nie można przesłać wyniku procesora: {e}", _peak_rss_mb()))
+
+
+class _Worker:
+    """Uchwyt pojedynczego procesu roboczego."""
+
+    def __init__(self, mp_context):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(
+            target=_worker_main, args=(child_conn,), name="dun-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> None:
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise TimeoutError("Proces roboczy nie uruchomił się w wyznaczonym czasie")
+        try:
+            self.conn.recv()
+        except EOFError:
+            raise WorkerError(
+                f"Proces roboczy nie uruchomił się (kod wyjścia {self.process.exitcode})"
+            ) from None
+        self.ready = True
+
+    def stop(self) -> None:
+        """Kończy proces łagodnie (po zakończeniu bieżącego zadania)."""
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self) -> None:
+        """Natychmiast zabija proces."""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ProcessorWorkerPool:
+    """Pula procesów z zaimportowanymi pandas, numpy i środowiskiem ``dun``.
+
+    Każde zadanie to skompilowany kod procesora, wykonywany w wolnym procesie
+    roboczym; do wywołującego wraca słownik ``result``. Proces, który
+    przekroczy limit czasu, ulegnie awarii, wykona ``max_tasks_per_worker``
+    zadań lub przekroczy ``max_memory_mb`` szczytowej pamięci, jest
+    zastępowany nowym, który rozgrzewa się w tle.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        task_timeout: float = 300.0,
+        max_tasks_per_worker: int = 100,
+        max_memory_mb: float = 1024,
+        start_method: str = "spawn",
+    ):
+        self.size = size or os.cpu_count() or 1
+        self.task_timeout = task_timeout
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_memory_mb = max_memory_mb
+        self._mp_context = multiprocessing.get_context(start_method)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"tasks": 0, "recycled": 0, "timeouts": 0, "crashes": 0}
+
+        for _ in range(self.size):
+            self._idle.put(_Worker(self._mp_context))
+        logger.info(f"Uruchomiono pulę {self.size} procesów roboczych")
+
+    @classmethod
+    def from_settings(cls) -> "ProcessorWorkerPool":
+        settings = get_settings()
+        return cls(
+            size=settings.WORKER_POOL_SIZE,
+            task_timeout=settings.WORKER_TASK_TIMEOUT,
+            max_tasks_per_worker=settings.WORKER_MAX_TASKS,
+            max_memory_mb=settings.WORKER_MAX_MEMORY_MB,
+        )
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Liczniki: zadania, wymiany procesów, przekroczenia czasu i awarie."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def execute(
+        self,
+        code: CodeType,
+        output_dir: str,
+        env: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Wykonuje kod procesora w procesie roboczym i zwraca jego ``result``.
+
+        Raises:
+            TimeoutError: Gdy zadanie przekroczy limit czasu.
+            WorkerError: Gdy kod procesora zgłosi wyjątek lub proces ulegnie awarii.
+        """
+        timeout = self.task_timeout if timeout is None else timeout
+        payload = (marshal.dumps(code), output_dir, dict(env or {}))
+        worker = self._acquire()
+        healthy = False
+        recycle = False
+        try:
+            worker.wait_ready(STARTUP_TIMEOUT)
+            worker.conn.send(payload)
+            self._count("tasks")
+
+            if not worker.conn.poll(timeout):
+                self._count("timeouts")
+                raise TimeoutError(f"Procesor przekroczył limit czasu ({timeout} s)")
+            try:
+                status, result, rss_mb = worker.conn.recv()
+            except EOFError:
+                worker.process.join(timeout=1)
+                self._count("crashes")
+                raise WorkerError(
+                    f"Proces roboczy zakończył się nieoczekiwanie "
+                    f"(kod wyjścia {worker.process.exitcode})"
+                ) from None
+
+            healthy = True
+            worker.tasks += 1
+            recycle = (
+                worker.tasks >= self.max_tasks_per_worker or rss_mb > self.max_memory_mb
+            )
+            if status != "ok":
+                raise WorkerError(result)
+            return result
+        finally:
+            self._release(worker, healthy, recycle)
+
+    def _acquire(self) -> _Worker:
+        """Czeka na wolny proces; przerywa oczekiwanie po zamknięciu puli."""
+        while not self._closed:
+            try:
+                worker = self._idle.get(timeout=ACQUIRE_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if self._closed:
+                worker.stop()
+                break
+            return worker
+        raise RuntimeError("Pula procesów roboczych została zamknięta")
+
+    def _release(self, worker: _Worker, healthy: bool, recycle: bool) -> None:
+        """Zwraca proces do puli lub zastępuje go nowym."""
+        if self._closed:
+            # Zatrzymanie przy zamykaniu puli nie jest wymianą procesu
+            if healthy:
+                worker.stop()
+            else:
+                worker.kill()
+            return
+
+        if healthy and not recycle:
+            self._idle.put(worker)
+            return
+
+        if healthy:
+            worker.stop()
+            self._count("recycled")
+        else:
+            worker.kill()
+        self._idle.put(_Worker(self._mp_context))
+
+    def close(self) -> None:
+        """Zatrzymuje wszystkie bezczynne procesy robocze.
+
+        Procesy zajęte zadaniami są zatrzymywane po ich zakończeniu, a
+        wywołania czekające na wolny proces kończą się ``RuntimeError``.
+        """
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+    def __enter__(self) -> "ProcessorWorkerPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def worker_pool_from_settings() -> Optional[ProcessorWorkerPool]:
+    """Tworzy pulę procesów roboczych, jeśli włączono ``WORKER_POOL_ENABLED``.
+
+    Przeznaczone dla długo działających procesów (demon, przetwarzanie
+    wsadowe); jednorazowe ``dun run`` nie zyskałoby na rozgrzanej puli.
+    """
+    if not get_settings().WORKER_POOL_ENABLED:
+        return None
+    return ProcessorWorkerPool.from_settings()
@@ -9,16 +9,31 @@ import pytest
 # Add the project root to the Python path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from dun.config.settings import settings
 from dun.llm_analyzer import LLMAnalyzer, ProcessorConfig
 from dun.processor_engine import ProcessorEngine, DynamicPackageManager
+from dun.services.cache import CodeCache, DiskCache, SemanticCache
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    """Keep caches created from settings out of the working directory."""
+    cache_dir = tmp_path / ".cache"
+    cache_dir.mkdir()
+    monkeypatch.setattr(settings, "CACHE_DIR", cache_dir)
+    return cache_dir
 
 
 @pytest.fixture
-def mock_llm_analyzer():
+def mock_llm_analyzer(tmp_path):
     """Create a mock LLM analyzer."""
     with patch('requests.get') as mock_get:
         mock_get.return_value.status_code = 200
-        analyzer = LLMAnalyzer(base_url="http://test-ollama:11434")
+        analyzer = LLMAnalyzer(
+            base_url="http://test-ollama:11434",
+            cache=DiskCache(tmp_path / "llm_analysis"),
+            semantic_cache=SemanticCache(tmp_path / "llm_semantic"),
+        )
         
     # Mock the analyze_request method
     analyzer.analyze_request = MagicMock(return_value=ProcessorConfig(
@@ -33,9 +48,9 @@ def mock_llm_analyzer():
 
 
 @pytest.fixture
-def processor_engine(mock_llm_analyzer):
+def processor_engine(mock_llm_analyzer, tmp_path):
     """Create a processor engine with a mock LLM analyzer."""
-    return ProcessorEngine(mock_llm_analyzer)
+    return ProcessorEngine(mock_llm_analyzer, code_cache=CodeCache(tmp_path / "code"))
 
 
 @pytest.fixture
@@ -0,0 +1,165 @@
+"""Tests for AsyncLLMAnalyzer class."""
+import asyncio
+import hashlib
+import json
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from dun.llm_analyzer import AsyncLLMAnalyzer, ProcessorConfig
+from dun.services.cache import DiskCache, SemanticCache
+
+
+def make_ollama_app(state):
+    """Create a fake Ollama server that records request concurrency."""
+
+    async def tags(request):
+        return web.json_response({"models": []})
+
+    async def generate(request):
+        payload = await request.json()
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        state["calls"] += 1
+        await asyncio.sleep(0.05)
+        state["active"] -= 1
+        name = "processor_%d" % state["calls"]
+        return web.json_response({
+            "model": payload["model"],
+            "response": json.dumps({
+                "name": name,
+                "description": "Test processor",
+                "dependencies": [],
+                "parameters": {},
+                "code_template": "result = {'status': 'ok'}",
+            }),
+        })
+
+    async def embeddings(request):
+        payload = await request.json()
+        state["embeddings"] += 1
+        vector = state["vectors"].get(payload["prompt"])
+        if vector is None:
+            # Different prompts get (almost) orthogonal vectors
+            digest = hashlib.sha256(payload["prompt"].encode("utf-8")).digest()
+            vector = [float(b) - 127.5 for b in digest]
+        return web.json_response({"embedding": vector})
+
+    app = web.Application()
+    app.router.add_get("/api/tags", tags)
+    app.router.add_post("/api/generate", generate)
+    app.router.add_post("/api/embeddings", embeddings)
+    return app
+
+
+@pytest_asyncio.fixture
+async def ollama_server():
+    state = {"active": 0, "max_active": 0, "calls": 0, "embeddings": 0, "vectors": {}}
+    server = TestServer(make_ollama_app(state))
+    await server.start_server()
+    yield server, state
+    await server.close()
+
+
+@pytest.fixture
+def analyzer_factory(tmp_path, monkeypatch):
+    monkeypatch.setenv("OLLAMA_ENABLED", "true")
+
+    def factory(base_url, **kwargs):
+        return AsyncLLMAnalyzer(
+            base_url=base_url,
+            cache=DiskCache(tmp_path / "llm_analysis"),
+            semantic_cache=SemanticCache(tmp_path / "semantic"),
+            **kwargs,
+        )
+
+    return factory
+
+
+class TestAsyncLLMAnalyzer:
+    """Test cases for AsyncLLMAnalyzer."""
+
+    @pytest.mark.asyncio
+    async def test_analyze_many_runs_concurrently(self, ollama_server, analyzer_factory):
+        """Test that analyses share the pool and run concurrently."""
+        server, state = ollama_server
+        async with analyzer_factory(str(server.make_url("")).rstrip("/")) as analyzer:
+            assert await analyzer.check_connection()
+            results = await analyzer.analyze_many(["a", "b", "c"])
+
+        assert all(isinstance(r, ProcessorConfig) for r in results)
+        assert state["calls"] == 3
+        assert state["max_active"] > 1
+
+    @pytest.mark.asyncio
+    async def test_per_host_limit(self, ollama_server, analyzer_factory):
+        """Test that the per-host connection limit bounds concurrency."""
+        server, state = ollama_server
+        async with analyzer_factory(
+            str(server.make_url("")).rstrip("/"), max_connections_per_host=1
+        ) as analyzer:
+            await analyzer.analyze_many(["a", "b", "c"])
+
+        assert state["max_active"] == 1
+
+    @pytest.mark.asyncio
+    async def test_repeated_request_uses_cache(self, ollama_server, analyzer_factory):
+        """Test that the async analyzer shares the persistent cache logic."""
+        server, state = ollama_server
+        async with analyzer_factory(str(server.make_url("")).rstrip("/")) as analyzer:
+            first = await analyzer.analyze_request("Połącz pliki CSV")
+            second = await analyzer.analyze_request("Połącz pliki CSV")
+
+        assert state["calls"] == 1
+        assert second == first
+
+    @pytest.mark.asyncio
+    async def test_fallback_when_server_unavailable(self, analyzer_factory):
+        """Test fallback to the default processor when Ollama is unreachable."""
+        async with analyzer_factory("http://127.0.0.1:9", timeout=1) as analyzer:
+            assert not await analyzer.check_connection()
+            config = await analyzer.analyze_request("Połącz pliki CSV")
+
+        assert config.name == "csv_processor"
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_are_coalesced(self, ollama_server, analyzer_factory):
+        """Test that concurrent identical requests share one Ollama call."""
+        server, state = ollama_server
+        async with analyzer_factory(str(server.make_url("")).rstrip("/")) as analyzer:
+            results = await analyzer.analyze_many(["Połącz pliki CSV"] * 5 + ["inne"])
+
+        assert state["calls"] == 2
+        assert all(r == results[0] for r in results[:5])
+        assert analyzer.coalescing_stats == {"calls": 6, "executions": 2, "coalesced": 4}
+
+    @pytest.mark.asyncio
+    async def test_similar_request_uses_semantic_cache(self, ollama_server, analyzer_factory):
+        """Test that embeddings come from the shared session and feed the semantic cache."""
+        server, state = ollama_server
+        state["vectors"] = {
+            "Połącz pliki CSV": [1.0, 0.0, 0.0],
+            "Połącz wszystkie pliki CSV": [0.99, 0.1, 0.0],
+        }
+        async with analyzer_factory(str(server.make_url("")).rstrip("/")) as analyzer:
+            first = await analyzer.analyze_request("Połącz pliki CSV")
+            second = await analyzer.analyze_request("Połącz wszystkie pliki CSV")
+
+        assert state["embeddings"] == 2
+        assert state["calls"] == 1
+        assert second == first
+
+    @pytest.mark.asyncio
+    async def test_cache_bypass_is_not_coalesced(self, ollama_server, analyzer_factory):
+        """Test that use_cache=False calls do not share an in-flight cached call."""
+        server, state = ollama_server
+        async with analyzer_factory(str(server.make_url("")).rstrip("/")) as analyzer:
+            await asyncio.gather(
+                analyzer.analyze_request("Połącz pliki CSV"),
+                analyzer.analyze_request("Połącz pliki CSV", use_cache=False),
+            )
+
+        assert state["calls"] == 2
+        assert analyzer.coalescing_stats["coalesced"] == 0
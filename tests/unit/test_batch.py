@@ -0,0 +1,108 @@
+"""Tests for the pipelined batch runner."""
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from dun.batch import BatchRunner, load_commands, run_batch
+
+
+class FakeEngine:
+    """Engine stub recording how the two pipeline stages overlap."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {"analysis": 0, "execution": 0}
+        self.overlapped = False
+        self.closed = False
+
+    def _enter(self, stage):
+        with self.lock:
+            self.active[stage] += 1
+            if self.active["analysis"] and self.active["execution"]:
+                self.overlapped = True
+
+    def _leave(self, stage):
+        with self.lock:
+            self.active[stage] -= 1
+
+    def prepare_processor(self, command):
+        self._enter("analysis")
+        time.sleep(self.delay)
+        self._leave("analysis")
+        if command == "bad analysis":
+            raise ValueError("cannot analyze")
+        return command
+
+    def execute_processor(self, config):
+        self._enter("execution")
+        time.sleep(self.delay)
+        self._leave("execution")
+        if config == "bad execution":
+            raise RuntimeError("cannot execute")
+        return {"status": "success", "command": config}
+
+    def close(self):
+        self.closed = True
+
+
+class TestBatchRunner:
+    """Test cases for BatchRunner."""
+
+    def test_results_written_as_jsonl(self, tmp_path):
+        """Test that every command produces one JSONL line with timings."""
+        output = tmp_path / "results.jsonl"
+        commands = ["one", "bad analysis", "two", "bad execution"]
+
+        summary = BatchRunner(FakeEngine(), workers=2).run(commands, output)
+
+        lines = [json.loads(line) for line in output.read_text().splitlines()]
+        by_index = {line["index"]: line for line in lines}
+        assert sorted(by_index) == [1, 2, 3, 4]
+        assert by_index[1]["status"] == "success"
+        assert by_index[1]["result"] == {"status": "success", "command": "one"}
+        assert set(by_index[1]["timings"]) == {"analysis", "wait", "execution", "total"}
+        assert by_index[2]["status"] == "error"
+        assert "cannot analyze" in by_index[2]["error"]
+        assert "execution" not in by_index[2]["timings"]
+        assert by_index[4]["error"] == "cannot execute"
+        assert summary["success"] == 2 and summary["error"] == 2
+
+    def test_stages_overlap(self, tmp_path):
+        """Test that analysis of later commands overlaps with execution."""
+        engine = FakeEngine()
+
+        BatchRunner(engine, workers=1).run(["a", "b", "c"], tmp_path / "out.jsonl")
+
+        assert engine.overlapped
+
+    def test_invalid_worker_count(self):
+        """Test that a non-positive worker count is rejected."""
+        with pytest.raises(ValueError):
+            BatchRunner(FakeEngine(), workers=0)
+
+
+def test_load_commands_skips_comments(tmp_path):
+    """Test that empty lines and comments are ignored."""
+    input_file = tmp_path / "commands.txt"
+    input_file.write_text("# comment\n\nfirst\n  second  \n", encoding="utf-8")
+
+    assert load_commands(input_file) == ["first", "second"]
+
+
+def test_run_batch_closes_own_engine(tmp_path):
+    """Test that run_batch closes the engine it created, but not a passed one."""
+    input_file = tmp_path / "commands.txt"
+    input_file.write_text("one\n", encoding="utf-8")
+    owned = FakeEngine(delay=0)
+    passed = FakeEngine(delay=0)
+
+    with patch("dun.processor_engine.ProcessorEngine", return_value=owned):
+        run_batch(input_file, tmp_path / "owned.jsonl")
+    run_batch(input_file, tmp_path / "passed.jsonl", engine=passed)
+
+    assert owned.closed
+    assert not passed.closed
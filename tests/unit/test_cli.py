@@ -0,0 +1,26 @@
+"""Tests for the command-line entry point."""
+from unittest.mock import patch
+
+from dun import cli
+
+
+class TestShortcut:
+    """Test cases for the `dun "polecenie"` shortcut."""
+
+    @patch('dun.cli.execute_command', return_value=0)
+    def test_options_after_request_are_parsed(self, mock_execute):
+        """Test that flags after the request are not glued into its text."""
+        assert cli.main(["Połącz pliki CSV", "--no-cache", "--no-daemon"]) == 0
+
+        mock_execute.assert_called_once_with(
+            "Połącz pliki CSV", use_cache=False, use_daemon=False
+        )
+
+    @patch('dun.cli.execute_command', return_value=0)
+    def test_plain_request(self, mock_execute):
+        """Test that a bare request runs with the default options."""
+        assert cli.main(["Połącz pliki CSV"]) == 0
+
+        mock_execute.assert_called_once_with(
+            "Połącz pliki CSV", use_cache=True, use_daemon=True
+        )
@@ -0,0 +1,126 @@
+"""Tests for the compiled template cache."""
+import ast
+import marshal
+import os
+from importlib.util import MAGIC_NUMBER
+from types import CodeType
+from unittest.mock import patch
+
+import pytest
+
+from dun.services.cache import CodeCache, TemplateValidationError
+
+
+class TestCodeCache:
+    """Test cases for CodeCache."""
+
+    def test_compiles_once(self, tmp_path):
+        """Test that repeated lookups reuse the compiled code object."""
+        cache = CodeCache(tmp_path)
+        source = "result = {'status': 'ok'}"
+
+        code = cache.get(source)
+        namespace = {}
+        exec(code, namespace)
+
+        assert isinstance(code, CodeType)
+        assert cache.get(source) is code
+        assert namespace["result"] == {"status": "ok"}
+        assert cache.stats == {"hits": 1, "disk_hits": 0, "misses": 1}
+
+    def test_disk_entries_are_validated_once_per_process(self, tmp_path):
+        """Test that a new instance validates a disk entry once, but never recompiles it."""
+        source = "result = 1 + 1"
+        writer = CodeCache(tmp_path)
+        writer.get(source)
+        writer.get("x = 0")
+
+        cache = CodeCache(tmp_path, max_entries=1)
+        with patch("dun.services.cache.code.compile") as mock_compile, \
+                patch("dun.services.cache.code.ast.parse", wraps=ast.parse) as mock_parse:
+            code = cache.get(source)
+            cache.get("x = 0")  # evicts ``source`` from memory
+            cache.get(source)
+
+        mock_compile.assert_not_called()
+        assert mock_parse.call_count == 2  # ``source`` and "x = 0", once each
+        assert cache.stats["disk_hits"] == 3
+        namespace = {}
+        exec(code, namespace)
+        assert namespace["result"] == 2
+
+    def test_forbidden_template_on_disk_is_rejected(self, tmp_path):
+        """Test that bytecode planted on disk cannot bypass validation."""
+        cache = CodeCache(tmp_path)
+        source = "result = eval('1')"
+        key = CodeCache.key(source)
+        path = cache.directory / f"{key}{CodeCache.SUFFIX}"
+        path.write_bytes(MAGIC_NUMBER + key.encode("ascii") + marshal.dumps(compile(source, "<x>", "exec")))
+
+        with pytest.raises(TemplateValidationError):
+            cache.get(source)
+
+    def test_entries_stored_under_another_key_are_ignored(self, tmp_path):
+        """Test that a file whose header names another source is recompiled."""
+        cache = CodeCache(tmp_path)
+        source = "result = 5"
+        other_key = CodeCache.key("result = 6")
+        path = cache.directory / f"{CodeCache.key(source)}{CodeCache.SUFFIX}"
+        path.write_bytes(
+            MAGIC_NUMBER + other_key.encode("ascii") + marshal.dumps(compile("result = 6", "<x>", "exec"))
+        )
+
+        namespace = {}
+        exec(cache.get(source), namespace)
+
+        assert namespace["result"] == 5
+        assert cache.stats["misses"] == 1
+
+    def test_disk_entries_are_capped(self, tmp_path):
+        """Test that the least recently used files are evicted above the limit."""
+        cache = CodeCache(tmp_path, max_disk_entries=2)
+        for i in range(3):
+            cache.get(f"x = {i}")
+            path = cache.directory / f"{CodeCache.key(f'x = {i}')}{CodeCache.SUFFIX}"
+            os.utime(path, (i, i))
+
+        cache.get("x = 3")
+
+        names = {path.name for path in cache.directory.glob(f"*{CodeCache.SUFFIX}")}
+        assert names == {
+            f"{CodeCache.key(f'x = {i}')}{CodeCache.SUFFIX}" for i in (2, 3)
+        }
+
+    def test_entries_from_other_python_versions_are_ignored(self, tmp_path):
+        """Test that files with a different magic number are recompiled."""
+        cache = CodeCache(tmp_path)
+        source = "result = 3"
+        path = cache.directory / f"{CodeCache.key(source)}{CodeCache.SUFFIX}"
+        path.write_bytes(b"\x00\x00\r\n" + marshal.dumps(compile("result = 4", "<x>", "exec")))
+
+        namespace = {}
+        exec(cache.get(source), namespace)
+
+        assert namespace["result"] == 3
+        assert cache.stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        """Test that the in-memory LRU is bounded."""
+        cache = CodeCache(max_entries=2)
+        for i in range(3):
+            cache.get(f"x = {i}")
+
+        assert len(cache) == 2
+
+    @pytest.mark.parametrize("source", [
+        "result = eval('1')",
+        "import os\nos.system('ls')",
+        "def broken(:\n    pass",
+    ])
+    def test_invalid_templates_are_rejected(self, tmp_path, source):
+        """Test that syntax errors and forbidden calls fail validation."""
+        cache = CodeCache(tmp_path)
+
+        with pytest.raises(TemplateValidationError):
+            cache.get(source)
+        assert list(cache.directory.iterdir()) == []
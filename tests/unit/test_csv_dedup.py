@@ -0,0 +1,99 @@
+"""Tests for streaming de-duplication."""
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.processors.csv_dedup import BloomFilter, RowDeduplicator
+from dun.services.processors.csv_processor import CSVProcessor
+from dun.services.processors.csv_sort import sort_csv_stream
+from dun.services.processors.csv_stream import combine_csv_stream
+
+
+@pytest.fixture
+def shards(tmp_path):
+    """Overlapping shards: every shard repeats rows of its own and of the previous one."""
+    rng = np.random.default_rng(0)
+    rows = pd.DataFrame({
+        "id": rng.integers(0, 300, size=2000),
+        "kind": rng.choice(["a", "b", None], size=2000),
+        "value": rng.integers(0, 3, size=2000) / 2,
+    })
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"shard{i}.csv"
+        rows.iloc[i * 400:i * 400 + 800].to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def dedup_in_memory(paths, subset=None):
+    frames = [pd.read_csv(path).assign(_source_file=str(path)) for path in paths]
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.drop_duplicates(subset or ["id", "kind", "value"]).to_csv(index=False)
+
+
+@pytest.mark.parametrize("subset", [None, ["id"], ["kind", "value"]])
+@pytest.mark.parametrize("capacity", [10, 100_000])
+def test_matches_drop_duplicates(shards, tmp_path, subset, capacity):
+    """Test that the output equals drop_duplicates, also when the Bloom filter is saturated."""
+    output = tmp_path / "combined.csv"
+
+    with RowDeduplicator(subset, capacity=capacity, temp_dir=tmp_path, exclude=["_source_file"]) as dedup:
+        result = combine_csv_stream(shards, output, chunk_size=150, dedup=dedup)
+
+    assert output.read_text() == dedup_in_memory(shards, subset)
+    assert result.rows == dedup.rows - dedup.duplicates
+    if capacity == 10:
+        assert dedup.lookups > 0
+    assert not list(tmp_path.glob("dedup_*"))
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added item is reported as possibly seen."""
+    rng = np.random.default_rng(1)
+    high, low = (rng.integers(0, 2 ** 63, size=5000, dtype=np.uint64) for _ in range(2))
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+
+    bloom.add(high[:2500], low[:2500])
+
+    assert bloom.contains(high[:2500], low[:2500]).all()
+    assert bloom.contains(high[2500:], low[2500:]).mean() < 0.05
+
+
+def test_sorted_output_keeps_first_in_sort_order(shards, tmp_path):
+    """Test that de-duplication after the merge keeps the first row in sorted order."""
+    output = tmp_path / "sorted.csv"
+
+    with RowDeduplicator(["id"], temp_dir=tmp_path) as dedup:
+        sort_csv_stream(shards, output, ["id", "value"], chunk_size=200, dedup=dedup)
+
+    frames = [pd.read_csv(path).assign(_source_file=str(path)) for path in shards]
+    expected = (
+        pd.concat(frames, ignore_index=True)
+        .sort_values(["id", "value"], kind="stable", na_position="last")
+        .drop_duplicates(["id"])
+    )
+    assert output.read_text() == expected.to_csv(index=False)
+
+
+def test_unknown_column(shards, tmp_path):
+    """Test that comparing a missing column fails without leaving output behind."""
+    with RowDeduplicator(["missing"], temp_dir=tmp_path) as dedup:
+        with pytest.raises(ValueError, match="missing"):
+            combine_csv_stream(shards, tmp_path / "combined.csv", dedup=dedup)
+    assert not (tmp_path / "combined.csv").exists()
+
+
+@pytest.mark.asyncio
+async def test_processor_dedup(shards, tmp_path):
+    """Test that CSVProcessor de-duplicates rows ignoring the source column, even without streaming."""
+    processor = CSVProcessor({"dedup": True, "streaming": False, "chunk_size": 100, "run_cache": False})
+    output = tmp_path / "out" / "combined.csv"
+
+    with patch("dun.services.filesystem.fs.get_temp_dir", return_value=tmp_path):
+        await processor.combine_csv_files(shards, output)
+
+    assert output.read_text() == dedup_in_memory(shards)
+    await processor.shutdown()
@@ -0,0 +1,177 @@
+"""Tests for the incremental CSV combine."""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pandas as pd
+import pytest
+
+from dun.services.processors import csv_incremental
+from dun.services.processors.csv_incremental import combine_csv_incremental, manifest_path
+from dun.services.processors.csv_processor import CSVProcessor
+
+SHARDS = {
+    "2024-01-01.csv": "id,name,value\n1,test,100\n2,example,200\n",
+    "2024-01-02.csv": "id,name,value\n3,item,10\n",
+    "2024-01-03.csv": "id,name,value\n4,other,30\n5,,40\n",
+}
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def concat_in_memory(paths, source_column="_source_file"):
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path)
+        if source_column:
+            df[source_column] = str(path)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True).to_csv(index=False)
+
+
+@pytest.fixture
+def shards(tmp_path):
+    (tmp_path / "data").mkdir()
+    return [write(tmp_path / "data" / name, text) for name, text in SHARDS.items()]
+
+
+@pytest.fixture
+def output(tmp_path):
+    return tmp_path / "combined.csv"
+
+
+@pytest.mark.parametrize("source_column", ["_source_file", None])
+class TestCombineCsvIncremental:
+    """Test cases for combine_csv_incremental."""
+
+    def test_appends_only_new_files(self, shards, output, source_column):
+        """Test that a run reads only the new files and matches a full combine."""
+        first = combine_csv_incremental(shards[:2], output, source_column=source_column)
+        assert first.rebuilt
+        assert output.read_text() == concat_in_memory(shards[:2], source_column)
+
+        with patch.object(csv_incremental, "read_header_line", wraps=csv_incremental.read_header_line) as headers, \
+                patch.object(csv_incremental, "infer_schema", wraps=csv_incremental.infer_schema) as scans:
+            second = combine_csv_incremental(shards, output, source_column=source_column)
+        assert not second.rebuilt
+        assert second.files == [shards[2]]
+        assert output.read_text() == concat_in_memory(shards, source_column)
+        read = [call.args[0] for call in headers.call_args_list] + [
+            path for call in scans.call_args_list for path in call.args[0]
+        ]
+        assert set(map(str, read)) == {str(shards[2])}
+
+        manifest = json.loads(manifest_path(output).read_text())
+        data = output.read_bytes()
+        entry = manifest["files"][2]
+        assert data[entry["offset"]:entry["offset"] + entry["length"]].decode().startswith("4,other,30")
+
+        third = combine_csv_incremental(shards, output, source_column=source_column)
+        assert third.files == []
+        assert output.read_text() == concat_in_memory(shards, source_column)
+
+    def test_modified_input_rebuilds(self, shards, output, source_column):
+        """Test that changing an ingested file rebuilds the whole output."""
+        combine_csv_incremental(shards, output, source_column=source_column)
+        write(shards[0], "id,name,value\n1,changed,100\n")
+        touch(shards[0])
+
+        result = combine_csv_incremental(shards, output, source_column=source_column)
+
+        assert result.rebuilt
+        assert output.read_text() == concat_in_memory(shards, source_column)
+
+    def test_removed_input_rebuilds(self, shards, output, source_column):
+        """Test that a file no longer among the inputs is dropped from the output."""
+        combine_csv_incremental(shards, output, source_column=source_column)
+
+        result = combine_csv_incremental(shards[1:], output, source_column=source_column)
+
+        assert result.rebuilt
+        assert output.read_text() == concat_in_memory(shards[1:], source_column)
+
+    def test_modified_output_rebuilds(self, shards, output, source_column):
+        """Test that an output changed by someone else is not appended to."""
+        combine_csv_incremental(shards[:2], output, source_column=source_column)
+        write(output, "garbage\n")
+
+        result = combine_csv_incremental(shards, output, source_column=source_column)
+
+        assert result.rebuilt
+        assert output.read_text() == concat_in_memory(shards, source_column)
+
+
+def test_schema_change_rebuilds(shards, output, tmp_path):
+    """Test that a new file changing the union dtypes rewrites the existing rows."""
+    combine_csv_incremental(shards, output, source_column="_source_file")
+    extra = write(tmp_path / "data" / "2024-01-04.csv", "id,name,value\n6,x,\n7,y,1.5\n")
+    paths = [*shards, extra]
+
+    result = combine_csv_incremental(paths, output, source_column="_source_file")
+
+    assert result.rebuilt
+    assert "1,test,100.0" in output.read_text()
+    assert output.read_text() == concat_in_memory(paths)
+
+
+def test_new_header_in_byte_mode_rebuilds(shards, output, tmp_path):
+    """Test that byte-level appends fall back to parsing when a header differs."""
+    combine_csv_incremental(shards[:2], output)
+    extra = write(tmp_path / "data" / "2024-01-04.csv", "id,value,name\n6,1,x\n")
+    paths = [*shards, extra]
+
+    result = combine_csv_incremental(paths, output)
+
+    assert result.rebuilt
+    assert output.read_text() == concat_in_memory(paths, None)
+
+
+def test_compact_parallel_append(shards, output):
+    """Test that compact dtypes and a thread pool give the same text."""
+    with ThreadPoolExecutor(2) as executor:
+        combine_csv_incremental(shards[:1], output, source_column="_source_file", compact=True, executor=executor)
+        result = combine_csv_incremental(shards, output, source_column="_source_file", compact=True, executor=executor)
+
+    assert result.files == shards[1:]
+    assert result.rows == 3
+    assert output.read_text() == concat_in_memory(shards)
+
+
+def test_failed_append_keeps_previous_output(shards, output):
+    """Test that an interrupted append is truncated and retried on the next run."""
+    combine_csv_incremental(shards[:2], output, source_column="_source_file")
+    before = output.read_bytes()
+
+    with patch.object(csv_incremental, "_write_part", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            combine_csv_incremental(shards, output, source_column="_source_file")
+    assert output.read_bytes() == before
+
+    result = combine_csv_incremental(shards, output, source_column="_source_file")
+    assert result.files == [shards[2]]
+    assert output.read_text() == concat_in_memory(shards)
+
+
+@pytest.mark.asyncio
+async def test_processor_incremental(shards, tmp_path):
+    """Test that CSVProcessor appends new shards in incremental mode."""
+    processor = CSVProcessor({"input_dir": tmp_path / "data", "incremental": True, "run_cache": False})
+    output = tmp_path / "out" / "combined.csv"
+
+    await processor.combine_csv_files(shards[:2], output)
+    with patch.object(csv_incremental, "infer_schema", wraps=csv_incremental.infer_schema) as scans:
+        await processor.combine_csv_files(shards, output)
+
+    scans.assert_called_once()
+    assert scans.call_args.args[0] == [str(shards[2])]
+    assert output.read_text() == concat_in_memory(shards)
+    await processor.shutdown()
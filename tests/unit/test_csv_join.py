@@ -0,0 +1,112 @@
+"""Tests for the memory-bounded CSV hash join."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.processors.csv_join import join_csv
+from dun.services.processors.csv_processor import CSVProcessor
+
+
+@pytest.fixture
+def tables(tmp_path):
+    rng = np.random.default_rng(0)
+    customers = pd.DataFrame({
+        "customer_id": np.arange(1, 301),
+        "name": [f"client {i}" for i in range(1, 301)],
+        "score": rng.integers(0, 9, 300),
+    })
+    orders = pd.DataFrame({
+        "order_id": np.arange(2000),
+        "customer_id": rng.integers(0, 350, 2000).astype(float),
+        "score": rng.normal(size=2000).round(2),
+    })
+    orders.loc[::97, "customer_id"] = np.nan
+    customer_files = [tmp_path / "klienci1.csv", tmp_path / "klienci2.csv"]
+    customers.iloc[:150].to_csv(customer_files[0], index=False)
+    customers.iloc[150:].to_csv(customer_files[1], index=False)
+    orders.to_csv(tmp_path / "zamowienia.csv", index=False)
+    return customer_files, [tmp_path / "zamowienia.csv"], customers, orders
+
+
+def number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def as_rows(frame):
+    """Sorted rows with numbers parsed, to compare joins regardless of row order and of "1" vs "1.0"."""
+    return sorted(tuple(str(number(value)) for value in row) for row in frame.to_numpy())
+
+
+def read_back(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "outer"])
+@pytest.mark.parametrize("customers_left", [True, False])
+@pytest.mark.parametrize("memory_budget", [1 << 30, 8000])
+def test_matches_pd_merge(tables, tmp_path, how, customers_left, memory_budget):
+    """Test that in-memory and grace joins give the rows of pd.merge on either build side."""
+    customer_files, order_files, customers, orders = tables
+    left, right = (customer_files, order_files) if customers_left else (order_files, customer_files)
+    left_frame, right_frame = (customers, orders) if customers_left else (orders, customers)
+    output = tmp_path / "joined.csv"
+
+    result = join_csv(left, right, output, ["customer_id"], how, chunk_size=256,
+                      memory_budget=memory_budget, temp_dir=tmp_path)
+
+    expected = pd.read_csv(
+        pd.io.common.StringIO(pd.merge(left_frame, right_frame, on="customer_id", how=how).to_csv(index=False)),
+        dtype=str, keep_default_na=False,
+    )
+    joined = read_back(output)
+    assert list(joined.columns) == list(expected.columns)
+    assert as_rows(joined) == as_rows(expected)
+    assert result.build_side == ("left" if customers_left else "right")
+    assert (result.partitions > 1) == (memory_budget == 8000)
+    assert not list(tmp_path.glob("join_*"))
+
+
+def test_nullable_integers(tmp_path):
+    """Test that integers of the optional side are not written as floats."""
+    (tmp_path / "a.csv").write_text("id,count\n1,5\n2,6\n")
+    (tmp_path / "b.csv").write_text("id,total,flag\n1,10,True\n3,30,False\n")
+
+    join_csv([tmp_path / "a.csv"], [tmp_path / "b.csv"], tmp_path / "out.csv", ["id"], "outer")
+
+    assert sorted((tmp_path / "out.csv").read_text().splitlines()) == sorted([
+        "id,count,total,flag", "1,5,10,True", "2,6,,", "3,,30,False",
+    ])
+
+
+def test_invalid_keys(tables, tmp_path):
+    """Test that missing or incompatible key columns are rejected."""
+    customer_files, order_files, _, _ = tables
+    (tmp_path / "text.csv").write_text("customer_id\nabc\n")
+
+    with pytest.raises(ValueError, match="missing"):
+        join_csv(customer_files, order_files, tmp_path / "out.csv", ["name"])
+    with pytest.raises(ValueError, match="Cannot join"):
+        join_csv(customer_files, [tmp_path / "text.csv"], tmp_path / "out.csv", ["customer_id"])
+    with pytest.raises(ValueError, match="Unknown join"):
+        join_csv(customer_files, order_files, tmp_path / "out.csv", ["customer_id"], "cross")
+
+
+@pytest.mark.asyncio
+async def test_join_request(tables, tmp_path):
+    """Test that a Polish join request is parsed into files, key and join type."""
+    (tmp_path / "klienci.csv").write_text("customer_id,name\n1,Ann\n2,Bob\n")
+    (tmp_path / "zamowienia.csv").write_text("order_id,customer_id\n10,1\n11,1\n12,3\n")
+    for path in tables[0]:
+        path.unlink()
+    processor = CSVProcessor({"input_dir": tmp_path, "output_dir": tmp_path / "output"})
+
+    result = await processor.process_csv_request("Połącz klientów z zamówieniami po customer_id")
+
+    assert result["status"] == "success"
+    assert read_back(result["output_file"]).to_dict("list") == {
+        "customer_id": ["1", "1"], "name": ["Ann", "Ann"], "order_id": ["10", "11"],
+    }
+    await processor.shutdown()
@@ -0,0 +1,181 @@
+"""Tests for queries with column projection and filter pushdown."""
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.cache import DiskCache
+from dun.services.processors import csv_query
+from dun.services.processors.csv_processor import CSVProcessor
+from dun.services.processors.csv_query import Filter, Query, RangeCache, query_csv
+from dun.services.processors.csv_schema import SchemaCache, infer_schema
+
+
+@pytest.fixture
+def yearly(tmp_path):
+    """One shard per year; region is missing in one of them."""
+    rng = np.random.default_rng(0)
+    paths = []
+    for year in (2022, 2023, 2024, 2025):
+        df = pd.DataFrame({
+            "date": pd.date_range(f"{year}-01-01", periods=400, freq="20h").strftime("%Y-%m-%d"),
+            "region": rng.choice(["north", "south", None], size=400),
+            "amount": rng.integers(0, 100, size=400),
+            "price": rng.normal(size=400).round(3),
+        })
+        if year == 2023:
+            df = df.drop(columns="region")
+        path = tmp_path / f"sales_{year}.csv"
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def range_cache(tmp_path):
+    return RangeCache(DiskCache(tmp_path / "ranges"))
+
+
+def load(paths):
+    return pd.concat([pd.read_csv(path) for path in paths], ignore_index=True)
+
+
+@pytest.mark.parametrize("chunk_size", [50, 10_000])
+def test_grouped_aggregates_match_pandas(yearly, chunk_size):
+    """Test that per-chunk partial aggregates combine to the in-memory groupby result."""
+    query = Query.from_dict({
+        "where": [{"column": "date", "op": "startswith", "value": "202"}, {"column": "amount", "op": ">=", "value": 10}],
+        "group_by": ["region"],
+        "aggregates": [
+            {"func": "sum", "column": "amount"}, {"func": "mean", "column": "price"},
+            {"func": "count"}, {"func": "max", "column": "date"},
+        ],
+    })
+
+    result = query_csv(yearly, query, chunk_size=chunk_size)
+
+    full = load(yearly)
+    expected = (
+        full[full["amount"] >= 10]
+        .groupby("region", dropna=False)
+        .agg(sum_amount=("amount", "sum"), mean_price=("price", "mean"), count=("amount", "size"), max_date=("date", "max"))
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(result.frame, expected, check_dtype=False)
+    assert result.rows_scanned == 1600
+
+
+def test_rows_are_projected_and_limited(yearly):
+    """Test that only the touched columns are parsed and the row query stops at the limit."""
+    query = Query.from_dict({
+        "select": ["date", "amount"],
+        "where": [{"column": "amount", "op": "in", "value": [5, 6]}],
+        "limit": 5,
+    })
+
+    with patch.object(csv_query, "iter_chunks", wraps=csv_query.iter_chunks) as iter_chunks:
+        result = query_csv(yearly, query, chunk_size=100)
+
+    full = load(yearly)
+    expected = full.loc[full["amount"].isin([5, 6]), ["date", "amount"]].head(5).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result.frame, expected)
+    assert iter_chunks.call_args.kwargs["usecols"] == ["date", "amount"]
+    assert len(result.files) < len(yearly)
+    assert result.files == yearly[:len(result.files)]
+
+
+def test_recorded_ranges_skip_files(yearly, range_cache):
+    """Test that the ranges recorded by a query let later queries skip files unopened."""
+    query = Query(where=[Filter("date", "startswith", "2024")], aggregates=[csv_query.Aggregate("sum", "amount")])
+    first = query_csv(yearly, query, range_cache=range_cache)
+
+    with patch.object(csv_query, "query_file", wraps=csv_query.query_file) as query_file:
+        second = query_csv(yearly, query, range_cache=range_cache)
+
+    assert first.skipped == [] and first.files == yearly
+    assert [call.args[0] for call in query_file.call_args_list] == [yearly[2]]
+    assert second.skipped == [yearly[0], yearly[1], yearly[3]]
+    assert second.frame.equals(first.frame)
+    assert second.frame.iloc[0, 0] == pd.read_csv(yearly[2])["amount"].sum()
+
+
+def test_changed_file_is_read_again(yearly, range_cache):
+    """Test that recorded ranges are dropped when a file changes."""
+    query = Query(where=[Filter("amount", ">", 500)])
+    assert query_csv(yearly, query, range_cache=range_cache).frame.empty
+
+    df = pd.read_csv(yearly[1])
+    df.loc[0, "amount"] = 900
+    df.to_csv(yearly[1], index=False)
+    os.utime(yearly[1], ns=(1, 1))
+    result = query_csv(yearly, query, range_cache=range_cache)
+
+    assert result.files == [yearly[1]]
+    assert result.frame["amount"].tolist() == [900]
+
+
+def test_scan_cache_ranges_and_dtypes(yearly, tmp_path):
+    """Test that cached scans prune numeric filters and give the read dtypes."""
+    schema_cache = SchemaCache(DiskCache(tmp_path / "schema"))
+    infer_schema(yearly, cache=schema_cache)
+    query = Query(where=[Filter("amount", "<", 0)], aggregates=[csv_query.Aggregate("count")])
+
+    result = query_csv(yearly, query, schema_cache=schema_cache)
+    assert result.skipped == yearly
+    assert result.frame["count"].tolist() == [0]
+
+    with patch.object(csv_query, "iter_chunks", wraps=csv_query.iter_chunks) as iter_chunks:
+        query_csv(yearly[:1], Query(select=["amount", "region"]), schema_cache=schema_cache)
+    assert iter_chunks.call_args.kwargs["dtype"] == {"amount": np.dtype("int64"), "region": np.dtype(object)}
+
+
+def test_missing_filter_column_skips_file(yearly):
+    """Test that a file without a filter column cannot match."""
+    result = query_csv(yearly, Query(where=[Filter("region", "==", "north")], aggregates=[csv_query.Aggregate("count")]))
+
+    assert result.skipped == [yearly[1]]
+    assert result.frame["count"].tolist() == [int((load(yearly)["region"] == "north").sum())]
+
+
+def test_unknown_column(yearly):
+    """Test that a column in none of the files is reported."""
+    with pytest.raises(ValueError, match="missing"):
+        query_csv(yearly, Query(select=["missing"]))
+
+
+@pytest.mark.parametrize("condition,value_range,expected", [
+    (Filter("x", ">", 5), [0, 5], False),
+    (Filter("x", ">=", "5"), [0, 5], True),
+    (Filter("x", "between", [6, 9]), [0, 5], False),
+    (Filter("x", "in", [1, 9]), [2, 5], False),
+    (Filter("x", "!=", 3), [3, 3], False),
+    (Filter("x", "startswith", "2024"), ["2023-01-01", "2023-12-31"], False),
+    (Filter("x", "startswith", "2024"), ["2023-01-01", "2024-01-01"], True),
+    (Filter("x", "==", "a"), [0, 5], True),
+    (Filter("x", "==", 1), None, False),
+])
+def test_may_match(condition, value_range, expected):
+    """Test the range checks used to skip files."""
+    assert condition.may_match(value_range) is expected
+
+
+def test_invalid_query():
+    """Test that unknown operators and aggregates are rejected."""
+    with pytest.raises(ValueError, match="operator"):
+        Query.from_dict({"where": [{"column": "a", "op": "~", "value": 1}]})
+    with pytest.raises(ValueError, match="median"):
+        Query.from_dict({"aggregates": [{"func": "median", "column": "a"}]})
+
+
+@pytest.mark.asyncio
+async def test_processor_request(yearly, tmp_path):
+    """Test that a natural language aggregate request becomes a filtered query."""
+    processor = CSVProcessor({"input_dir": tmp_path, "schema_cache": False, "run_cache": False})
+
+    response = await processor.process_csv_request("pokaż sumę kolumny amount dla 2024 z plików w data/")
+
+    assert response["status"] == "success"
+    assert response["result"]["data"] == [{"sum_amount": int(pd.read_csv(yearly[2])["amount"].sum())}]
+    await processor.shutdown()
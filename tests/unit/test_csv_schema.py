@@ -0,0 +1,109 @@
+"""Tests for CSV schema inference and compact dtypes."""
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.cache import DiskCache
+from dun.services.processors import csv_schema
+from dun.services.processors.csv_schema import SchemaCache, infer_schema
+from dun.services.processors.csv_stream import combine_csv_stream
+
+SHARDS = {
+    "a.csv": "id,city,price,day,ratio\n1,Gdańsk,1.5,2024-01-01,0.1\n2,Kraków,,2024-01-02,0.2\n3,Gdańsk,2.25,,0.3\n",
+    "b.csv": "id,city,price,day,note\n300,Kraków,4.0,2024-02-01,first\n4,Gdańsk,0.5,2024-13-45,second\n",
+    "c.csv": "id,city,code\n5,Gdańsk,001\n6,Gdańsk,abc\n",
+}
+
+
+@pytest.fixture
+def shards(tmp_path):
+    paths = []
+    for name, text in SHARDS.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def test_compact_dtypes(shards):
+    """Test downcast numbers, categories and dates of the unified schema."""
+    plan = infer_schema(shards, chunk_size=1, source_column="_source_file", compact=True)
+    dtypes = plan.dtypes(parse_dates=True)
+
+    assert dtypes["id"] == np.int16
+    assert dtypes["price"] == np.float32  # 1.5, 2.25, 4.0 and 0.5 are exact in float32
+    assert dtypes["ratio"] == np.float64  # 0.1 is not
+    assert dtypes["city"] == pd.CategoricalDtype(["Gdańsk", "Kraków"])
+    assert dtypes["_source_file"] == pd.CategoricalDtype([str(path) for path in shards])
+    assert dtypes["day"] == object  # 2024-13-45 is not a date
+    assert dtypes["note"] == object  # as many values as rows
+    assert dtypes["code"] == object
+
+
+def test_dates_are_parsed_only_on_request(shards):
+    """Test that dates are parsed for typed output only."""
+    shards[1].write_text("id,day\n7,2024-02-01\n")
+    plan = infer_schema(shards, compact=True)
+
+    assert plan.dtypes(parse_dates=True)["day"] == np.dtype("datetime64[ns]")
+    assert plan.dtypes()["day"] == object
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1000])
+def test_compact_output_is_unchanged(shards, tmp_path, chunk_size):
+    """Test that compact dtypes write exactly the same CSV text."""
+    combine_csv_stream(shards, tmp_path / "inferred.out", chunk_size=chunk_size)
+    combine_csv_stream(shards, tmp_path / "compact.out", chunk_size=chunk_size, compact=True)
+
+    assert (tmp_path / "compact.out").read_text() == (tmp_path / "inferred.out").read_text()
+
+
+def test_explicit_dtypes_reduce_memory(shards):
+    """Test that frames read with the planned dtypes are smaller than inferred ones."""
+    plan = infer_schema(shards, compact=True)
+    dtypes = plan.dtypes()
+
+    inferred = pd.concat([pd.read_csv(path) for path in shards], ignore_index=True)
+    compact = pd.concat(
+        [pd.read_csv(s.path, dtype=plan.read_dtypes(s)).reindex(columns=dtypes.index).astype(dtypes.to_dict())
+         for s in plan.files],
+        ignore_index=True,
+    )
+
+    assert compact["city"].dtype == "category"
+    assert compact.memory_usage(deep=True).sum() < inferred.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(compact.astype(inferred.dtypes.to_dict()), inferred, check_dtype=False)
+
+
+class TestSchemaCache:
+    """Test cases for the per-file scan cache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return SchemaCache(DiskCache(tmp_path / "schema_cache"))
+
+    def test_unchanged_files_are_not_rescanned(self, shards, cache):
+        """Test that a second inference reuses the cached scans."""
+        first = infer_schema(shards, cache=cache, compact=True)
+
+        with patch.object(csv_schema, "scan_file", side_effect=AssertionError("rescanned")):
+            second = infer_schema(shards, cache=cache, compact=True)
+
+        assert second.dtypes().equals(first.dtypes())
+        assert second.files[0].stats["price"] == first.files[0].stats["price"]
+
+    def test_modified_file_is_rescanned(self, shards, cache):
+        """Test that a new modification time invalidates the entry of that file only."""
+        infer_schema(shards, cache=cache)
+        shards[2].write_text("id,city\n5,Warszawa\n")
+        stat = shards[2].stat()
+        os.utime(shards[2], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        with patch.object(csv_schema, "scan_file", wraps=csv_schema.scan_file) as scan:
+            plan = infer_schema(shards, cache=cache)
+
+        assert [call.args[0] for call in scan.call_args_list] == [shards[2]]
+        assert "code" not in plan.dtypes()
@@ -0,0 +1,89 @@
+"""Tests for the out-of-core CSV sort."""
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.processors import csv_sort
+from dun.services.processors.csv_processor import CSVProcessor
+from dun.services.processors.csv_sort import sort_csv_stream
+
+
+@pytest.fixture
+def shards(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(4):
+        df = pd.DataFrame({
+            "ts": rng.integers(0, 40, size=500),
+            "value": rng.normal(size=500).round(3),
+            "name": rng.choice(["a", "b", "c", None], size=500),
+        })
+        if i == 1:
+            df = df.drop(columns="name")
+        path = tmp_path / f"shard{i}.csv"
+        df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def sort_in_memory(paths, by, ascending=True):
+    frames = [pd.read_csv(path).assign(_source_file=str(path)) for path in paths]
+    combined = pd.concat(frames, ignore_index=True)
+    return combined.sort_values(by, ascending=ascending, kind="stable", na_position="last").to_csv(index=False)
+
+
+@pytest.mark.parametrize("by,ascending", [(["ts"], True), (["name", "ts"], False), (["value"], True)])
+@pytest.mark.parametrize("chunk_size,fan_in", [(64, 4), (1000, 64)])
+def test_matches_sort_values(shards, tmp_path, by, ascending, chunk_size, fan_in):
+    """Test that the merged output equals a stable in-memory sort, including multi-pass merges."""
+    output = tmp_path / "sorted.csv"
+
+    result = sort_csv_stream(
+        shards, output, by, ascending, chunk_size=chunk_size, fan_in=fan_in, block_size=16,
+        compact=True, temp_dir=tmp_path,
+    )
+
+    assert output.read_text() == sort_in_memory(shards, by, ascending)
+    assert result.rows == 2000
+    assert not list(tmp_path.glob("sort_*"))
+
+
+def test_sorted_shards_are_merged_directly(shards, tmp_path):
+    """Test that shards sorted already are not spilled."""
+    for path in shards[:3]:
+        pd.read_csv(path).sort_values("ts", kind="stable").to_csv(path, index=False)
+    output = tmp_path / "sorted.csv"
+
+    with patch.object(csv_sort, "spill_file", wraps=csv_sort.spill_file) as spill:
+        with ThreadPoolExecutor(2) as executor:
+            sort_csv_stream(shards, output, ["ts"], chunk_size=100, executor=executor)
+
+    assert [call.args[0].path for call in spill.call_args_list] == [shards[3]]
+    assert output.read_text() == sort_in_memory(shards, ["ts"])
+
+
+def test_unknown_column(shards, tmp_path):
+    """Test that sorting by a missing column fails before writing anything."""
+    with pytest.raises(ValueError, match="missing"):
+        sort_csv_stream(shards, tmp_path / "sorted.csv", ["missing"])
+    assert not (tmp_path / "sorted.csv").exists()
+
+
+@pytest.mark.asyncio
+async def test_processor_sort_by(shards, tmp_path):
+    """Test that CSVProcessor spills runs to the file system service's temp dir."""
+    processor = CSVProcessor({"chunk_size": 100, "run_cache": False})
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    output = tmp_path / "out" / "combined.csv"
+
+    with patch.object(csv_sort.tempfile, "mkdtemp", wraps=csv_sort.tempfile.mkdtemp) as mkdtemp, \
+            patch("dun.services.filesystem.fs.get_temp_dir", return_value=spill_dir):
+        await processor.combine_csv_files(shards, output, sort_by=["ts"])
+
+    assert mkdtemp.call_args.kwargs["dir"] == spill_dir
+    assert output.read_text() == sort_in_memory(shards, ["ts"])
+    await processor.shutdown()
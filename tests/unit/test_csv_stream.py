@@ -0,0 +1,231 @@
+"""Tests for the streaming CSV combine."""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+
+from dun.core.engine.processor_engine import ProcessorEngine
+from dun.services.processors.csv_processor import CSVProcessingError, CSVProcessor
+from dun.services.processors.csv_stream import combine_csv_stream, concat_csv_bytes, scan_file
+
+SHARDS = {
+    "a.csv": "id,name,value\n1,test,100\n2,example,200\n",
+    "b.csv": "id,description,amount\n3,item one,10.5\n4,,20.75\n",
+    "c.csv": "id,value,flag\n5,,True\n6,7,False\n",
+    "d.csv": "id,name\n",
+    "e.csv": "id,code,empty\n7,001,\n8,abc,\n9,1.50,\n",
+}
+
+
+@pytest.fixture
+def shards(tmp_path):
+    paths = []
+    for name, text in SHARDS.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+def concat_in_memory(paths, output_file):
+    """The original combine: load everything, concat, write."""
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path)
+        df["_source_file"] = str(path)
+        frames.append(df)
+    pd.concat(frames, ignore_index=True).to_csv(output_file, index=False)
+
+
+class TestCombineCsvStream:
+    """Test cases for combine_csv_stream."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+    def test_output_matches_in_memory_concat(self, shards, tmp_path, chunk_size):
+        """Test that rows, columns, dtypes and _source_file match pd.concat exactly."""
+        expected = tmp_path / "expected.csv"
+        concat_in_memory(shards, expected)
+
+        result = combine_csv_stream(shards, tmp_path / "combined.csv", chunk_size=chunk_size)
+
+        assert (tmp_path / "combined.csv").read_text() == expected.read_text()
+        assert result.rows == 9
+        assert result.columns == list(pd.read_csv(expected).columns)
+        assert len(result.sample) == 2
+
+    def test_scan_matches_whole_file_dtypes(self, shards):
+        """Test that the chunked scan infers the dtypes of a full read."""
+        schema = scan_file(shards[4], chunk_size=1)
+
+        assert schema.dtypes == dict(pd.read_csv(shards[4]).dtypes)
+        assert schema.all_na == {"id": False, "code": False, "empty": True}
+        assert schema.rows == 3
+
+    def test_unreadable_files_are_reported(self, shards, tmp_path):
+        """Test that bad files are skipped and reported like in the in-memory path."""
+        broken = tmp_path / "broken.csv"
+        broken.write_bytes(b"")
+
+        result = combine_csv_stream([broken, shards[0]], tmp_path / "combined.csv")
+
+        assert list(result.failed) == [str(broken)]
+        assert result.files == [shards[0]]
+
+    def test_no_readable_files(self, tmp_path):
+        """Test that nothing is written when no input can be read."""
+        broken = tmp_path / "broken.csv"
+        broken.write_bytes(b"")
+
+        with pytest.raises(ValueError):
+            combine_csv_stream([broken], tmp_path / "combined.csv")
+        assert not list(tmp_path.glob("*combined.csv*"))
+
+
+@pytest.mark.asyncio
+async def test_processor_streaming_matches_in_memory(shards, tmp_path):
+    """Test that both CSVProcessor modes write the same file."""
+    streaming = CSVProcessor({"chunk_size": 1})
+    in_memory = CSVProcessor({"streaming": False})
+
+    await streaming.combine_csv_files(shards, tmp_path / "streamed.csv")
+    await in_memory.combine_csv_files(shards, tmp_path / "loaded.csv")
+
+    assert (tmp_path / "streamed.csv").read_text() == (tmp_path / "loaded.csv").read_text()
+
+
+class TestConcatCsvBytes:
+    """Test cases for the byte-level fast path."""
+
+    @pytest.fixture
+    def daily(self, tmp_path):
+        bodies = ["1,a\n2,b\n", "", "3,c", "4,\"d,e\"\n"]
+        paths = []
+        for i, body in enumerate(bodies):
+            path = tmp_path / f"day{i}.csv"
+            path.write_bytes(b"id,name\n" + body.encode())
+            paths.append(path)
+        return paths
+
+    def test_bodies_are_copied_after_one_header(self, daily, tmp_path):
+        """Test that the output is the header plus every body, newline-terminated."""
+        output = tmp_path / "combined.csv"
+
+        written = concat_csv_bytes(daily, output)
+
+        assert output.read_bytes() == b'id,name\n1,a\n2,b\n3,c\n4,"d,e"\n'
+        assert written == output.stat().st_size
+
+    def test_matches_parsed_combine(self, daily, tmp_path):
+        """Test that the fast path holds the same data as the parsing path."""
+        concat_csv_bytes(daily, tmp_path / "bytes.csv")
+        combine_csv_stream(daily, tmp_path / "parsed.csv", source_column=None)
+
+        pd.testing.assert_frame_equal(
+            pd.read_csv(tmp_path / "bytes.csv"), pd.read_csv(tmp_path / "parsed.csv")
+        )
+
+    @pytest.mark.parametrize("header", [b"id,label\n", b"id,name\r\n", b"id;name\n", b""])
+    def test_different_headers_fall_back(self, daily, tmp_path, header):
+        """Test that nothing is written unless all header lines are identical."""
+        daily[1].write_bytes(header)
+        output = tmp_path / "combined.csv"
+
+        assert concat_csv_bytes(daily, output) is None
+        assert not output.exists()
+
+    def test_copy_without_kernel_support(self, daily, tmp_path, monkeypatch):
+        """Test the plain read/write copy used when the kernel copies are unavailable."""
+        monkeypatch.delattr(os, "copy_file_range", raising=False)
+        monkeypatch.delattr(os, "sendfile", raising=False)
+
+        concat_csv_bytes(daily, tmp_path / "combined.csv")
+
+        assert (tmp_path / "combined.csv").read_bytes() == b'id,name\n1,a\n2,b\n3,c\n4,"d,e"\n'
+
+
+@pytest.mark.asyncio
+async def test_processor_uses_fast_path_without_source_column(shards, tmp_path, monkeypatch):
+    """Test that identical headers are concatenated without parsing and others are parsed."""
+    monkeypatch.setattr(sys.modules[CSVProcessor.__module__], "combine_csv_stream", Mock(side_effect=AssertionError))
+    processor = CSVProcessor({"add_source_column": False})
+    day1 = tmp_path / "day1.csv"
+    day2 = tmp_path / "day2.csv"
+    day1.write_text("id,name\n1,a\n")
+    day2.write_text("id,name\n2,b\n")
+
+    output = await processor.combine_csv_files([day1, day2], tmp_path / "days.csv")
+    assert output.read_text() == "id,name\n1,a\n2,b\n"
+
+    with pytest.raises(CSVProcessingError):
+        await processor.combine_csv_files(shards, tmp_path / "mixed.csv")
+
+
+class TestParallelReads:
+    """Test cases for parallel parsing of the inputs."""
+
+    @pytest.mark.parametrize("streaming", [True, False])
+    @pytest.mark.asyncio
+    async def test_output_keeps_file_order(self, shards, tmp_path, monkeypatch, streaming):
+        """Test that files finishing out of order are still combined in the given order."""
+        read_csv = pd.read_csv
+        delays = {str(path): 0.05 * (len(shards) - i) for i, path in enumerate(shards)}
+
+        def slow_read_csv(path, *args, **kwargs):
+            time.sleep(delays.get(str(path), 0))
+            return read_csv(path, *args, **kwargs)
+
+        monkeypatch.setattr(pd, "read_csv", slow_read_csv)
+        processor = CSVProcessor({"streaming": streaming, "read_workers": len(shards)})
+        serial = CSVProcessor({"streaming": streaming, "read_executor": "serial"})
+
+        await processor.combine_csv_files(shards, tmp_path / "parallel.csv")
+        await serial.combine_csv_files(shards, tmp_path / "serial.csv")
+        await processor.shutdown()
+
+        assert (tmp_path / "parallel.csv").read_text() == (tmp_path / "serial.csv").read_text()
+
+    def test_process_executor_matches_serial(self, shards, tmp_path):
+        """Test the process pool used for very wide files."""
+        broken = tmp_path / "broken.csv"
+        broken.write_bytes(b"")
+
+        with ProcessPoolExecutor(2) as executor:
+            result = combine_csv_stream([*shards, broken], tmp_path / "parallel.csv", chunk_size=1, executor=executor)
+        combine_csv_stream(shards, tmp_path / "serial.csv", chunk_size=1)
+
+        assert (tmp_path / "parallel.csv").read_text() == (tmp_path / "serial.csv").read_text()
+        assert list(result.failed) == [str(broken)]
+        assert result.rows == 9
+        assert not list(tmp_path.glob(".*.part"))
+
+    @pytest.mark.asyncio
+    async def test_event_loop_is_not_blocked(self, shards, tmp_path, monkeypatch):
+        """Test that the engine's event loop keeps running while files are parsed."""
+        read_csv = pd.read_csv
+
+        def slow_read_csv(*args, **kwargs):
+            time.sleep(0.05)
+            return read_csv(*args, **kwargs)
+
+        monkeypatch.setattr(pd, "read_csv", slow_read_csv)
+        engine = ProcessorEngine()
+        engine.register_processor("csv", CSVProcessor)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        result = await engine.process("csv", file_paths=shards, output_file=tmp_path / "combined.csv")
+        task.cancel()
+
+        assert result.success
+        assert ticks >= 5
@@ -0,0 +1,98 @@
+"""Tests for the streaming CSV summary."""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.processors.csv_processor import CSVProcessor
+from dun.services.processors.csv_summary import HyperLogLog, QuantileSketch, summarize_csv
+
+SHARDS = {
+    "a.csv": "id,name,value\n1,test,100\n2,example,200\n3,test,\n",
+    "b.csv": "id,value,flag\n4,7.5,True\n5,-3,False\n",
+    "c.csv": "id,name\n6,zeta\n",
+}
+
+
+@pytest.fixture
+def shards(tmp_path):
+    paths = []
+    for name, text in SHARDS.items():
+        path = tmp_path / name
+        path.write_text(text, encoding="utf-8")
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1000])
+def test_matches_pandas(shards, chunk_size):
+    """Test that exact statistics match pandas on the concatenated files."""
+    combined = pd.concat([pd.read_csv(path) for path in shards], ignore_index=True)
+
+    summary = summarize_csv(shards, chunk_size=chunk_size).to_dict()
+
+    assert summary["rows"] == len(combined)
+    assert list(summary["columns"]) == list(combined.columns)
+    value = summary["columns"]["value"]
+    assert value["count"] == combined["value"].count()
+    assert value["nulls"] == combined["value"].isna().sum()
+    assert value["min"] == combined["value"].min()
+    assert value["max"] == combined["value"].max()
+    assert value["mean"] == pytest.approx(combined["value"].mean())
+    assert value["variance"] == pytest.approx(combined["value"].var())
+    expected = np.quantile(combined["value"].dropna(), [0.25, 0.5, 0.75], method="inverted_cdf")
+    assert list(value["quantiles"].values()) == list(expected)
+    assert summary["columns"]["id"]["min"] == 1 and isinstance(summary["columns"]["id"]["max"], int)
+    name = summary["columns"]["name"]
+    assert name == {"type": "text", "count": 4, "nulls": 2, "distinct": 3, "min": "example", "max": "zeta"}
+
+
+def test_parallel_matches_serial(shards):
+    """Test that merging per-file summaries gives the same result."""
+    with ThreadPoolExecutor(2) as executor:
+        parallel = summarize_csv(shards, executor=executor).to_dict()
+
+    assert parallel == summarize_csv(shards).to_dict()
+
+
+def test_unreadable_file_is_reported(shards, tmp_path):
+    """Test that missing files are skipped and reported."""
+    summary = summarize_csv([*shards, tmp_path / "missing.csv"])
+
+    assert summary.rows == 6
+    assert str(tmp_path / "missing.csv") in summary.failed
+    with pytest.raises(ValueError):
+        summarize_csv([tmp_path / "missing.csv"])
+
+
+def test_sketches_are_accurate():
+    """Test that the distinct count and quantiles stay close on larger inputs."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(size=300_000)
+    hll = HyperLogLog()
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 7):
+        rounded = np.round(chunk, 2)
+        hll.update_hashes(pd.util.hash_array(rounded))
+        sketch.update(chunk)
+
+    assert hll.estimate() == pytest.approx(len(np.unique(np.round(values, 2))), rel=0.05)
+    ordered = np.sort(values)
+    for q, estimate in zip([0.1, 0.5, 0.9], sketch.quantiles([0.1, 0.5, 0.9])):
+        assert abs(np.searchsorted(ordered, estimate) / len(values) - q) < 0.02
+    assert sum(len(level) for level in sketch.levels) < 1000
+
+
+@pytest.mark.asyncio
+async def test_summary_request(shards, tmp_path):
+    """Test that a summary request returns statistics and writes no output."""
+    processor = CSVProcessor({"input_dir": tmp_path, "output_dir": tmp_path / "output"})
+
+    result = await processor.process_csv_request("Pokaż podsumowanie danych z plików CSV")
+
+    assert result["status"] == "success"
+    assert result["summary"]["rows"] == 6
+    assert result["summary"]["columns"]["flag"]["nulls"] == 4
+    assert not (tmp_path / "output").exists()
+    await processor.shutdown()
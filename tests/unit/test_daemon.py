@@ -0,0 +1,171 @@
+"""Tests for the `dun serve` daemon and its client."""
+import asyncio
+import os
+import socket
+from unittest.mock import MagicMock, patch
+
+import pytest
+import pytest_asyncio
+from loguru import logger
+
+from dun.daemon import DunServer, default_socket_path, run_request, send_request
+
+
+class FakeEngine:
+    """Engine stub that logs while processing."""
+
+    def __init__(self):
+        self.calls = []
+        self.close = MagicMock()
+
+    def prepare_processor(self, request, use_cache=None):
+        self.calls.append((request, use_cache))
+        logger.info(f"analyzing {request}")
+        if request == "fail":
+            raise ValueError("broken request")
+        return request
+
+    def execute_processor(self, config, output_dir=None, environ=None):
+        return {
+            "status": "success",
+            "request": config,
+            "output_dir": str(output_dir) if output_dir else None,
+            "imap_server": (environ or {}).get("IMAP_SERVER"),
+        }
+
+
+@pytest_asyncio.fixture
+async def server(tmp_path):
+    server = DunServer(tmp_path / "dun.sock", engine=FakeEngine())
+    await server.start()
+    yield server
+    await server.stop()
+
+
+async def request(server, payload, logs=None):
+    loop = asyncio.get_running_loop()
+    on_log = logs.append if logs is not None else None
+    return await loop.run_in_executor(
+        None, lambda: send_request(payload, server.socket_path, on_log=on_log)
+    )
+
+
+class TestDunServer:
+    """Test cases for DunServer and send_request."""
+
+    @pytest.mark.asyncio
+    async def test_run_streams_logs_and_result(self, server):
+        """Test that a run request returns the result after streamed logs."""
+        logs = []
+        reply = await request(
+            server, {"command": "run", "request": "Połącz pliki CSV", "use_cache": False}, logs
+        )
+
+        assert reply == {
+            "type": "result",
+            "status": "success",
+            "result": {
+                "status": "success",
+                "request": "Połącz pliki CSV",
+                "output_dir": None,
+                "imap_server": None,
+            },
+        }
+        assert [m["message"] for m in logs] == ["analyzing Połącz pliki CSV"]
+        assert server.engine.calls == [("Połącz pliki CSV", False)]
+
+    @pytest.mark.asyncio
+    async def test_client_context_is_applied(self, server, tmp_path):
+        """Test that the output dir and processor env come from the request."""
+        reply = await request(server, {
+            "command": "run",
+            "request": "x",
+            "cwd": os.getcwd(),
+            "env": {"OUTPUT_DIR": str(tmp_path / "out"), "IMAP_SERVER": "imap.example.com"},
+        })
+
+        assert reply["result"]["output_dir"] == str(tmp_path / "out")
+        assert reply["result"]["imap_server"] == "imap.example.com"
+
+    @pytest.mark.asyncio
+    async def test_other_cwd_is_unsupported(self, server, tmp_path):
+        """Test that requests from another directory are sent back to the client."""
+        reply = await request(server, {"command": "run", "request": "x", "cwd": str(tmp_path)})
+
+        assert reply["type"] == "unsupported"
+        assert server.engine.calls == []
+
+    @pytest.mark.asyncio
+    async def test_errors_are_reported(self, server):
+        """Test that processing errors are sent back to the client."""
+        reply = await request(server, {"command": "run", "request": "fail"})
+
+        assert reply == {"type": "error", "message": "broken request"}
+
+    @pytest.mark.asyncio
+    async def test_second_daemon_refuses_to_start(self, server):
+        """Test that a live socket is not taken over by another daemon."""
+        with pytest.raises(RuntimeError, match="już działa"):
+            await DunServer(server.socket_path, engine=FakeEngine()).start()
+
+    @pytest.mark.asyncio
+    async def test_stale_socket_is_replaced(self, tmp_path):
+        """Test that a leftover socket file from a dead daemon is removed."""
+        path = tmp_path / "dun.sock"
+        path.touch()
+        server = DunServer(path, engine=FakeEngine())
+        await server.start()
+        try:
+            reply = await request(server, {"command": "ping"})
+        finally:
+            await server.stop()
+
+        assert reply["status"] == "ok"
+        assert not path.exists()
+        server.engine.close.assert_called_once()
+
+
+class TestClient:
+    """Test cases for the client side."""
+
+    def test_no_daemon_returns_none(self, tmp_path):
+        """Test that the client reports a missing daemon with None."""
+        assert send_request({"command": "ping"}, tmp_path / "missing.sock") is None
+
+    def test_default_socket_path(self, tmp_path, monkeypatch):
+        """Test socket path resolution from settings."""
+        from dun.config.settings import settings
+
+        monkeypatch.setattr(settings, "DUN_SOCKET", None)
+        monkeypatch.setattr(settings, "CACHE_DIR", tmp_path)
+        assert default_socket_path() == tmp_path.resolve() / "dun.sock"
+
+        monkeypatch.setattr(settings, "CACHE_DIR", tmp_path / ("x" * 120))
+        assert len(str(default_socket_path())) <= 100
+
+        monkeypatch.setattr(settings, "DUN_SOCKET", "/run/dun.sock")
+        assert str(default_socket_path()) == "/run/dun.sock"
+
+    def test_stuck_daemon_times_out(self, tmp_path):
+        """Test that a daemon that never answers does not block the client."""
+        path = tmp_path / "dun.sock"
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(str(path))
+        listener.listen(1)
+        try:
+            with pytest.raises(TimeoutError):
+                send_request({"command": "ping"}, path, timeout=0.2)
+        finally:
+            listener.close()
+
+    def test_run_request_forwards_context(self, tmp_path, monkeypatch):
+        """Test that the client's cwd and processor environment are sent."""
+        monkeypatch.setenv("IMAP_SERVER", "imap.example.com")
+        monkeypatch.setenv("SECRET_TOKEN", "x")
+        with patch("dun.daemon.send_request") as mock_send:
+            run_request("Połącz pliki CSV", use_cache=False)
+
+        payload = mock_send.call_args[0][0]
+        assert payload["cwd"] == os.getcwd()
+        assert payload["env"]["IMAP_SERVER"] == "imap.example.com"
+        assert "SECRET_TOKEN" not in payload["env"]
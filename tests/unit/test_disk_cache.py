@@ -0,0 +1,132 @@
+"""Tests for the persistent disk cache."""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dun.services.cache import DiskCache, SemanticCache, make_key
+
+
+class TestDiskCache:
+    """Test cases for DiskCache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return DiskCache(tmp_path / "cache", ttl=60, max_entries=2)
+
+    def test_set_and_get(self, cache):
+        """Test storing and reading back a value."""
+        cache.set("key", {"a": 1})
+
+        assert cache.get("key") == {"a": 1}
+        assert "key" in cache
+        assert cache.get("missing") is None
+
+    def test_expired_entry_is_dropped(self, cache):
+        """Test that entries older than the TTL are treated as misses."""
+        cache.set("key", "value")
+        cache.ttl = 0
+        time.sleep(0.01)
+
+        assert cache.get("key") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self, cache):
+        """Test that the least recently used entry is evicted first."""
+        cache.set("a", 1)
+        cache.set("b", 2)
+        old = time.time() - 100
+        os.utime(cache.directory / "a.json", (old, old))
+        os.utime(cache.directory / "b.json", (old - 10, old - 10))
+        cache.get("b")  # refreshes "b"
+
+        cache.set("c", 3)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == 2
+        assert cache.get("c") == 3
+
+    def test_make_key_is_stable(self):
+        """Test that keys do not depend on dict ordering."""
+        assert make_key({"x": 1, "y": 2}) == make_key({"y": 2, "x": 1})
+        assert make_key("a", "b") != make_key("b", "a")
+
+
+class TestSemanticCache:
+    """Test cases for SemanticCache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return SemanticCache(tmp_path / "semantic", threshold=0.9, max_entries=3)
+
+    def test_lookup_similar_embedding(self, cache):
+        """Test that a close embedding reuses the stored value."""
+        cache.add([1.0, 0.0, 0.0], {"name": "csv"})
+        cache.add([0.0, 1.0, 0.0], {"name": "imap"})
+
+        value, similarity = cache.lookup([0.95, 0.1, 0.0])
+
+        assert value == {"name": "csv"}
+        assert similarity > 0.9
+        assert cache.lookup([0.0, 0.0, 1.0]) is None
+
+    def test_expired_entries_are_ignored(self, tmp_path, monkeypatch):
+        """Test that entries older than the TTL are not returned."""
+        cache = SemanticCache(tmp_path / "semantic", threshold=0.9, ttl=60)
+        cache.add([1.0, 0.0], "old")
+
+        assert cache.lookup([1.0, 0.0])[0] == "old"
+        now = time.time()
+        monkeypatch.setattr(time, "time", lambda: now + 120)
+        assert cache.lookup([1.0, 0.0]) is None
+
+    def test_tags_must_match(self, cache):
+        """Test that entries are only matched within the same tag."""
+        cache.add([1.0, 0.0, 0.0], "data", tag="data/")
+
+        assert cache.lookup([1.0, 0.0, 0.0], tag="data/")[0] == "data"
+        assert cache.lookup([1.0, 0.0, 0.0], tag="archive/") is None
+        assert cache.lookup([1.0, 0.0, 0.0]) is None
+
+    def test_concurrent_adds_keep_values_aligned(self, tmp_path):
+        """Test that concurrent writers never mix up embeddings and values."""
+        cache = SemanticCache(tmp_path / "semantic", threshold=0.999, max_entries=64, initial_capacity=2)
+        barrier = threading.Barrier(8)
+
+        def add(i):
+            if i < 8:
+                barrier.wait()
+            vector = [0.0] * 64
+            vector[i] = 1.0
+            cache.add(vector, i)
+
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(add, range(64)))
+
+        for i in range(64):
+            vector = [0.0] * 64
+            vector[i] = 1.0
+            assert cache.lookup(vector) == (i, pytest.approx(1.0))
+        assert len(SemanticCache(cache.directory)) == 64
+
+    def test_entries_persist_across_instances(self, cache):
+        """Test that the memory-mapped matrix is reloaded from disk."""
+        cache.add([1.0, 2.0], "value")
+
+        reopened = SemanticCache(cache.directory, threshold=0.9)
+
+        assert len(reopened) == 1
+        assert reopened.lookup([2.0, 4.0])[0] == "value"
+
+    def test_oldest_entry_is_overwritten_when_full(self, cache):
+        """Test that the cache never grows beyond max_entries."""
+        for i in range(4):
+            vector = [0.0] * 4
+            vector[i] = 1.0
+            cache.add(vector, i)
+
+        assert len(cache) == 3
+        assert cache.lookup([1.0, 0.0, 0.0, 0.0]) is None
+        assert cache.lookup([0.0, 0.0, 0.0, 1.0])[0] == 3
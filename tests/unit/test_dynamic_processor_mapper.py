@@ -0,0 +1,113 @@
+"""Tests for DynamicProcessorMapper library detection."""
+import json
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from dun.dynamic_processor_mapper import (
+    DynamicProcessorMapper,
+    LibraryIndex,
+    load_library_keywords,
+)
+from dun.services.cache import DiskCache
+
+
+class TestDetectLibrary:
+    """Test cases for the keyword matcher."""
+
+    @pytest.mark.parametrize("request_text, library", [
+        ("Pobierz wszystkie wiadomości email ze skrzynki IMAP i zapisz pliki", "imaplib"),
+        ("Przetwórz wiadomosci ze skrzynki pocztowej", "imaplib"),
+        ("Połącz wszystkie pliki CSV w jeden", "pandas"),
+        ("Wyślij zapytanie do bazy SQLite", "sqlite3"),
+        ("Pobierz dane z API przez HTTP", "requests"),
+    ])
+    def test_best_library(self, request_text, library):
+        """Test that the strongest match wins, not the first listed library."""
+        assert DynamicProcessorMapper().detect_library(request_text) == library
+
+    def test_no_match(self):
+        """Test that unrelated requests are not mapped."""
+        assert DynamicProcessorMapper().detect_library("zrób coś ciekawego") is None
+
+    def test_ranked_candidates_with_confidence(self):
+        """Test that all matching libraries are ranked with confidences."""
+        ranked = DynamicProcessorMapper().rank_libraries("Zapisz wiadomości email do pliku CSV")
+
+        assert [m.library for m in ranked] == ["pandas", "imaplib"]
+        assert sum(m.confidence for m in ranked) == pytest.approx(1.0)
+        assert ranked[0].keywords == ("plik", "csv")
+
+    def test_keywords_match_at_word_start_only(self):
+        """Test that stems do not match inside other words."""
+        mapper = DynamicProcessorMapper({"imaplib": {"mail": 1.0}})
+
+        assert mapper.detect_library("gmail") is None
+        assert mapper.detect_library("mailbox") == "imaplib"
+
+    def test_keywords_loaded_from_file(self, tmp_path):
+        """Test that a custom keyword file (list or weighted form) is loaded."""
+        path = tmp_path / "keywords.json"
+        path.write_text(json.dumps({"openpyxl": ["arkusz"], "lxml": {"xml": 2}}), encoding="utf-8")
+
+        keywords = load_library_keywords(path)
+        mapper = DynamicProcessorMapper(keywords)
+
+        assert keywords == {"openpyxl": {"arkusz": 1.0}, "lxml": {"xml": 2}}
+        assert mapper.detect_library("Otwórz arkusze") == "openpyxl"
+
+
+@pytest.fixture
+def local_package(tmp_path, monkeypatch):
+    """A small importable package whose import would fail loudly."""
+    package = tmp_path / "src" / "sample_pkg"
+    package.mkdir(parents=True)
+    (package / "__init__.py").write_text(
+        "raise RuntimeError('imported')\n"
+        "from .core import *\n"
+        "from .io import read_data as load\n"
+        "class Table: pass\n"
+        "def _private(): pass\n",
+        encoding="utf-8",
+    )
+    (package / "core.py").write_text("__all__ = ['merge', 'Frame']\n", encoding="utf-8")
+    (package / "io.py").write_text("def read_data(): pass\n", encoding="utf-8")
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+    yield package
+    sys.modules.pop("sample_pkg", None)
+
+
+class TestLibraryIndex:
+    """Test cases for the introspection index."""
+
+    def test_static_scan_does_not_import(self, local_package, tmp_path):
+        """Test that Python packages are indexed from their source."""
+        index = LibraryIndex(DiskCache(tmp_path / "index"))
+
+        assert index.functions("sample_pkg") == ["Frame", "Table", "load", "merge"]
+        assert "sample_pkg" not in sys.modules
+
+    def test_index_is_persisted(self, local_package, tmp_path):
+        """Test that another process reuses the stored entry."""
+        LibraryIndex(DiskCache(tmp_path / "index")).functions("sample_pkg")
+
+        index = LibraryIndex(DiskCache(tmp_path / "index"))
+        with patch.object(LibraryIndex, "_scan") as mock_scan:
+            assert index.functions("sample_pkg") == ["Frame", "Table", "load", "merge"]
+        mock_scan.assert_not_called()
+
+    def test_missing_library(self, tmp_path):
+        """Test that unknown libraries produce no names."""
+        assert LibraryIndex(DiskCache(tmp_path / "index")).functions("surely_missing_lib") == []
+
+    def test_stub_and_debug_info_scan_once(self, local_package, tmp_path):
+        """Test that one mapper introspects a library only once."""
+        mapper = DynamicProcessorMapper(
+            {"sample_pkg": {"sample": 1.0}}, index=LibraryIndex(DiskCache(tmp_path / "index"))
+        )
+        with patch.object(LibraryIndex, "_scan", return_value=["merge"]) as mock_scan:
+            mapper.generate_debug_info("sample request")
+            mapper.generate_python_code_stub("sample request")
+
+        mock_scan.assert_called_once()
@@ -0,0 +1,103 @@
+"""Tests for the columnar cache of parsed CSV files."""
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.cache import FrameCache
+from dun.services.processors.csv_processor import CSVProcessor
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "id": np.arange(500),
+        "price": rng.normal(size=500).round(3),
+        "region": rng.choice(["north", "south", None], size=500),
+        "note": [f"note {i}" if i % 7 else None for i in range(500)],
+        "flag": rng.random(500) > 0.5,
+    })
+    path = tmp_path / "data.csv"
+    df.to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FrameCache(tmp_path / "frames", arrow=False)
+
+
+@pytest.mark.parametrize("dtype", [None, {"region": "category", "id": "int16"}])
+def test_round_trip(csv_file, cache, dtype):
+    """Test that a cached frame equals the parsed one, including dtypes and missing values."""
+    read_kwargs = {"delimiter": ",", "dtype": dtype}
+    parsed = pd.read_csv(csv_file, **read_kwargs)
+    key = cache.key(csv_file, read_kwargs)
+
+    assert cache.get(key) is None
+    assert cache.set(key, parsed)
+    pd.testing.assert_frame_equal(cache.get(key), parsed)
+
+
+def test_key_follows_file_and_options(csv_file, cache):
+    """Test that a changed file or different read options miss the cache."""
+    key = cache.key(csv_file, {"dtype": None})
+    categories = {"dtype": {"region": pd.CategoricalDtype(["north", "south"])}}
+
+    assert cache.key(csv_file, {"dtype": None}) == key
+    assert cache.key(csv_file, categories) != cache.key(csv_file, {"dtype": {"region": pd.CategoricalDtype(["north"])}})
+    stat = csv_file.stat()
+    os.utime(csv_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert cache.key(csv_file, {"dtype": None}) != key
+
+
+def test_unsupported_columns_are_not_cached(cache):
+    """Test that frames with mixed object columns are left to the parser."""
+    frame = pd.DataFrame({"mixed": ["a", 1, None]})
+
+    assert not cache.set("mixed", frame)
+    assert len(cache) == 0
+
+
+def test_size_cap_evicts_least_recently_used(csv_file, tmp_path):
+    """Test that the total size stays within the cap, dropping the oldest entries first."""
+    frame = pd.read_csv(csv_file)
+    cache = FrameCache(tmp_path / "frames", arrow=False)
+    cache.set("a", frame)
+    entry_size = sum(file.stat().st_size for file in (tmp_path / "frames" / "a").iterdir())
+    cache.max_bytes = int(entry_size * 2.5)
+    cache.set("b", frame)
+    os.utime(tmp_path / "frames" / "a" / "meta.json", (1, 1))
+    os.utime(tmp_path / "frames" / "b" / "meta.json", (2, 2))
+    cache.get("a")  # now the most recently used
+
+    cache.set("c", frame)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_corrupt_entry_is_dropped(csv_file, cache):
+    """Test that an unreadable entry is removed and reported as a miss."""
+    cache.set("key", pd.read_csv(csv_file))
+    (cache.directory / "key" / "0.npy").write_bytes(b"garbage")
+
+    assert cache.get("key") is None
+    assert not (cache.directory / "key").exists()
+
+
+@pytest.mark.asyncio
+async def test_processor_reads_unchanged_file_once(csv_file):
+    """Test that CSVProcessor.read_csv parses a file once and then reuses its columnar copy."""
+    processor = CSVProcessor({"read_executor": "serial"})
+
+    with patch("pandas.read_csv", wraps=pd.read_csv) as read_csv:
+        first = await processor.read_csv(csv_file)
+        second = await processor.read_csv(csv_file)
+
+    assert read_csv.call_count == 1
+    pd.testing.assert_frame_equal(first, second)
+    await processor.shutdown()
@@ -1,11 +1,15 @@
 """Tests for LLMAnalyzer class."""
 import json
-from unittest.mock import MagicMock, patch
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import requests
 
 from dun.llm_analyzer import LLMAnalyzer, ProcessorConfig
+from dun.services.cache import DiskCache, SemanticCache
 
 
 class TestLLMAnalyzer:
@@ -92,3 +96,145 @@ class TestLLMAnalyzer:
         assert config.name == "csv_processor"
         assert "pandas" in config.dependencies
         assert "csv" in config.code_template.lower()
+
+
+class TestLLMAnalyzerCache:
+    """Test cases for the persistent analysis cache."""
+
+    LLM_RESPONSE = {
+        "response": json.dumps({
+            "name": "cached_processor",
+            "description": "Cached processor",
+            "dependencies": [],
+            "parameters": {},
+            "code_template": "result = {'status': 'cached'}"
+        })
+    }
+
+    @pytest.fixture
+    def analyzer(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("OLLAMA_ENABLED", "true")
+        with patch('requests.get'):
+            return LLMAnalyzer(cache=DiskCache(tmp_path / "llm_analysis"))
+
+    @patch('requests.post')
+    def test_repeated_request_hits_cache(self, mock_post, analyzer):
+        """Test that an identical request is served without a second LLM call."""
+        mock_post.return_value.json.return_value = self.LLM_RESPONSE
+
+        first = analyzer.analyze_request("Połącz pliki CSV")
+        second = analyzer.analyze_request("  Połącz   pliki CSV ")
+
+        assert mock_post.call_count == 1
+        assert second == first
+        assert second.name == "cached_processor"
+
+    @patch('requests.post')
+    def test_bypass_flag_skips_cache(self, mock_post, analyzer):
+        """Test that use_cache=False always calls the LLM."""
+        mock_post.return_value.json.return_value = self.LLM_RESPONSE
+
+        analyzer.analyze_request("Połącz pliki CSV")
+        analyzer.analyze_request("Połącz pliki CSV", use_cache=False)
+
+        assert mock_post.call_count == 2
+
+    def test_cache_key_depends_on_model(self, analyzer):
+        """Test that different models do not share cache entries."""
+        key = analyzer.cache_key("Połącz pliki CSV")
+        analyzer.model = "llama2"
+
+        assert analyzer.cache_key("Połącz pliki CSV") != key
+
+    @patch('requests.post')
+    def test_similar_request_hits_semantic_cache(self, mock_post, tmp_path, monkeypatch):
+        """Test that a paraphrased request reuses the stored configuration."""
+        monkeypatch.setenv("OLLAMA_ENABLED", "true")
+        mock_post.return_value.json.return_value = self.LLM_RESPONSE
+        embeddings = {
+            "Połącz pliki CSV z data/": [1.0, 0.0, 0.1],
+            "Przeanalizuj wszystkie pliki CSV w folderze data/": [0.98, 0.05, 0.1],
+        }
+        embedding_service = MagicMock()
+        embedding_service.embeddings = AsyncMock(side_effect=lambda text, model: embeddings[text])
+        with patch('requests.get'):
+            analyzer = LLMAnalyzer(
+                cache=DiskCache(tmp_path / "llm_analysis"),
+                semantic_cache=SemanticCache(tmp_path / "semantic", threshold=0.95),
+                embedding_service=embedding_service,
+            )
+
+        first = analyzer.analyze_request("Połącz pliki CSV z data/")
+        second = analyzer.analyze_request("Przeanalizuj wszystkie pliki CSV w folderze data/")
+
+        assert mock_post.call_count == 1
+        assert second == first
+
+    @patch('requests.post')
+    def test_concurrent_identical_requests_are_coalesced(self, mock_post, tmp_path, monkeypatch):
+        """Test that concurrent identical requests wait for one LLM call."""
+        monkeypatch.setenv("OLLAMA_ENABLED", "true")
+        release = threading.Event()
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return MagicMock(**{"json.return_value": self.LLM_RESPONSE})
+
+        mock_post.side_effect = slow_post
+        with patch('requests.get'):
+            analyzer = LLMAnalyzer(cache=DiskCache(tmp_path / "llm_analysis"), use_cache=False)
+
+        with ThreadPoolExecutor(4) as pool:
+            futures = [pool.submit(analyzer.analyze_request, "Połącz pliki CSV") for _ in range(4)]
+            while analyzer.coalescing_stats["coalesced"] < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [f.result() for f in futures]
+
+        assert mock_post.call_count == 1
+        assert all(r == results[0] for r in results)
+        assert analyzer.coalescing_stats == {"calls": 4, "executions": 1, "coalesced": 3}
+
+    @patch('requests.post')
+    def test_cache_bypass_is_not_coalesced_with_cached_call(self, mock_post, tmp_path, monkeypatch):
+        """Test that a use_cache=False call never shares an in-flight cached call."""
+        monkeypatch.setenv("OLLAMA_ENABLED", "true")
+        release = threading.Event()
+
+        def slow_post(*args, **kwargs):
+            release.wait(5)
+            return MagicMock(**{"json.return_value": self.LLM_RESPONSE})
+
+        mock_post.side_effect = slow_post
+        with patch('requests.get'):
+            analyzer = LLMAnalyzer(cache=DiskCache(tmp_path / "llm_analysis"))
+
+        with ThreadPoolExecutor(2) as pool:
+            cached = pool.submit(analyzer.analyze_request, "Połącz pliki CSV")
+            fresh = pool.submit(analyzer.analyze_request, "Połącz pliki CSV", False)
+            while analyzer.coalescing_stats["executions"] < 2:
+                time.sleep(0.01)
+            release.set()
+            cached.result(), fresh.result()
+
+        assert mock_post.call_count == 2
+        assert analyzer.coalescing_stats["coalesced"] == 0
+
+    @patch('requests.post')
+    def test_similar_request_with_other_path_misses_semantic_cache(self, mock_post, tmp_path, monkeypatch):
+        """Test that a paraphrase naming another folder is analyzed again."""
+        monkeypatch.setenv("OLLAMA_ENABLED", "true")
+        mock_post.return_value.json.return_value = self.LLM_RESPONSE
+        embedding_service = MagicMock()
+        embedding_service.embeddings = AsyncMock(return_value=[1.0, 0.0, 0.1])
+        with patch('requests.get'):
+            analyzer = LLMAnalyzer(
+                cache=DiskCache(tmp_path / "llm_analysis"),
+                semantic_cache=SemanticCache(tmp_path / "semantic", threshold=0.95),
+                embedding_service=embedding_service,
+            )
+
+        analyzer.analyze_request("Połącz pliki CSV z data/")
+        analyzer.analyze_request("Połącz pliki CSV z archive/")
+
+        assert mock_post.call_count == 2
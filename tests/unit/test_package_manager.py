@@ -1,5 +1,7 @@
 """Tests for DynamicPackageManager class."""
 import subprocess
+import threading
+import time
 from unittest.mock import patch, MagicMock
 
 import pytest
@@ -68,3 +70,78 @@ class TestDynamicPackageManager:
                 manager.import_module("nonexistent_module")
         
         mock_install.assert_called_once_with("nonexistent_module")
+
+    def test_concurrent_installs_run_pip_once(self):
+        """Test that concurrent installs of one package run pip only once."""
+        manager = DynamicPackageManager()
+        calls = []
+
+        def slow_pip(*args, **kwargs):
+            calls.append(args)
+            time.sleep(0.05)
+
+        with patch('subprocess.check_call', side_effect=slow_pip):
+            threads = [
+                threading.Thread(target=manager.install_package, args=("test-package",))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert len(calls) == 1
+        assert manager.installed_packages == {"test-package"}
+
+    @patch('subprocess.check_call')
+    def test_missing_packages_installed_in_one_call(self, mock_check_call, tmp_path):
+        """Test that only missing packages are installed, with one pip call."""
+        manager = DynamicPackageManager(cache_dir=tmp_path)
+
+        result = manager.install_packages(["json", "pytest", "missing-a", "missing-b", "missing-a"])
+
+        assert result is True
+        mock_check_call.assert_called_once()
+        command = mock_check_call.call_args[0][0]
+        assert command[-2:] == ["missing-a", "missing-b"]
+        assert command[command.index("--cache-dir") + 1] == str(tmp_path / "pip")
+
+    @patch('subprocess.check_call')
+    def test_index_persists_between_instances(self, mock_check_call, tmp_path):
+        """Test that a later process skips the checks and pip entirely."""
+        DynamicPackageManager(cache_dir=tmp_path).install_packages(["pytest", "missing-a"])
+        mock_check_call.reset_mock()
+
+        manager = DynamicPackageManager(cache_dir=tmp_path)
+        with patch.object(manager, 'is_available') as mock_available:
+            assert manager.install_packages(["pytest", "missing-a"]) is True
+
+        mock_available.assert_not_called()
+        mock_check_call.assert_not_called()
+
+    @patch('subprocess.check_call')
+    def test_failed_batch_falls_back_to_single_installs(self, mock_check_call, tmp_path):
+        """Test that one bad name does not prevent installing the others."""
+        def pip(command, **kwargs):
+            if "bad-name" in command:
+                raise subprocess.CalledProcessError(1, command)
+
+        mock_check_call.side_effect = pip
+        manager = DynamicPackageManager(cache_dir=tmp_path)
+
+        assert manager.install_packages(["good-name", "bad-name"]) is False
+        assert mock_check_call.call_count == 3
+        assert "good-name" in manager.installed_packages
+        assert "bad-name" not in manager.installed_packages
+
+    @patch('subprocess.check_call')
+    def test_import_names_are_installed_as_distributions(self, mock_check_call, tmp_path):
+        """Test that stdlib modules are skipped and aliases map to distributions."""
+        manager = DynamicPackageManager(cache_dir=tmp_path)
+
+        with patch.object(manager, 'is_available', return_value=False):
+            assert manager.install_packages(["email.utils", "zlib", "mmap", "sklearn"]) is True
+
+        command = mock_check_call.call_args[0][0]
+        assert command[-1] == "scikit-learn"
+        assert "zlib" not in command
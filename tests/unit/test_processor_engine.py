@@ -101,7 +101,7 @@ class TestProcessorEngine:
         
         # Get the actual context passed to exec
         call_args = mock_exec.call_args[0]
-        assert call_args[0] == config.code_template
+        assert call_args[0] is processor_engine.code_cache.get(config.code_template)
         
         # Check if required context variables are present
         context = call_args[1]
@@ -144,11 +144,11 @@ class TestProcessorEngine:
         # Verify the result and calls
         assert result == {'status': 'test_success'}
         mock_llm_analyzer.analyze_request.assert_called_once_with("test request")
-        mock_execute.assert_called_once_with(mock_config)
+        mock_execute.assert_called_once_with(mock_config, output_dir=None, environ=None)
         
         # Test with dependencies
         mock_config.dependencies = ['test_package']
-        with patch.object(processor_engine.package_manager, 'install_package') as mock_install:
+        with patch.object(processor_engine.package_manager, 'install_packages') as mock_install:
             mock_install.return_value = True
             processor_engine.process_natural_request("test request with deps")
-            mock_install.assert_called_once_with('test_package')
+            mock_install.assert_called_once_with(['test_package'])
@@ -0,0 +1,35 @@
+"""Tests for the stdlib and distribution lookups of the package manager."""
+import pytest
+
+from dun.processor_engine_stdlib import distribution_name, is_installed, is_stdlib_module
+
+
+@pytest.mark.parametrize("name", ["email.utils", "zlib", "bz2", "mmap", "http", "os.path"])
+def test_stdlib_modules(name):
+    """Test that all stdlib modules, including submodules, are recognized."""
+    assert is_stdlib_module(name)
+
+
+@pytest.mark.parametrize("name", ["pandas", "sklearn", "yaml"])
+def test_third_party_modules(name):
+    """Test that third-party modules are not treated as stdlib."""
+    assert not is_stdlib_module(name)
+
+
+@pytest.mark.parametrize("name, distribution", [
+    ("sklearn", "scikit-learn"),
+    ("yaml", "PyYAML"),
+    ("PIL.Image", "Pillow"),
+    ("_pytest", "pytest"),
+    ("some-package", "some-package"),
+])
+def test_distribution_name(name, distribution):
+    """Test mapping of import names to pip distributions."""
+    assert distribution_name(name) == distribution
+
+
+def test_is_installed_accepts_import_and_distribution_names():
+    """Test that installed packages are found by either name."""
+    assert is_installed("pydantic_settings")
+    assert is_installed("pydantic-settings")
+    assert not is_installed("surely-not-installed-package")
@@ -0,0 +1,127 @@
+"""Tests for the processor run cache."""
+import os
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from dun.llm_analyzer import LLMAnalyzer
+from dun.processor_engine import ProcessorEngine
+from dun.services.cache import DiskCache, RunCache
+from dun.services.processors import csv_stream
+from dun.services.processors.csv_processor import CSVProcessor
+
+
+def touch(path, seconds=1):
+    """Move the modification time of ``path`` forward."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 10**9))
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    paths = []
+    for i in range(2):
+        path = tmp_path / "data" / f"part{i}.csv"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f"id,value\n{i},{i * 10}\n")
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def output(tmp_path):
+    path = tmp_path / "combined.csv"
+    path.write_text("id,value\n")
+    return path
+
+
+class TestRunCache:
+    """Test cases for RunCache."""
+
+    @pytest.fixture
+    def cache(self, tmp_path):
+        return RunCache(DiskCache(tmp_path / "runs"))
+
+    def test_hit_with_unchanged_inputs(self, cache, inputs, output):
+        """Test that the result is returned while inputs and outputs are unchanged."""
+        key = cache.key("csv", {"sep": ","}, inputs)
+        cache.set(key, {"rows": 2}, outputs=[output])
+
+        assert cache.get(cache.key("csv", {"sep": ","}, inputs)) == {"rows": 2}
+        assert cache.get(cache.key("csv", {"sep": ";"}, inputs)) is None
+        assert cache.get(cache.key("csv", {"sep": ","}, inputs[::-1])) is None
+
+    def test_modified_input_misses(self, cache, inputs, output):
+        """Test that a new size or modification time of an input changes the key."""
+        cache.set(cache.key("csv", {}, inputs), {"rows": 2}, outputs=[output])
+        touch(inputs[0])
+
+        assert cache.get(cache.key("csv", {}, inputs)) is None
+
+    @pytest.mark.parametrize("change", ["delete", "modify"])
+    def test_changed_output_invalidates(self, cache, inputs, output, change):
+        """Test that deleting or modifying an output drops the entry."""
+        key = cache.key("csv", {}, inputs)
+        cache.set(key, {"rows": 2}, outputs=[output])
+        if change == "delete":
+            output.unlink()
+        else:
+            output.write_text("id,value\n9,9\n")
+
+        assert cache.get(key) is None
+        assert len(cache.cache) == 0
+
+    def test_content_hash(self, tmp_path, inputs, output):
+        """Test that the optional content hash sees rewrites that keep size and mtime."""
+        cache = RunCache(DiskCache(tmp_path / "runs"), content_hash=True)
+        cache.set(cache.key("csv", {}, inputs), {"rows": 2}, outputs=[output])
+        stat = inputs[0].stat()
+        inputs[0].write_text(inputs[0].read_text().replace("0", "7"))
+        os.utime(inputs[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        assert cache.get(cache.key("csv", {}, inputs)) is None
+
+    def test_missing_input_is_not_cached(self, cache, inputs, tmp_path):
+        """Test that runs with unreadable inputs are neither looked up nor stored."""
+        key = cache.key("csv", {}, [*inputs, tmp_path / "missing.csv"])
+
+        cache.set(key, {"rows": 2})
+        assert key is None
+        assert cache.get(key) is None
+
+
+@pytest.mark.asyncio
+async def test_processor_reuses_unchanged_output(inputs, tmp_path):
+    """Test that CSVProcessor skips the combine until an input or the output changes."""
+    processor = CSVProcessor()
+    output = tmp_path / "out" / "combined.csv"
+    await processor.combine_csv_files(inputs, output)
+
+    with patch.object(processor, "_combine", AsyncMock(return_value=output)) as combine:
+        assert await processor.combine_csv_files(inputs, output) == output
+        combine.assert_not_called()
+
+        touch(output)
+        await processor.combine_csv_files(inputs, output)
+        combine.assert_called_once()
+    await processor.shutdown()
+
+
+def test_csv_template_returns_previous_result(inputs, tmp_path, monkeypatch):
+    """Test that the generated CSV processor returns the cached result for unchanged inputs."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("INPUT_DIR", str(tmp_path / "data"))
+    monkeypatch.setenv("OUTPUT_FILE", str(tmp_path / "out" / "combined.csv"))
+    engine = ProcessorEngine(Mock())
+    config = LLMAnalyzer()._get_csv_processor()
+
+    first = engine.execute_processor(config)
+    with patch.object(csv_stream, "combine_csv_stream", side_effect=AssertionError("combined again")):
+        second = engine.execute_processor(config)
+
+    assert second == first
+    assert first["rows_processed"] == 2
+
+    inputs[1].write_text("id,value\n1,10\n2,20\n")
+    touch(inputs[1])
+    assert engine.execute_processor(config)["rows_processed"] == 3
@@ -0,0 +1,91 @@
+"""Tests for single-flight call coalescing."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dun.services.cache import AsyncSingleFlight, SingleFlight
+
+
+class TestSingleFlight:
+    """Test cases for the thread-based SingleFlight."""
+
+    def test_concurrent_calls_share_result(self):
+        """Test that concurrent callers with the same key run the function once."""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return object()
+
+        with ThreadPoolExecutor(4) as pool:
+            leader = pool.submit(flight.do, "key", work)
+            started.wait(5)
+            followers = [pool.submit(flight.do, "key", work) for _ in range(3)]
+            while flight.stats["coalesced"] < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [leader.result()] + [f.result() for f in followers]
+
+        assert len(calls) == 1
+        assert all(r is results[0] for r in results)
+        assert flight.stats == {"calls": 4, "executions": 1, "coalesced": 3}
+
+    def test_exception_is_shared_and_key_released(self):
+        """Test that errors propagate to waiters and the key can be retried."""
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            flight.do("key", fail)
+        assert flight.do("key", lambda: 42) == 42
+        assert flight.stats["executions"] == 2
+
+
+class TestAsyncSingleFlight:
+    """Test cases for AsyncSingleFlight."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """Test that concurrent awaiters with the same key share one call."""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def work(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            flight.do("a", work, 1), flight.do("a", work, 1), flight.do("b", work, 2)
+        )
+
+        assert results == [1, 1, 2]
+        assert calls == [1, 2]
+        assert flight.stats == {"calls": 3, "executions": 2, "coalesced": 1}
+        assert await flight.do("a", work, 3) == 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        """Test that cancelling one awaiter leaves the shared call running."""
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("key", work))
+        second = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
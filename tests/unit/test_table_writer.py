@@ -0,0 +1,103 @@
+"""Tests for the chunked table writers."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from dun.services.processors import table_writer
+from dun.services.processors.csv_processor import CSVProcessor
+from dun.services.processors.csv_stream import combine_csv_stream
+from dun.services.processors.table_writer import open_writer, resolve_format
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        "id": np.arange(5, dtype="int64"),
+        "value": [1.5, np.nan, 3.0, 4.25, 5.0],
+        "flag": [True, False, True, True, False],
+        "name": ["a", None, "ccc", 7, "e"],
+    })
+
+
+@pytest.fixture
+def shards(tmp_path):
+    paths = []
+    for i, text in enumerate(["id,name,value\n1,a,1.5\n2,,\n", "id,flag\n3,True\n", "id,name\n4,dddd\n"]):
+        path = tmp_path / f"part{i}.csv"
+        path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+class TestNpzWriter:
+    """Test cases for the NumPy fallback writer."""
+
+    @pytest.mark.parametrize("compression", [None, "zstd"])
+    def test_chunks_round_trip(self, frame, tmp_path, compression):
+        """Test that chunks are written as one array per column."""
+        path = tmp_path / "table.npz"
+
+        with open_writer("npz", path, frame.dtypes, compression) as writer:
+            for start in range(0, len(frame), 2):
+                writer.write(frame.iloc[start:start + 2])
+
+        with np.load(path) as data:
+            assert sorted(data.files) == ["flag", "id", "name", "value"]
+            np.testing.assert_array_equal(data["id"], frame["id"].to_numpy())
+            np.testing.assert_array_equal(data["value"], frame["value"].to_numpy())
+            np.testing.assert_array_equal(data["flag"], frame["flag"].to_numpy())
+            assert data["name"].tolist() == ["a", "", "ccc", "7", "e"]
+
+    def test_streaming_combine(self, shards, tmp_path):
+        """Test that the streaming combine holds the same data in .npz as in CSV."""
+        combine_csv_stream(shards, tmp_path / "combined.csv", chunk_size=1)
+        result = combine_csv_stream(shards, tmp_path / "combined.npz", chunk_size=1, output_format="npz")
+        expected = pd.read_csv(tmp_path / "combined.csv")
+
+        assert result.rows == 4
+        with np.load(tmp_path / "combined.npz") as data:
+            assert list(data.files) == list(expected.columns)
+            np.testing.assert_array_equal(data["id"], expected["id"].to_numpy())
+            np.testing.assert_array_equal(data["value"], expected["value"].to_numpy())
+            assert data["name"].tolist() == expected["name"].fillna("").tolist()
+
+
+def test_arrow_formats_fall_back_to_npz(monkeypatch):
+    """Test that Parquet/Feather requests are written as .npz when pyarrow is missing."""
+    monkeypatch.setattr(table_writer, "has_pyarrow", lambda: False)
+
+    assert resolve_format("parquet") == "npz"
+    assert resolve_format("feather") == "npz"
+    assert resolve_format("csv") == "csv"
+    with pytest.raises(ValueError):
+        resolve_format("xlsx")
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "feather"])
+@pytest.mark.parametrize("streaming", [True, False])
+@pytest.mark.asyncio
+async def test_processor_writes_arrow_formats(shards, tmp_path, output_format, streaming):
+    """Test Parquet and Feather output of the processor."""
+    pytest.importorskip("pyarrow")
+    processor = CSVProcessor({"output_format": output_format, "streaming": streaming, "chunk_size": 1})
+
+    output = await processor.combine_csv_files(shards, tmp_path / "combined.csv")
+    await processor.shutdown()
+
+    assert output.suffix == f".{output_format}"
+    loaded = pd.read_parquet(output) if output_format == "parquet" else pd.read_feather(output)
+    assert loaded["id"].tolist() == [1, 2, 3, 4]
+    assert loaded["name"].tolist()[::3] == ["a", "dddd"]
+
+
+@pytest.mark.asyncio
+async def test_processor_npz_output(shards, tmp_path):
+    """Test that the processor renames the output after the written format."""
+    processor = CSVProcessor({"output_format": "npz"})
+
+    output = await processor.combine_csv_files(shards, tmp_path / "combined.csv")
+    await processor.shutdown()
+
+    assert output == tmp_path / "combined.npz"
+    with np.load(output) as data:
+        assert data["id"].tolist() == [1, 2, 3, 4]
@@ -0,0 +1,128 @@
+"""Tests for the warm processor worker pool."""
+import threading
+import time
+
+import pytest
+
+from dun.config.settings import settings
+
+from dun.processor_engine import ProcessorConfig, ProcessorEngine
+from dun.worker_pool import ProcessorWorkerPool, WorkerError, worker_pool_from_settings
+
+
+def compiled(source):
+    return compile(source, "<test>", "exec")
+
+
+@pytest.fixture
+def pool():
+    with ProcessorWorkerPool(size=1, task_timeout=20) as pool:
+        yield pool
+
+
+class TestProcessorWorkerPool:
+    """Test cases for ProcessorWorkerPool."""
+
+    def test_execute_returns_result(self, pool, tmp_path):
+        """Test that the worker runs the code with the usual context."""
+        code = compiled(
+            "import numpy\n"
+            "result = {'status': 'ok', 'output_dir': output_dir, 'pandas': pd.__name__,\n"
+            "          'imap': imap_server, 'pid': os.getpid()}"
+        )
+
+        result = pool.execute(code, str(tmp_path), env={"IMAP_SERVER": "imap.example.com"})
+
+        assert result["status"] == "ok"
+        assert result["output_dir"] == str(tmp_path)
+        assert result["pandas"] == "pandas"
+        assert result["imap"] == "imap.example.com"
+
+    def test_template_error_keeps_worker(self, pool, tmp_path):
+        """Test that an exception in the template is reported and the worker reused."""
+        pid_code = compiled("result = os.getpid()")
+        pid = pool.execute(pid_code, str(tmp_path))
+
+        with pytest.raises(WorkerError, match="ValueError: boom"):
+            pool.execute(compiled("raise ValueError('boom')"), str(tmp_path))
+
+        assert pool.execute(pid_code, str(tmp_path)) == pid
+
+    def test_crash_replaces_worker(self, pool, tmp_path):
+        """Test that a crashing template does not take down the caller."""
+        with pytest.raises(WorkerError, match="kod wyjścia 3"):
+            pool.execute(compiled("os._exit(3)"), str(tmp_path))
+
+        assert pool.execute(compiled("result = 1"), str(tmp_path)) == 1
+        assert pool.stats["crashes"] == 1
+
+    def test_timeout_replaces_worker(self, pool, tmp_path):
+        """Test that a task exceeding its timeout is killed."""
+        with pytest.raises(TimeoutError):
+            pool.execute(compiled("import time\ntime.sleep(30)"), str(tmp_path), timeout=0.5)
+
+        assert pool.execute(compiled("result = 2"), str(tmp_path)) == 2
+        assert pool.stats["timeouts"] == 1
+
+    def test_recycle_after_max_tasks(self, tmp_path):
+        """Test that workers are replaced after max_tasks_per_worker tasks."""
+        code = compiled("result = os.getpid()")
+        with ProcessorWorkerPool(size=1, max_tasks_per_worker=2) as pool:
+            pids = [pool.execute(code, str(tmp_path)) for _ in range(3)]
+
+        assert pids[0] == pids[1] != pids[2]
+        assert pool.stats["recycled"] == 1
+
+    def test_engine_dispatches_to_pool(self, pool, mock_llm_analyzer, tmp_path, monkeypatch):
+        """Test that ProcessorEngine executes configs in the worker pool."""
+        monkeypatch.setenv("OUTPUT_DIR", str(tmp_path))
+        engine = ProcessorEngine(mock_llm_analyzer, worker_pool=pool)
+        config = ProcessorConfig(
+            name="pid",
+            description="Returns worker pid",
+            dependencies=[],
+            parameters={},
+            code_template="import os\nresult = {'pid': os.getpid()}",
+        )
+
+        result = engine.execute_processor(config)
+
+        assert result["pid"] != __import__("os").getpid()
+
+    def test_close_wakes_waiting_callers(self, tmp_path):
+        """Test that callers waiting for a worker fail once the pool is closed."""
+        pool = ProcessorWorkerPool(size=1, task_timeout=20)
+        busy = threading.Thread(
+            target=pool.execute, args=(compiled("import time\ntime.sleep(1)"), str(tmp_path))
+        )
+        busy.start()
+        while pool.stats["tasks"] == 0:
+            time.sleep(0.01)
+
+        errors = []
+
+        def waiting_call():
+            try:
+                pool.execute(compiled("result = 1"), str(tmp_path))
+            except RuntimeError as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=waiting_call)
+        waiter.start()
+        pool.close()
+        waiter.join(timeout=5)
+        busy.join(timeout=20)
+
+        assert not waiter.is_alive()
+        assert len(errors) == 1
+        assert pool.stats["recycled"] == 0
+
+    def test_pool_only_created_on_request(self, mock_llm_analyzer, monkeypatch):
+        """Test that the engine never starts a pool itself."""
+        monkeypatch.setattr(settings, "WORKER_POOL_ENABLED", True)
+        engine = ProcessorEngine(mock_llm_analyzer)
+
+        assert engine.worker_pool is None
+
+        monkeypatch.setattr(settings, "WORKER_POOL_ENABLED", False)
+        assert worker_pool_from_settings() is None